@@ -0,0 +1,114 @@
+import pytest
+import yaml
+from yaml.events import (AliasEvent, ScalarEvent, SequenceStartEvent,
+        SequenceEndEvent, MappingStartEvent, MappingEndEvent)
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.elaborator import ElaboratorLimitError
+
+
+def expanded(text, **kwargs):
+    return list(process_stream(text, flat=True, expand_aliases=True,
+            **kwargs))
+
+
+def event_tree(events):
+    # (tag, value) trees of the documents of a list of standard events.
+    def node(position):
+        event = events[position]
+        if isinstance(event, ScalarEvent):
+            return (event.tag, event.value), position + 1
+        assert not isinstance(event, AliasEvent)
+        end = SequenceEndEvent if isinstance(event, SequenceStartEvent) \
+                else MappingEndEvent
+        items = []
+        position += 1
+        while not isinstance(events[position], end):
+            item, position = node(position)
+            items.append(item)
+        if end is MappingEndEvent:
+            items = list(zip(items[::2], items[1::2]))
+        return (event.tag, items), position + 1
+
+    trees = []
+    position = 0
+    while position < len(events):
+        if isinstance(events[position], (ScalarEvent, SequenceStartEvent,
+                MappingStartEvent)):
+            tree, position = node(position)
+            trees.append(tree)
+        else:
+            position += 1
+    return trees
+
+
+def node_tree(node):
+    if isinstance(node, yaml.ScalarNode):
+        return (node.tag, node.value)
+    if isinstance(node, yaml.SequenceNode):
+        return (node.tag, [node_tree(item) for item in node.value])
+    return (node.tag, [(node_tree(key), node_tree(value))
+            for key, value in node.value])
+
+
+texts = [
+    "- &a [1, {k: &s two}]\n- *a\n- *s\n",
+    "base: &base {x: 1, y: [a, b]}\nother: {z: *base}\nsame: *base\n",
+    "--- &d [&e x, *e, [*e]]\n--- [&d y, *d]\n",
+    "&k key: value\n? *k\n: again\n",
+    "- &a [&b [&c x, *c], *b]\n- *a\n- *b\n",
+]
+
+
+@pytest.mark.parametrize('text', texts)
+def test_same_as_compose(text):
+    events = expanded(text, with_extra_events=False)
+    assert not any(isinstance(e, AliasEvent) for e in events)
+    assert event_tree(events) == [node_tree(node)
+            for node in yaml.compose_all(text)]
+
+
+def test_replays_drop_anchors():
+    text = "- &a [&b x, {&c k: *b}]\n- *a\n"
+    events = [e for e in expanded(text, with_extra_events=False)
+            if isinstance(e, (ScalarEvent, SequenceStartEvent,
+                MappingStartEvent))]
+    anchors = [e.anchor for e in events]
+    # The root sequence, then the anchored nodes as written, then their
+    # replay without anchors.
+    assert anchors == [None, 'a', 'b', None, 'c', None,
+            None, None, None, None, None]
+    assert [getattr(e, 'value', None) for e in events] == [None, None, 'x',
+            None, 'k', 'x', None, 'x', None, 'k', 'x']
+
+
+def test_aliases_passed_through_by_default():
+    events = list(process_stream("- &a 1\n- *a\n", flat=True))
+    assert [e.anchor for e in events if isinstance(e, AliasEvent)] == ['a']
+
+
+def test_budget():
+    text = "- &a [1, {k: 2}]\n- *a\n"
+    replayed = (len(expanded(text))
+            - len(list(process_stream(text, flat=True))) + 1)
+    expanded(text, max_alias_expansion=replayed)
+    with pytest.raises(ElaboratorLimitError) as info:
+        expanded(text, max_alias_expansion=replayed - 1)
+    assert info.value.problem_mark.index == text.index('*a')
+
+
+def test_billion_laughs():
+    lines = ['a0: &a0 [lol, lol, lol, lol, lol, lol, lol, lol, lol, lol]']
+    for i in range(1, 10):
+        lines.append('a%d: &a%d [%s]' % (i, i,
+                ', '.join(['*a%d' % (i - 1)] * 10)))
+    text = '\n'.join(lines) + '\n'
+
+    produced = 0
+    with pytest.raises(ElaboratorLimitError) as info:
+        for ee in process_stream(text, flat=True, expand_aliases=True,
+                max_alias_expansion=100000):
+            produced += 1
+    assert produced < 200000
+    assert "expanded from aliases" in info.value.problem
+    assert info.value.problem_mark.line >= 4
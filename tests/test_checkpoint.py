@@ -0,0 +1,115 @@
+import io
+import json
+
+import pytest
+from yaml.events import StreamStartEvent, DocumentEndEvent
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.checkpoint import Checkpoint
+
+
+text = """\
+# A stream with non-ASCII text, so that bytes and characters differ.
+name: café
+list: [ü, ñ, 'ø']
+---
+- [x, ünïcödé]
+- {ключ: значение}
+--- !tag scalar
+...
+# comment between documents
+--- |
+  ブロック
+  text
+---
+"""
+
+inputs = {
+    'str': lambda: text,
+    'bytes': lambda: text.encode('utf-8'),
+    'BytesIO': lambda: io.BytesIO(text.encode('utf-8')),
+    'utf-16': lambda: text.encode('utf-16'),
+    'BOM': lambda: b'\xef\xbb\xbf' + text.encode('utf-8'),
+    'StringIO': lambda: io.StringIO(text),
+}
+
+
+def key(event):
+    # The content and marks of an event, and its checkpoint.
+    marks = tuple((mark.index, mark.line, mark.column)
+            for mark in (event.start_mark, event.end_mark))
+    return (type(event).__name__, getattr(event, 'tag', None),
+            getattr(event, 'value', None), getattr(event, 'anchor', None),
+            marks, getattr(event, 'checkpoint', None))
+
+
+@pytest.mark.parametrize('kind', sorted(inputs))
+@pytest.mark.parametrize('kwargs', [{}, dict(with_extra_events=False),
+        dict(hashing_content=True, packing_numbers=True)])
+def test_resume_same_as_uninterrupted(kind, kwargs):
+    full = list(process_stream(inputs[kind](), flat=True,
+            checkpointing=True, **kwargs))
+    ends = [i for i, ee in enumerate(full)
+            if isinstance(ee, DocumentEndEvent)]
+    assert len(ends) == 5
+
+    for end in ends:
+        checkpoint = full[end].checkpoint
+        if kind in ('str', 'StringIO'):
+            assert checkpoint.encoding is None
+        else:
+            assert checkpoint.encoding is not None
+        resumed = list(process_stream(inputs[kind](),
+                resume_from=checkpoint))
+        assert isinstance(resumed[0], StreamStartEvent)
+        assert [key(ee) for ee in resumed[1:]] == (
+                [key(ee) for ee in full[end + 1:]])
+
+
+def test_offsets():
+    full = list(process_stream(text.encode('utf-8'), flat=True,
+            checkpointing=True))
+    for ee in full:
+        if isinstance(ee, DocumentEndEvent):
+            checkpoint = ee.checkpoint
+            assert checkpoint.offset == len(
+                    text[:checkpoint.index].encode('utf-8'))
+    full = list(process_stream(text, flat=True, checkpointing=True))
+    for ee in full:
+        if isinstance(ee, DocumentEndEvent):
+            assert ee.checkpoint.offset == ee.checkpoint.index
+
+
+def test_stored_checkpoint():
+    full = list(process_stream(text.encode('utf-8'), flat=True,
+            checkpointing=True))
+    end = [i for i, ee in enumerate(full)
+            if isinstance(ee, DocumentEndEvent)][1]
+    checkpoint = full[end].checkpoint
+    stored = Checkpoint(**json.loads(json.dumps(checkpoint._asdict())))
+    assert stored == checkpoint
+    resumed = list(process_stream(text.encode('utf-8'), resume_from=stored))
+    assert [key(ee) for ee in resumed[1:]] == (
+            [key(ee) for ee in full[end + 1:]])
+
+
+def test_resume_counts_documents():
+    checkpoint = first_checkpoint(text)
+    assert checkpoint.document == 1
+    later = [ee.checkpoint.document for ee in process_stream(text,
+            resume_from=checkpoint) if isinstance(ee, DocumentEndEvent)]
+    assert later == [2, 3, 4, 5]
+
+
+def first_checkpoint(stream):
+    return next(ee.checkpoint for ee in process_stream(stream, flat=True,
+            checkpointing=True) if isinstance(ee, DocumentEndEvent))
+
+
+def test_mismatched_input():
+    binary = first_checkpoint(text.encode('utf-8'))
+    textual = first_checkpoint(text)
+    with pytest.raises(ValueError):
+        list(process_stream(text, resume_from=binary))
+    with pytest.raises(ValueError):
+        list(process_stream(text.encode('utf-8'), resume_from=textual))
@@ -0,0 +1,122 @@
+import pytest
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.columnar import extract_columns, ColumnarError
+
+
+def row_groups(text, path, columns, **kwargs):
+    # Each row group as (start, size, {name: (values, nulls)}) of lists,
+    # whether or not NumPy is installed.
+    return [(group.start, group.size, dict(
+            (name, (list(column.values), [int(n) for n in column.nulls]))
+            for name, column in group.columns.items()))
+            for group in extract_columns(process_stream(text, flat=True),
+                path, columns, **kwargs)]
+
+
+records = """\
+title: example
+rows:
+- {id: 1, name: a, ratio: 0.5, ok: yes, extra: [1, 2]}
+- {id: 0x2, name: 'b', ratio: 3, ok: ~}
+- {name: c, ratio: .inf, ok: false}
+- {id: 4, name: ~, other: {x: y}}
+- {id: -5, name: '', ratio: ~, ok: true}
+"""
+columns = [('id', 'int'), ('name', 'str'), ('ratio', 'float'), ('ok', 'bool')]
+
+
+def test_columns_and_nulls():
+    [(start, size, group)] = row_groups(records, (0, 'rows'), columns)
+    assert (start, size) == (0, 5)
+    assert group == {
+        'id': ([1, 2, 0, 4, -5], [0, 0, 1, 0, 0]),
+        'name': (['a', 'b', 'c', None, ''], [0, 0, 0, 1, 0]),
+        'ratio': ([0.5, 3.0, float('inf'), 0.0, 0.0], [0, 0, 0, 1, 1]),
+        'ok': ([1, 0, 0, 0, 1], [0, 1, 0, 1, 0]),
+    }
+
+
+@pytest.mark.parametrize('row_group_size', [1, 2, 3, 5, 6])
+def test_row_groups(row_group_size):
+    [(_, _, whole)] = row_groups(records, (0, 'rows'), columns)
+    groups = row_groups(records, (0, 'rows'), columns,
+            row_group_size=row_group_size)
+    sizes = [size for start, size, group in groups]
+    assert sizes == [min(row_group_size, 5 - start)
+            for start in range(0, 5, row_group_size)]
+    assert [start for start, size, group in groups] == list(range(0, 5,
+            row_group_size))
+    for name in whole:
+        for i in (0, 1):
+            joined = [x for start, size, group in groups
+                    for x in group[name][i]]
+            assert joined == whole[name][i]
+    for start, size, group in groups:
+        assert all(len(values) == len(nulls) == size
+                for values, nulls in group.values())
+
+
+def test_paths():
+    text = "--- [{a: 1}]\n--- [{a: 2}, {a: 3}]\n--- {rows: [{a: 4}]}\n"
+    assert [group['a'][0] for _, _, group in row_groups(text, (1,),
+            {'a': 'int'})] == [[2, 3]]
+    assert [group['a'][0] for _, _, group in row_groups(text, (None,),
+            {'a': 'int'})] == [[1], [2, 3]]
+    assert row_groups(text, (2, 'missing'), {'a': 'int'}) == []
+    nested = "a: [x, {b: [{c: 1}, {c: 2}]}]\n"
+    assert [group['c'][0] for _, _, group in row_groups(nested,
+            (0, 'a', 1, 'b'), {'c': 'int'})] == [[1, 2]]
+
+
+def error_at(text, columns, offending, path=(0,)):
+    with pytest.raises(ColumnarError) as info:
+        list(extract_columns(process_stream(text, flat=True), path, columns))
+    assert info.value.problem_mark.index == text.index(offending)
+    return info.value.problem
+
+
+@pytest.mark.parametrize('text, kind, offending', [
+    ("- {v: x}\n", 'int', 'x'),
+    ("- {v: 1.5}\n", 'int', '1.5'),
+    ("- {v: '1'}\n", 'int', "'1'"),
+    ("- {v: yes}\n", 'float', 'yes'),
+    ("- {v: 1}\n", 'bool', '1'),
+])
+def test_type_mismatch(text, kind, offending):
+    problem = error_at(text, {'v': kind}, offending)
+    assert "cannot store" in problem and kind in problem
+
+
+@pytest.mark.parametrize('text, kind, offending', [
+    ("- {id: 1}\n- {id: 99999999999999999999}\n", 'int',
+        '99999999999999999999'),
+    ("- {id: -0x8000000000000001}\n", 'int', '-0x'),
+    ("- {id: 0x%s}\n" % ('f' * 300), 'float', '0x'),
+])
+def test_out_of_range(text, kind, offending):
+    problem = error_at(text, {'id': kind}, offending)
+    assert "out of range of %s column 'id'" % kind in problem
+
+
+def test_int_range_limits():
+    text = "- {id: 9223372036854775807}\n- {id: -9223372036854775808}\n"
+    [(_, _, group)] = row_groups(text, (0,), {'id': 'int'})
+    assert group['id'][0] == [2 ** 63 - 1, -2 ** 63]
+
+
+def test_malformed_records():
+    assert "expected a record mapping" in error_at("- {a: 1}\n- [a]\n",
+            {'a': 'int'}, '[a]')
+    assert "expected a scalar" in error_at("- {a: [1]}\n", {'a': 'int'},
+            '[1]')
+    assert "expected a scalar" in error_at("- {a: &x 1}\n- {a: *x}\n",
+            {'a': 'int'}, '*x')
+    assert "duplicate key" in error_at("- {a: 1, b: 2, a: 3}\n",
+            {'a': 'int'}, 'a: 3')
+
+
+def test_unknown_column_type():
+    with pytest.raises(ValueError):
+        list(extract_columns(process_stream("[]", flat=True), (0,),
+                {'a': 'decimal'}))
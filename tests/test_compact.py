@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+import yaml
+from yaml.events import DocumentEndEvent
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.compact import (CompactScalarNode, CompactSequenceNode,
+        CompactMappingNode)
+
+
+text = """\
+---
+name: example
+count: 0x10
+ratio: 1.5e+3
+flags: [yes, No, ~, '', "quoted"]
+when: 2001-12-14 21:59:43.10 -5
+day: 2002-12-14
+binary: !!binary aGVsbG8=
+set: !!set {a, b}
+omap: !!omap [{x: 1}, {y: 2}]
+base: &base {p: 1, q: [1, 2]}
+merged:
+  <<: *base
+  q: override
+nested: [[1, [2, {deep: true}]], {k: v}]
+text: |
+  line one
+  line two
+--- [1, 2, 3]
+--- plain scalar
+---
+"""
+
+
+def compact_roots(text, **kwargs):
+    return [e.node for e in process_stream(text, flat=True,
+            composing_fully='compact', **kwargs)
+            if isinstance(e, DocumentEndEvent)]
+
+
+def test_constructs_as_safe_load():
+    loader = yaml.SafeLoader('')
+    roots = compact_roots(text, Loader=yaml.SafeLoader)
+    constructed = [loader.construct_document(root) for root in roots]
+    assert constructed == list(yaml.safe_load_all(text))
+    # Merging changed only the views, not the tree.
+    merged = roots[0]._tree.root.get('merged')
+    assert [key.value for key, value in merged.value] == ['<<', 'q']
+    assert constructed[0]['when'].tzinfo is not None
+    assert constructed[0]['day'] == datetime.date(2002, 12, 14)
+
+
+def test_views():
+    [root] = compact_roots("a: [1, {b: c}]\n")
+    assert isinstance(root, CompactMappingNode)
+    [(key, value)] = root.value
+    assert isinstance(key, CompactScalarNode) and key.value == 'a'
+    assert isinstance(value, CompactSequenceNode)
+    assert [type(node) for node in value.value] == [CompactScalarNode,
+            CompactMappingNode]
+    assert value.value[0].tag == 'tag:yaml.org,2002:int'
+    assert value.start_mark.line == 0 and value.start_mark.column == 3
+    assert value.flow_style is True
+
+
+def tags(text, **kwargs):
+    return [(type(e).__name__, getattr(e, 'tag', None))
+            for e in process_stream(text, flat=True, **kwargs)]
+
+
+class PathLoader(yaml.Loader):
+    pass
+
+PathLoader.add_path_resolver('!first', [(list, 0)], str)
+PathLoader.add_path_resolver('!point', [(list, 2), (dict, 'points'),
+        (list, None)], dict)
+PathLoader.add_path_resolver('!x', [(list, 2), (dict, 'points'),
+        (list, None), (dict, 'x')], str)
+
+path_text = """\
+- one
+- two
+- points:
+  - {x: p, y: 2}
+  - {x: r, y: 4}
+- [nested, list]
+"""
+
+
+@pytest.mark.parametrize('text', [path_text, "[a, b]", "- [a]\n"])
+def test_path_resolvers(text):
+    expected = tags(text, Loader=PathLoader, composing_fully=True)
+    assert tags(text, Loader=PathLoader, composing_fully='compact') == (
+            expected)
+
+
+def test_path_resolvers_apply():
+    [root] = compact_roots(path_text, Loader=PathLoader)
+    items = root.value
+    assert items[0].tag == '!first'
+    assert items[1].tag == 'tag:yaml.org,2002:str'
+    points = items[2].value[0][1].value
+    assert [point.tag for point in points] == ['!point', '!point']
+    assert [key.value for key, value in points[0].value] == ['x', 'y']
+    assert [value.tag for key, value in points[0].value] == ['!x',
+            'tag:yaml.org,2002:int']
+    composed = yaml.compose(path_text, Loader=PathLoader)
+    assert [value.tag for key, value in
+            composed.value[2].value[0][1].value[0].value] == ['!x',
+            'tag:yaml.org,2002:int']
@@ -0,0 +1,36 @@
+import yaml
+
+import yaml_elaborate
+from yaml_elaborate.constructor import construct_documents
+
+
+def _construct(text, **kwargs):
+    return list(construct_documents(yaml_elaborate.process_stream(text,
+            flat=True, **kwargs)))
+
+
+def test_matches_safe_load():
+    text = "a: [1, 2.5, x]\nb: &b {c: ~}\nd: *b\n---\n- !!set {p: ~}\n"
+    assert _construct(text) == list(yaml.safe_load_all(text))
+
+
+def test_packed_sequence_with_withheld_element_events():
+    text = "[1, 2, 3]\n---\n[1.0, 2.5, -3.]\n---\nx: [0x10, 1_000]\n"
+    documents = _construct(text, packing_numbers=True,
+            with_packed_element_events=False)
+    assert documents == list(yaml.safe_load_all(text))
+    assert [type(v) for v in documents[0]] == [int, int, int]
+    assert [type(v) for v in documents[1]] == [float, float, float]
+
+
+def test_packed_sequence_with_element_events():
+    text = "[1, 2, 3]\n"
+    assert _construct(text, packing_numbers=True) == [[1, 2, 3]]
+
+
+def test_packed_sequence_mixing_ints_and_floats():
+    text = "[1, 2.5, 123456789012345678]\n"
+    documents = _construct(text, packing_numbers=True,
+            with_packed_element_events=False)
+    assert documents == [[1, 2.5, 123456789012345678]]
+    assert [type(v) for v in documents[0]] == [int, float, int]
@@ -0,0 +1,36 @@
+import yaml
+
+from yaml_elaborate import diff_streams, streams_equal
+
+
+def test_differences():
+    a = "a: 1\nb: [1, 2, 3]\nc: {x: y}\n---\n- 0x10\n"
+    b = "a: 2\nb: [1, 2]\nd: {x: y}\n---\n- 16\n"
+    assert [(d.kind, d.path) for d in diff_streams(a, b)] == [
+            ('changed', (0, 'a')),
+            ('removed', (0, 'b', 2)),
+            ('removed', (0, 'c')),
+            ('added', (0, 'd')),
+            ]
+
+
+def test_first_difference_is_found_before_its_subtrees_are_read():
+    items = "".join("- [%d, %d]\n" % (i, i) for i in range(2000))
+    a = "--- !!omap\n" + items
+    b = "---\n" + items
+    read = []
+
+    class CountingLoader(yaml.Loader):
+        def get_event(self):
+            event = super(CountingLoader, self).get_event()
+            read.append(event)
+            return event
+
+    differences = list(diff_streams(a, b, Loader=CountingLoader,
+            first_only=True))
+    assert [(d.kind, d.path) for d in differences] == [('changed', (0,))]
+    assert len(read) < 20
+
+    del read[:]
+    assert not streams_equal(a, b, Loader=CountingLoader)
+    assert len(read) < 20
@@ -0,0 +1,111 @@
+import io
+
+import pytest
+import yaml
+
+from yaml_elaborate import emit_stream, process_stream
+
+
+text = """\
+%YAML 1.1
+---
+name: example
+count: 0x10
+ratios: [1.5, -2.25, .inf, .nan]
+ints: [1, 2, 3, -40, 0x7]
+mixed: [1, 2.5, three]
+nested: [[1, 2], [], [3.5]]
+flags: [yes, No, ~, '', "quoted"]
+anchored: &a {p: 1, q: [x, y]}
+alias: *a
+text: |
+  a block scalar long enough to be spilled
+  over two lines
+folded: >
+  folded text that is also long enough to be spilled
+...
+--- [1, 2, 3]
+--- plain scalar
+---
+"""
+
+backends = ['python']
+if hasattr(yaml, 'CDumper'):
+    backends.append('c')
+
+settings = [
+    {},
+    dict(flat=False),
+    dict(packing_numbers=True),
+    dict(packing_numbers=True, with_packed_element_events=False),
+    dict(spilling_scalars_over=10),
+    dict(spilling_scalars_over=10, spilling_scalars_to='memory'),
+    dict(interning_strings=True, interning_scalars_up_to=8),
+    dict(expand_aliases=True),
+    dict(hashing_content=True, with_extra_events=False),
+    dict(packing_numbers=True, with_packed_element_events=False,
+        spilling_scalars_over=10, interning_strings=True,
+        interning_scalars_up_to=8),
+]
+
+
+def same_data(a, b):
+    # As yaml.safe_load_all, with NaN equal to itself.
+    return repr(list(yaml.safe_load_all(a))) == repr(
+            list(yaml.safe_load_all(b)))
+
+
+@pytest.mark.parametrize('backend', backends)
+@pytest.mark.parametrize('kwargs', settings)
+def test_round_trip(kwargs, backend):
+    kwargs = dict(kwargs)
+    flat = kwargs.pop('flat', True)
+    emitted = emit_stream(process_stream(text, flat=flat, **kwargs),
+            backend=backend)
+    assert same_data(emitted, text)
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_explicit_tags(backend):
+    emitted = emit_stream(process_stream(text, flat=True, packing_numbers=True,
+            with_packed_element_events=False), backend=backend,
+            explicit_tags=True)
+    assert '!!int' in emitted and '!!float' in emitted and '!!map' in emitted
+    assert same_data(emitted, text)
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_tags_kept(backend):
+    source = "- !custom {a: 1}\n- !!str 12\n- '12'\n- 12\n- !local x\n"
+    emitted = emit_stream(process_stream(source, flat=True),
+            backend=backend)
+
+    def tags(node):
+        if isinstance(node, yaml.ScalarNode):
+            return [node.tag]
+        if isinstance(node, yaml.SequenceNode):
+            return [node.tag] + [t for item in node.value
+                    for t in tags(item)]
+        return [node.tag] + [t for key, value in node.value
+                for t in tags(key) + tags(value)]
+
+    assert tags(yaml.compose(emitted)) == tags(yaml.compose(source))
+
+
+def test_to_stream_and_options():
+    output = io.StringIO()
+    assert emit_stream(process_stream(text, flat=True), output,
+            backend='python', canonical=True) is None
+    assert output.getvalue().startswith('%YAML 1.1')
+    assert same_data(output.getvalue(), text)
+
+
+def test_adds_stream_ends():
+    events = list(process_stream("[1, 2]", flat=True, including_ends=False))
+    assert same_data(emit_stream(events), "[1, 2]")
+    assert emit_stream([]) == ''
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        emit_stream([], backend='fortran')
@@ -0,0 +1,92 @@
+import pytest
+from yaml.events import DocumentStartEvent, DocumentEndEvent
+
+from yaml_elaborate import process_stream
+
+
+def root_hashes(text, **kwargs):
+    # The content hash of the root node of each document.
+    hashes = []
+    last = None
+    for ee in process_stream(text, flat=True, hashing_content=True,
+            with_extra_events=False, **kwargs):
+        if isinstance(ee, DocumentStartEvent):
+            last = None
+        elif isinstance(ee, DocumentEndEvent):
+            hashes.append(last)
+        else:
+            last = getattr(ee, 'content_hash', last)
+    return hashes
+
+
+def root_hash(text, **kwargs):
+    [content_hash] = root_hashes(text, **kwargs)
+    return content_hash
+
+
+equal = [
+    # Scalar styles.
+    ["x: hello\n", "x: 'hello'\n", 'x: "hello"\n', "x: |-\n  hello\n",
+        "x: >-\n  hello\n", '"x": "\\x68ello"\n'],
+    # Canonical values.
+    ["16", "0x10", "020", "+16", "1_6", "0b10000"],
+    ["60", "1:00", "0x3c"],
+    ["1.5", "1.50", "0.15e+1", "15.0e-1", "0:1.5"],
+    ["yes", "true", "On"],
+    ["x: ~", "x: null", "x:", "x: NULL"],
+    # Collection styles and mapping order.
+    ["{a: 1, b: [2, 3]}", "a: 1\nb:\n- 2\n- 3\n", "b: [2, 3]\na: 1\n"],
+    ["{? [1, 2] : {c: d, e: f}}", "? - 1\n  - 2\n: {e: f, c: d}\n"],
+    # Aliases hash as their anchored node.
+    ["[&a {x: 1}, *a]", "[{x: 1}, {x: 1}]"],
+]
+
+different = [
+    # str and int.
+    ["x: '1'", "x: 1", "x: !!float 1"],
+    ["'16'", "16"],
+    ["'true'", "true"],
+    ["'~'", "~", "''"],
+    # Sequence order, and sequence against mapping.
+    ["[1, 2]", "[2, 1]", "{1: 2}", "[[1, 2]]", "[1, 2, null]"],
+    # Keys and values are not interchangeable.
+    ["{a: b}", "{b: a}"],
+    ["{}", "[]", "''"],
+    # Explicit tags.
+    ["!x [1]", "!y [1]", "[1]"],
+]
+
+
+@pytest.mark.parametrize('texts', equal)
+def test_equal(texts):
+    hashes = [root_hash(text) for text in texts]
+    assert hashes == hashes[:1] * len(texts), texts
+
+
+@pytest.mark.parametrize('texts', different)
+def test_different(texts):
+    hashes = [root_hash(text) for text in texts]
+    assert len(set(hashes)) == len(texts), texts
+
+
+packable = """\
+--- [1, 2, 3]
+--- [1.5, -2.0, .inf]
+--- {a: [1, 2, 3], b: [[4, 5], [6.5]], c: [x, 1]}
+--- [[], [0], [1, 2.5]]
+"""
+
+
+@pytest.mark.parametrize('with_packed_element_events', [True, False])
+def test_packed_sequences(with_packed_element_events):
+    expected = root_hashes(packable)
+    assert root_hashes(packable, packing_numbers=True,
+            with_packed_element_events=with_packed_element_events) == (
+            expected)
+
+
+def test_alias_inside_own_node():
+    # A recursive alias hashes by its anchor, so documents differing only
+    # in anchor names differ.
+    assert root_hash("&a [1, *a]") != root_hash("&b [1, *b]")
+    assert root_hash("&a [1, *a]") == root_hash("&a [1, *a]")
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+# Importing the package should take well under this many seconds; importing
+# yaml alone takes about twice as long.
+import_time_budget = 0.010
+
+heavy_modules = ['yaml', 'yaml_elaborate.elaborator',
+        'yaml_elaborate.saxifier', 'xml.sax']
+
+import_code = '''
+import json, sys, time
+start = time.perf_counter()
+import yaml_elaborate
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(sys.modules)]))
+'''
+
+
+def import_in_subprocess():
+    output = subprocess.check_output([sys.executable, '-c', import_code])
+    return json.loads(output.decode('utf-8'))
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+        reason="submodules are imported eagerly before Python 3.7")
+def test_import_is_lazy():
+    # Best of a few runs, to allow for a busy machine.
+    runs = [import_in_subprocess() for i in range(3)]
+    elapsed = min(run[0] for run in runs)
+    modules = runs[0][1]
+
+    assert [name for name in heavy_modules if name in modules] == []
+    assert elapsed < import_time_budget, (
+            "import took %.1f ms" % (elapsed * 1000))
+
+
+def test_lazy_exports_resolve():
+    import yaml_elaborate
+    for name, module in yaml_elaborate._lazy_exports.items():
+        value = getattr(yaml_elaborate, name)
+        assert value.__module__ == 'yaml_elaborate.' + module
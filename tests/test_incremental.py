@@ -0,0 +1,49 @@
+import random
+
+import yaml
+
+from yaml_elaborate.incremental import IncrementalElaborator
+
+
+def _signature(events):
+    return [(type(e).__name__, getattr(e, 'value', None),
+            getattr(e, 'tag', None), e.start_mark.index, e.start_mark.line,
+            e.start_mark.column, e.end_mark.index, e.end_mark.line)
+            for e in events]
+
+def _fresh(text):
+    return IncrementalElaborator(text)
+
+
+def test_edits_match_elaborating_from_scratch():
+    rng = random.Random(12345)
+    documents = ["--- 1\n", "---\n- x\n- y\n", "--- |\n  text\n",
+            "---\nb: [1, 2]\n...\n", "--- # c\nk: v\n\n"]
+    text = "".join(rng.choice(documents) for i in range(150))
+    incremental = IncrementalElaborator(text)
+    for step in range(150):
+        old_text = incremental.text
+        start = rng.randrange(len(old_text) + 1)
+        end = min(len(old_text), start + rng.randrange(8))
+        replacement = rng.choice(documents + ["", "x", "-", "\n", "..."])
+        try:
+            incremental.edit(start, end, replacement)
+        except yaml.YAMLError:
+            # Undoing the edit elaborates the region again.
+            incremental.edit(start, start + len(replacement),
+                    old_text[start:end])
+            assert incremental.text == old_text
+        expected = _fresh(incremental.text)
+        assert len(incremental) == len(expected)
+        assert (_signature(incremental.events())
+                == _signature(expected.events()))
+
+
+def test_document_events():
+    incremental = IncrementalElaborator("".join("--- %d\n" % i
+            for i in range(200)))
+    change = incremental.edit(0, 0, "--- first\n")
+    assert (change.index, change.removed) == (0, 1)
+    assert len(incremental) == 201
+    assert incremental.document_events(-1)[1].value == '199'
+    assert incremental.document_events(150)[1].start_mark.line == 150
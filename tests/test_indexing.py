@@ -0,0 +1,99 @@
+import pytest
+from yaml.events import DocumentEndEvent
+from yaml.nodes import ScalarNode
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.elaborator import ElaboratorError
+from yaml_elaborate.indexing import IndexedMappingNode
+
+_int_tag = 'tag:yaml.org,2002:int'
+_bool_tag = 'tag:yaml.org,2002:bool'
+
+composing_modes = [True, 'compact']
+
+
+def root(text, composing_fully, **kwargs):
+    [node] = [e.node for e in process_stream(text, flat=True,
+            composing_fully=composing_fully, indexing_keys=True, **kwargs)
+            if isinstance(e, DocumentEndEvent)]
+    return node
+
+
+@pytest.mark.parametrize('composing_fully', composing_modes)
+def test_canonical_keys(composing_fully):
+    node = root("{0x10: hex, name: first, 'quoted': q, yes: y, 1.50: f, "
+            "name: last, [1]: list, <<: {m: 1}}", composing_fully)
+    if composing_fully is True:
+        assert isinstance(node, IndexedMappingNode)
+    assert node.key_index is not None
+
+    assert node.get('16', tag=_int_tag).value == 'hex'
+    assert node.get('020', tag=_int_tag).value == 'hex'
+    assert node.get('16') is None
+    assert node.get('0x10') is None
+    # The last of equal keys wins.
+    assert node.get('name').value == 'last'
+    assert node.get('quoted').value == 'q'
+    assert node.get('true', tag=_bool_tag).value == 'y'
+    assert node.get('1.5', tag='tag:yaml.org,2002:float').value == 'f'
+    assert node.get('missing', 'default') == 'default'
+    # Keys given as nodes.
+    key = ScalarNode(_int_tag, '0x10')
+    assert node.get(key).value == 'hex'
+    # Collection and merge keys are not indexed.
+    assert node.get('<<') is None
+    assert node.get('<<', tag='tag:yaml.org,2002:merge') is None
+    assert len(node.key_index) == 5
+
+
+@pytest.mark.parametrize('composing_fully', composing_modes)
+def test_nested_mappings(composing_fully):
+    node = root("a:\n  0x1: one\n  b: {c: d}\n", composing_fully)
+    inner = node.get('a')
+    assert inner.get('1', tag=_int_tag).value == 'one'
+    assert inner.get('b').get('c').value == 'd'
+
+
+def test_compact_get_without_index():
+    [node] = [e.node for e in process_stream("{0x10: hex, a: b, a: c}",
+            flat=True, composing_fully='compact')
+            if isinstance(e, DocumentEndEvent)]
+    assert node.key_index is None
+    assert node.get('16', tag=_int_tag).value == 'hex'
+    assert node.get('a').value == 'c'
+
+
+duplicates = [
+    ("{0x10: a, 16: b}", "0x10", "16"),
+    ("a: 1\nb: 2\n'a': 3\n", "a", "'a'"),
+    ("x:\n  yes: 1\n  On: 2\n", "yes", "On"),
+    ("- {k: 1}\n- {k: 1, 1.0: x, 1.00: y}\n", "1.0", "1.00"),
+]
+
+
+@pytest.mark.parametrize('composing_fully', [False] + composing_modes)
+@pytest.mark.parametrize('text, first, second', duplicates)
+def test_duplicate_keys_rejected(text, first, second, composing_fully):
+    events = []
+    with pytest.raises(ElaboratorError) as info:
+        for ee in process_stream(text, flat=True,
+                composing_fully=composing_fully,
+                rejecting_duplicate_keys=True):
+            events.append(ee)
+    error = info.value
+    first_index = text.index(first)
+    second_index = text.index(second, first_index + len(first))
+    assert error.context_mark.index == first_index
+    assert error.problem_mark.index == second_index
+    assert "duplicate mapping key" in error.context
+    # Stopped before the value of the second key.
+    assert events[-1].start_mark.index <= second_index
+
+
+@pytest.mark.parametrize('composing_fully', [False] + composing_modes)
+def test_distinct_keys_accepted(composing_fully):
+    text = ("{a: 1, 'b': 2, 16: 3, '16': 4, [a]: 5, [a]: 6, <<: {a: 7}, "
+            "x: {a: 8}}")
+    events = list(process_stream(text, flat=True,
+            composing_fully=composing_fully, rejecting_duplicate_keys=True))
+    assert events
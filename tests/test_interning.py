@@ -0,0 +1,114 @@
+import yaml
+from yaml.events import ScalarEvent, MappingStartEvent, AliasEvent
+
+from yaml_elaborate.elaborator import Elaborator, ElaboratorSettings
+from yaml_elaborate.interning import InternTable, InternStatistics
+
+
+def fresh(text):
+    # An equal string that is a distinct object.
+    return ''.join(list(text))
+
+
+def test_table_identity():
+    table = InternTable()
+    first = fresh('status')
+    second = fresh('status')
+    assert first is not second
+    assert table.intern(first) is first
+    assert table.intern(second) is first
+    assert table.intern(first) is first
+    assert table.intern(None) is None
+    statistics = table.statistics()
+    assert statistics == InternStatistics(1, 1, 1, statistics.saved_bytes)
+    assert statistics.saved_bytes > 0
+
+
+def test_table_bounds():
+    table = InternTable(max_size=2)
+    a, b, c = fresh('alpha'), fresh('bravo'), fresh('charlie')
+    for text in (a, b, c):
+        table.intern(text)
+    assert table.statistics().size == 2
+    # Strings in the table are still interned once it is full; others are
+    # passed through.
+    assert table.intern(fresh('alpha')) is a
+    other = fresh('charlie')
+    assert table.intern(other) is other
+    table.clear()
+    assert table.statistics() == InternStatistics(0, 0, 0, 0)
+
+
+def elaborate(text, **kwargs):
+    loader = yaml.Loader(text)
+    elaborator = Elaborator(ElaboratorSettings.default._replace(
+            parser=loader, flat=True, interning_strings=True, **kwargs))
+    try:
+        return list(elaborator.process()), elaborator
+    finally:
+        loader.dispose()
+
+
+text = """\
+- &first {status: active, code: ab, note: a longer value}
+- {status: active, code: ab, note: a longer value}
+- !custom {status: active, code: ab}
+- !custom {status: active}
+- *first
+"""
+
+
+def scalar_values(events, name):
+    return [e.value for e in events if isinstance(e, ScalarEvent)
+            and e.value == name]
+
+
+def test_keys_tags_and_anchors():
+    events, elaborator = elaborate(text)
+    keys = scalar_values(events, 'status')
+    assert len(keys) == 4 and all(key is keys[0] for key in keys)
+    # Values are not interned without interning_scalars_up_to.
+    values = scalar_values(events, 'active')
+    assert len(set(map(id, values))) == 4
+    tags = [e.tag for e in events if isinstance(e, MappingStartEvent)]
+    assert all(tag is tags[0] for tag in tags[:2])
+    assert tags[2] is tags[3] and tags[2] == '!custom'
+    # The anchor and its alias.
+    anchors = [(type(e), e.anchor) for e in events
+            if getattr(e, 'anchor', None)]
+    assert anchors == [(MappingStartEvent, 'first'), (AliasEvent, 'first')]
+    assert anchors[0][1] is anchors[1][1]
+    assert elaborator.interning_statistics().hits > 0
+
+
+def test_scalars_up_to():
+    events, elaborator = elaborate(text, interning_scalars_up_to=6)
+    for name, count in (('active', 4), ('ab', 3)):
+        values = scalar_values(events, name)
+        assert len(values) == count and all(value is values[0]
+                for value in values)
+    # Longer than the cutoff.
+    values = scalar_values(events, 'a longer value')
+    assert len(values) == 2 and values[0] is not values[1]
+
+
+def test_table_size_setting():
+    events, elaborator = elaborate(text, intern_table_size=3,
+            interning_scalars_up_to=100)
+    assert elaborator.interning_statistics().size == 3
+
+
+def test_not_interning():
+    loader = yaml.Loader(text)
+    elaborator = Elaborator(ElaboratorSettings.default._replace(
+            parser=loader, flat=True))
+    keys = scalar_values(list(elaborator.process()), 'status')
+    assert len(set(map(id, keys))) == 4
+    assert elaborator.interning_statistics() is None
+
+
+def test_long_keys_not_interned():
+    key = 'k' * 300
+    events, elaborator = elaborate("- {%s: 1}\n- {%s: 2}\n" % (key, key))
+    keys = scalar_values(events, key)
+    assert len(keys) == 2 and keys[0] is not keys[1]
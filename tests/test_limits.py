@@ -0,0 +1,65 @@
+import pytest
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.elaborator import ElaboratorLimitError
+
+
+def elaborate(text, **kwargs):
+    # The events produced before any limit error, and the error.
+    events = []
+    try:
+        for ee in process_stream(text, flat=True, **kwargs):
+            events.append(ee)
+    except ElaboratorLimitError as e:
+        return events, e
+    return events, None
+
+
+# (setting, text, at the limit, offending text, description)
+cases = [
+    ('max_depth', "[[[x]]]", 3, "[x]", "nesting depth"),
+    ('max_depth', "a:\n  b:\n    c: d\n", 3, "c: d", "nesting depth"),
+    ('max_collection_size', "[a, b, c, d]", 4, "d]",
+        "number of sequence elements"),
+    ('max_collection_size', "{a: 1, b: 2, c: 3}", 3, "c: 3",
+        "number of mapping pairs"),
+    ('max_collection_size', "- a\n- b\n- c\n", 3, "c\n",
+        "number of sequence elements"),
+    ('max_scalar_length', "[abc, abcdef]", 6, "abcdef", "scalar length"),
+    ('max_scalar_length', "{abc: 1, abcdef: 2}", 6, "abcdef",
+        "scalar length"),
+    ('max_scalar_length', "x: 'abc\n  def'\n", 7, "'abc", "scalar length"),
+    ('max_anchors', "[&a 1, &b 2, &c 3]", 3, "&c", "number of anchors"),
+    ('max_anchors', "{&a k: &b v, &c x: y}", 3, "&c", "number of anchors"),
+    ('max_documents', "--- 1\n--- 2\n--- 3\n", 3, "--- 3",
+        "number of documents"),
+]
+
+
+@pytest.mark.parametrize('setting, text, limit, offending, description',
+        cases)
+def test_limit(setting, text, limit, offending, description):
+    events, error = elaborate(text, **{setting: limit})
+    assert error is None
+    complete = len(events)
+
+    events, error = elaborate(text, **{setting: limit - 1})
+    assert isinstance(error, ElaboratorLimitError)
+    assert error.problem_mark.index == text.index(offending)
+    assert "limit of %d" % (limit - 1) in error.problem
+    assert error.problem.startswith(description)
+    # Nothing past the offending event was produced.
+    assert len(events) < complete
+    assert all(e.start_mark.index <= text.index(offending) for e in events)
+
+
+def test_anchors_counted_per_document():
+    events, error = elaborate("--- [&a 1, &b 2]\n--- [&c 3, &d 4]\n",
+            max_anchors=2)
+    assert error is None
+
+
+def test_limits_off_by_default():
+    text = "[" * 50 + "]" * 50 + "\n--- &a " + "x" * 10000
+    events, error = elaborate(text)
+    assert error is None
@@ -0,0 +1,39 @@
+import pytest
+
+from yaml_elaborate import memcheck
+
+
+def leaking(bytes_per_item):
+    kept = []
+    def function(size):
+        # Kept until the next run, as a leak would be.
+        del kept[:]
+        kept.append(bytes(bytes_per_item * size))
+    return function
+
+
+def test_slope():
+    assert memcheck._slope([1000], [5000]) == 0.0
+    assert memcheck._slope([1000, 2000, 4000], [100, 100, 100]) == 0.0
+    assert memcheck._slope([1000, 2000, 4000], [1000, 3000, 7000]) == (
+            pytest.approx(2.0))
+
+
+def test_small_leak_fails(monkeypatch):
+    monkeypatch.setattr(memcheck, '_scenarios', (
+            ('no leak', True, lambda size: [0] * 100),
+            ('leak', True, leaking(16)),
+            ('leak, not flat', False, leaking(16)),
+            ))
+    results = memcheck.check_memory([1000, 4000, 16000])
+    assert [(result.scenario, result.passed) for result in results] == [
+            ('no leak', True), ('leak', False), ('leak, not flat', True)]
+
+
+def test_scenarios_flat():
+    # Sizes small enough to run quickly under tracemalloc, but past the
+    # warm-up growth seen below about 200 records.
+    results = memcheck.check_memory([200, 400, 800])
+    assert [result.scenario for result in results] == [
+            name for name, flat, function in memcheck._scenarios]
+    assert [result.scenario for result in results if not result.passed] == []
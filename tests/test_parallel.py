@@ -0,0 +1,39 @@
+import pytest
+import yaml
+
+from yaml_elaborate import parallel, process_stream, process_stream_parallel
+
+
+text = "".join("- name: item%d\n  value: [%d, %d]\n" % (i, i, i + 1)
+        for i in range(64))
+
+
+@pytest.fixture
+def no_serial_fallback(monkeypatch):
+    def fail(*args):
+        raise AssertionError("elaborated serially")
+    monkeypatch.setattr(parallel, '_process_serially', fail)
+
+
+def marks(events):
+    return [(str(e.start_mark), str(e.end_mark)) for e in events]
+
+
+def check_same_marks(Loader):
+    serial = list(process_stream(text, Loader=Loader, flat=True))
+    events = list(process_stream_parallel(text, Loader=Loader, workers=2,
+            min_items_per_shard=8, flat=True))
+    assert [type(e) for e in events] == [type(e) for e in serial]
+    assert marks(events) == marks(serial)
+    return events
+
+
+def test_marks_show_snippets(no_serial_fallback):
+    events = check_same_marks(yaml.Loader)
+    [last] = [e for e in events if getattr(e, 'value', None) == 'item63']
+    assert '- name: item63' in str(last.start_mark)
+
+
+def test_marks_of_c_loader(no_serial_fallback):
+    if hasattr(yaml, 'CLoader'):
+        check_same_marks(yaml.CLoader)
@@ -0,0 +1,48 @@
+import pytest
+import yaml
+
+from yaml_elaborate import process_stream
+
+
+valid_text = "".join("- name: item%d\n  tags: [a, &t%d b, *t%d]\n" % (i, i, i)
+        for i in range(300))
+invalid_text = "- a\n- b\n- c\n- [unclosed\n"
+
+
+def describe(events):
+    return [(type(e).__name__, getattr(e, 'value', None), e.start_mark.index,
+            e.end_mark.index) for e in events]
+
+
+def run(text, **kwargs):
+    # The events produced before any error, and the error.
+    events = []
+    try:
+        for ee in process_stream(text, flat=True, **kwargs):
+            events.append(ee)
+    except yaml.YAMLError as e:
+        return describe(events), (type(e), str(e))
+    return describe(events), None
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 256])
+@pytest.mark.parametrize('text', [valid_text, invalid_text])
+def test_same_as_serial(text, chunk_size):
+    serial = run(text)
+    pipelined = run(text, pipelined=True, pipeline_chunk_size=chunk_size,
+            pipeline_queue_size=2)
+    assert pipelined == serial
+
+
+def test_error_after_events():
+    events, error = run(invalid_text, pipelined=True)
+    assert [value for name, value, start, end in events
+            if name == 'ScalarEvent'] == ['a', 'b', 'c', 'unclosed']
+    assert issubclass(error[0], yaml.MarkedYAMLError)
+
+
+def test_stopping_early():
+    stream = process_stream(valid_text, flat=True, pipelined=True,
+            pipeline_chunk_size=4, pipeline_queue_size=1)
+    next(stream)
+    stream.close()
@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+import yaml
+
+from yaml_elaborate import ProcessingContext, process_stream
+
+
+def describe(events):
+    return [(type(e).__name__, getattr(e, 'value', None),
+            getattr(e, 'tag', None), getattr(e, 'anchor', None),
+            e.start_mark.index) for e in events]
+
+
+def run(process, text):
+    # The events produced before any error, and the error.
+    events = []
+    try:
+        for ee in process(text):
+            events.append(ee)
+    except yaml.YAMLError as e:
+        return describe(events), (type(e), str(e))
+    return describe(events), None
+
+
+def check_same(context, texts, Loader=yaml.Loader, **kwargs):
+    for text in texts:
+        assert run(context.process_stream, text) == run(
+                lambda t: process_stream(t, Loader=Loader, flat=True,
+                **kwargs), text), text
+
+
+def test_loader_reused():
+    context = ProcessingContext(flat=True)
+    list(context.process_stream("a: 1\n"))
+    [entry] = context._entries()
+    assert [getattr(e, 'value', None) for e in
+            context.process_stream("b: 2\n")].count('2') == 1
+    assert context._entries() == [entry]
+    context.clear()
+    assert context._entries() == []
+
+
+def test_no_state_between_streams():
+    context = ProcessingContext(flat=True, expand_aliases=True,
+            compiling_resolver=True)
+    check_same(context, [
+            "- &a [1, 2]\n- *a\n",
+            # An anchor of the previous stream.
+            "- *a\n",
+            "%TAG !e! tag:example.com,2000:\n--- !e!x 1\n",
+            # A tag handle of the previous stream.
+            "--- !e!x 1\n",
+            # Errors part-way, inside collections.
+            "a: [b, {c: &d [e\n",
+            "- [1, 2\n",
+            "{x: [1, 2], y: yes}\n",
+            ], expand_aliases=True, compiling_resolver=True)
+
+
+def test_path_resolvers_after_error():
+    class PathLoader(yaml.Loader):
+        pass
+    PathLoader.add_path_resolver('!item', [(list, 0), (list, 1)], str)
+    context = ProcessingContext(PathLoader, flat=True)
+    check_same(context, ["- [a, [b\n", "- [a, b]\n", "[[a, b], [c, d]]\n"],
+            Loader=PathLoader)
+    tags = [e.tag for e in context.process_stream("[[a, b]]\n")
+            if hasattr(e, 'value')]
+    assert tags == ['tag:yaml.org,2002:str', '!item']
+
+
+def test_loader_with_own_initializer():
+    class CountingLoader(yaml.Loader):
+        def __init__(self, stream):
+            super(CountingLoader, self).__init__(stream)
+            self.streams = getattr(self, 'streams', 0) + 1
+    context = ProcessingContext(CountingLoader, flat=True)
+    check_same(context, ["a: 1\n", "b: [2\n", "c: 3\n"],
+            Loader=CountingLoader)
+    [entry] = context._entries()
+    assert entry.loader.streams == 3
+
+
+def test_not_pooled():
+    if not hasattr(yaml, 'CLoader'):
+        pytest.skip("no CLoader")
+    context = ProcessingContext(yaml.CLoader, flat=True)
+    check_same(context, ["a: 1\n", "b: [2\n", "c: 3\n"],
+            Loader=yaml.CLoader)
+    assert context._entries() == []
+
+
+def test_nested_streams():
+    # A stream started while another is open gets its own loader.
+    context = ProcessingContext(flat=True)
+    outer = context.process_stream("[1, 2, 3]\n")
+    next(outer)
+    assert run(context.process_stream, "x: y\n") == run(
+            lambda t: process_stream(t, flat=True), "x: y\n")
+    assert [getattr(e, 'value', None) for e in outer].count('3') == 1
+
+
+def test_threads():
+    context = ProcessingContext(flat=True)
+    texts = ["- %d\n- &a [t%d]\n- *a\n" % (i, i) for i in range(8)]
+    expected = [run(lambda t: process_stream(t, flat=True), text)
+            for text in texts]
+    loaders = {}
+    failures = []
+
+    def work(number):
+        try:
+            for round in range(20):
+                for text, result in zip(texts, expected):
+                    assert run(context.process_stream, text) == result
+            loaders[number] = [id(entry.loader)
+                    for entry in context._entries()]
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    pooled = [loader for ids in loaders.values() for loader in ids]
+    assert len(pooled) == 4 and len(set(pooled)) == 4
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+import yaml
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+
+from yaml_elaborate.resolver import CompiledResolver
+
+
+core_values = [
+    # null
+    '~', 'null', 'Null', 'NULL', '', 'nULL',
+    # bool
+    'yes', 'Yes', 'YES', 'No', 'no', 'on', 'On', 'OFF', 'true', 'False',
+    'y', 'n',
+    # int
+    '0', '-0', '+12', '1_000', '0b1010', '0o17', '017', '0x_1', '0xFF',
+    '190:20:30', '-1:00',
+    # float
+    '1.5', '-.5', '1e3', '1.0e+3', '6.8523015e+5', '685.230_15e+03',
+    '190:20:30.15', '.inf', '-.Inf', '+.INF', '.nan', '.NaN', '1.',
+    # timestamp
+    '2001-12-14', '2001-12-14t21:59:43.10-05:00',
+    '2001-12-14 21:59:43.10', '2001-12-14 21:59:43.10 -5',
+    # merge and value
+    '<<', '=',
+    # plain strings
+    'hello', '1_', '0x', '12:', ':', '-', '.', '1-2', '2001-1-1x', '~~',
+]
+
+
+def check_same(Loader, values, implicit=(True, False)):
+    loader = Loader('')
+    compiled = CompiledResolver(Loader(''))
+    # As at the root node of a document.
+    loader.descend_resolver(None, None)
+    compiled.descend_resolver(None, None)
+    for value in values:
+        assert (compiled.resolve(ScalarNode, value, implicit)
+                == loader.resolve(ScalarNode, value, implicit)), value
+
+
+def test_core_types():
+    check_same(yaml.Loader, core_values)
+    check_same(yaml.SafeLoader, core_values)
+
+
+def test_cached_results():
+    loader = yaml.Loader('')
+    compiled = CompiledResolver(yaml.Loader(''), cache_size=4,
+            cached_length=3)
+    for value in core_values * 3:
+        assert (compiled.resolve(ScalarNode, value, (True, False))
+                == loader.resolve(ScalarNode, value, (True, False))), value
+
+
+def test_not_implicit():
+    check_same(yaml.Loader, core_values, (False, True))
+    check_same(yaml.Loader, core_values, (False, False))
+
+
+def test_collections():
+    loader = yaml.Loader('')
+    compiled = CompiledResolver(yaml.Loader(''))
+    for kind in (SequenceNode, MappingNode):
+        assert (compiled.resolve(kind, None, (True, False))
+                == loader.resolve(kind, None, (True, False)))
+
+
+class UserLoader(yaml.Loader):
+    pass
+
+# Shares its first characters with the core int and float resolvers, with
+# its own group and flags.
+UserLoader.add_implicit_resolver('!version',
+        re.compile(r'^(\d+)\.(\d+)\.(\d+)$'), list('0123456789'))
+UserLoader.add_implicit_resolver('!hex',
+        re.compile(r'^0x[0-9a-f]+h$', re.I), ['0'])
+UserLoader.add_implicit_resolver('!word', re.compile(r'^[a-z]+!$'),
+        list('abcdefghijklmnopqrstuvwxyz'))
+# Wildcard resolvers, tried after those of the first character.
+UserLoader.add_implicit_resolver('!percent', re.compile(r'^\S+%$'), None)
+UserLoader.add_implicit_resolver('!verbose', re.compile(r'''
+        ^ \# [0-9]+   # an issue number
+        $''', re.X), None)
+
+user_values = core_values + [
+    '1.2.3', '01.2.3', '1.2', '0x1Fh', '0X1FH', '0x1F', 'hello!', 'yes!',
+    'Hello!', '50%', 'yes%', '1%', '% ', '%', '#12', '#1x', '# 12',
+]
+
+
+def test_user_resolvers():
+    check_same(UserLoader, user_values)
+    check_same(UserLoader, user_values, (False, True))
+
+
+def test_only_wildcard_resolvers():
+    class WildcardLoader(yaml.BaseLoader):
+        pass
+    WildcardLoader.add_implicit_resolver('!any-int',
+            re.compile(r'^[0-9]+$'), None)
+    WildcardLoader.add_implicit_resolver('!any-word',
+            re.compile(r'^[a-z]+$'), None)
+    check_same(WildcardLoader, ['12', 'ab', 'a1', '', '~'])
+
+
+def test_path_resolvers():
+    class PathLoader(yaml.Loader):
+        pass
+    PathLoader.add_path_resolver('!root', [], str)
+    check_same(PathLoader, core_values)
+
+
+def test_resolvers_added_later_not_seen():
+    class LateLoader(yaml.Loader):
+        pass
+    compiled = CompiledResolver(LateLoader(''))
+    LateLoader.add_implicit_resolver('!late', re.compile(r'^late$'), ['l'])
+    assert compiled.resolve(ScalarNode, 'late', (True, False)) == (
+            'tag:yaml.org,2002:str')
+
+
+@pytest.mark.parametrize('value', ['0x1Fh', '50%', '#12'])
+def test_user_tags(value):
+    compiled = CompiledResolver(UserLoader(''))
+    assert compiled.resolve(ScalarNode, value, (True, False)).startswith('!')
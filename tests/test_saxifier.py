@@ -0,0 +1,92 @@
+import io
+import itertools
+from xml.etree import ElementTree
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+
+import pytest
+
+from yaml_elaborate import (Saxifier, TreeSaxifier, process_stream,
+        saxify_event_stream)
+
+
+class PrefixRecorder(ContentHandler):
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.calls = []
+
+    def startPrefixMapping(self, prefix, uri):
+        self.calls.append(('start', prefix))
+
+    def endPrefixMapping(self, prefix):
+        self.calls.append(('end', prefix))
+
+
+def test_prefix_mappings_ended():
+    handler = PrefixRecorder()
+    saxify_event_stream(process_stream("a: [1, 2]\n", flat=True), handler)
+    starts = [prefix for call, prefix in handler.calls if call == 'start']
+    ends = [prefix for call, prefix in handler.calls if call == 'end']
+    assert len(starts) == 2
+    assert ends == starts[::-1]
+
+
+text = '''\
+%YAML 1.1
+%TAG !e! tag:example.com,2000:
+--- !e!root
+plain: text
+'single': "double"
+? [flow, &a seq]
+: |
+  literal
+  block
+folded: >
+  folded
+  text
+tagged: !!str 12
+local: !local {x: 1}
+alias: *a
+empty:
+nonspecific: ! 12
+...
+--- [1, 2.5, yes, ~]
+'''
+
+
+def as_tuple(element):
+    return (element.tag, sorted(element.attrib.items()), element.text or '',
+            [as_tuple(child) for child in element])
+
+
+def sax_tree(options):
+    output = io.StringIO()
+    Saxifier(process_stream(text, flat=True), XMLGenerator(output),
+            **options).run()
+    return ElementTree.fromstring(output.getvalue())
+
+
+option_sets = [dict(include_stylistic_attributes=stylistic,
+        include_ancillary_elements=ancillary, hide_implicit_if_true=hide)
+        for stylistic, ancillary, hide
+        in itertools.product([False, True], repeat=3)]
+
+
+@pytest.mark.parametrize('options', option_sets)
+def test_tree_same_as_sax(options):
+    expected = as_tuple(sax_tree(options))
+    tree = TreeSaxifier(process_stream(text, flat=True), backend='etree',
+            **options).run()
+    assert as_tuple(tree) == expected
+
+    documents = list(TreeSaxifier(process_stream(text, flat=True),
+            backend='etree', **options).iter_documents())
+    assert [as_tuple(document) for document in documents] == expected[3]
+
+
+def test_tree_with_lxml():
+    pytest.importorskip('lxml')
+    for options in option_sets:
+        tree = TreeSaxifier(process_stream(text, flat=True), backend='lxml',
+                **options).run()
+        assert as_tuple(tree) == as_tuple(sax_tree(options))
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from yaml_elaborate.scalars import SpilledScalar, SpillFile
+
+
+def test_spilled_scalars_share_a_file():
+    spill_file = SpillFile()
+    texts = ['a' * 100, 'é☃' * 50, '', 'tail']
+    scalars = [SpilledScalar(text, spill_file=spill_file) for text in texts]
+    for scalar, text in zip(scalars, texts):
+        assert str(scalar) == text
+        assert list(scalar.chunks(7)) == [text[i:i + 7]
+                for i in range(0, len(text), 7)]
+        assert scalar == text and hash(scalar) == hash(text)
+
+
+def test_retained_spilled_scalars_within_descriptor_limit():
+    # Run in a subprocess so that the lowered limit affects nothing else.
+    code = '''
+import resource
+resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+import yaml_elaborate
+text = "".join("- %s\\n" % ("x%d" % i * 20) for i in range(400))
+events = list(yaml_elaborate.process_stream(text, flat=True,
+        spilling_scalars_over=10))
+values = [str(e.value) for e in events if hasattr(e, "value")]
+assert values[-1] == "x399" * 20, values[-1]
+'''
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.check_call([sys.executable, '-c', code], cwd=root)
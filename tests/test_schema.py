@@ -0,0 +1,178 @@
+import pytest
+from yaml.events import ScalarEvent
+
+from yaml_elaborate import process_stream
+from yaml_elaborate.schema import (compile_schema, SchemaValidator, Violation,
+        validate_stream)
+
+
+def violations(text, schema, **kwargs):
+    # Each violation as (path, message, mark index).
+    return [(v.path, v.message, v.mark.index)
+            for v in validate_stream(text, schema, **kwargs)]
+
+
+keywords = [
+    # type
+    ({'type': 'int'}, "12", []),
+    ({'type': 'int'}, "'12'", [((0,), "expected int, found "
+        "tag:yaml.org,2002:str", 0)]),
+    ({'type': 'number'}, "--- 1\n--- 1.5\n", []),
+    ({'items': {'type': 'number'}}, "[1, 1.5, x]", [((0, 2),
+        "expected float or int, found tag:yaml.org,2002:str", 9)]),
+    ({'type': ['null', 'bool']}, "--- ~\n--- yes\n", []),
+    ({'type': 'any'}, "!custom {a: 1}", []),
+    ({'type': '!custom'}, "!custom {a: 1}", []),
+    ({'type': 'tag:yaml.org,2002:map'}, "[a]", [((0,),
+        "expected map, found tag:yaml.org,2002:seq", 0)]),
+    # keys, additional_keys
+    ({'keys': {'a': {'type': 'str'}}}, "{a: 1, b: 2}", [((0, 'a'),
+        "expected str, found tag:yaml.org,2002:int", 4)]),
+    ({'keys': {'a': {}}, 'additional_keys': False}, "{a: 1, b: 2}",
+        [((0, 'b'), "unexpected key 'b'", 7)]),
+    ({'keys': {'a': {}}, 'additional_keys': {'type': 'str'}},
+        "{a: 1, b: 2, c: x}", [((0, 'b'),
+        "expected str, found tag:yaml.org,2002:int", 10)]),
+    # required
+    ({'required': ['a', 'b']}, "{b: 1, c: 2}", [((0,),
+        "missing required key 'a'", 0)]),
+    ({'required': ['a']}, "a:\n", []),
+    # items, min_items, max_items
+    ({'items': {'type': 'str'}}, "- x\n- [y]\n", [((0, 1),
+        "expected str, found tag:yaml.org,2002:seq", 6)]),
+    ({'min_items': 2}, "[1]", [((0,), "1 items is fewer than the minimum 2",
+        0)]),
+    ({'max_items': 1}, "{a: 1, b: 2}", [((0,),
+        "2 pairs is more than the maximum 1", 0)]),
+    ({'min_items': 1, 'max_items': 1}, "[[]]", []),
+    # enum
+    ({'enum': [16, 'x']}, "--- 0x10\n--- x\n", []),
+    ({'enum': [16]}, "'16'", [((0,), "'16' is not one of the allowed values",
+        0)]),
+    ({'enum': [1]}, "true", [((0,), "True is not one of the allowed values",
+        0)]),
+    # minimum, maximum
+    ({'minimum': 0, 'maximum': 1.5}, "[0, 1.5, 0x1]", []),
+    ({'items': {'minimum': 0, 'maximum': 1.5}}, "[-1, 1.6, '9']", [
+        ((0, 0), "-1 is less than the minimum 0", 1),
+        ((0, 1), "1.6 is more than the maximum 1.5", 5)]),
+    # pattern
+    ({'pattern': '^a+$'}, "aaa", []),
+    ({'pattern': 'b'}, "'abc'", []),
+    ({'pattern': '^a'}, "ba", [((0,), "'ba' does not match '^a'", 0)]),
+    # min_length, max_length
+    ({'min_length': 2, 'max_length': 3}, "--- ab\n--- abc\n", []),
+    ({'min_length': 2}, "a", [((0,), "length 1 is less than the minimum 2",
+        0)]),
+    ({'max_length': 3}, "--- x\n--- abcd\n", [((1,),
+        "length 4 is more than the maximum 3", 10)]),
+]
+
+
+@pytest.mark.parametrize('schema, text, expected', keywords)
+def test_keywords(schema, text, expected):
+    assert violations(text, schema) == expected
+    assert violations(text, compile_schema(schema)) == expected
+
+
+def test_paths():
+    schema = {'keys': {'rows': {'items': {'keys': {'id': {'type': 'int'}}}}}}
+    text = "rows:\n- {id: 1}\n- {id: x}\n"
+    assert violations(text, schema) == [((0, 'rows', 1, 'id'),
+            "expected int, found tag:yaml.org,2002:str", text.index('x'))]
+
+
+def test_malformed_schemas():
+    with pytest.raises(ValueError):
+        compile_schema({'typo': 'int'})
+    with pytest.raises(ValueError):
+        compile_schema({'type': 'integer'})
+    with pytest.raises(ValueError):
+        compile_schema({'items': 'int'})
+
+
+bad = "- 1\n- x\n- 2\n- y\n"
+bad_schema = {'items': {'type': 'int'}}
+
+
+def test_fail_fast():
+    assert len(violations(bad, bad_schema)) == 2
+    assert violations(bad, bad_schema, fail_fast=True) == [((0, 1),
+            "expected int, found tag:yaml.org,2002:str", bad.index('x'))]
+
+
+def test_fail_fast_stops_reading():
+    read = []
+
+    def events():
+        for ee in process_stream(bad, flat=True, including_ends=False,
+                with_extra_events=True):
+            read.append(ee)
+            yield ee
+
+    validator = SchemaValidator(bad_schema, fail_fast=True)
+    found = []
+    for ee in events():
+        found.extend(validator.feed(ee))
+        if validator.failed:
+            break
+    assert [v.path for v in found] == [(0, 1)]
+    assert all(isinstance(v, Violation) for v in found)
+    scalars = [ee.value for ee in read if isinstance(ee, ScalarEvent)]
+    assert scalars == ['1', 'x']
+    # Nothing more is checked.
+    assert validator.feed(read[-1]) == []
+
+
+def test_fail_fast_across_documents():
+    text = "--- x\n--- y\n"
+    assert [v[0] for v in validate_stream(text, {'type': 'int'})] == [(0,),
+            (1,)]
+    assert [v[0] for v in validate_stream(text, {'type': 'int'},
+            fail_fast=True)] == [(0,)]
+
+
+alias_text = "a: &x [1, {b: 2}]\nc: *x\n"
+alias_schema = {'keys': {'c': {'items': {'type': 'int'}}}}
+
+
+def test_aliases_not_checked():
+    assert violations(alias_text, alias_schema) == []
+
+
+def test_aliases_expanded():
+    # The replayed events carry the marks of the anchored node.
+    assert violations(alias_text, alias_schema, expand_aliases=True) == [
+            ((0, 'c', 1), "expected int, found tag:yaml.org,2002:map",
+            alias_text.index('{b'))]
+
+
+packed = "values: [1, 25, -3]\nratios: [0.5, 2.5]\n"
+packed_schema = {'keys': {
+    'values': {'items': {'type': 'int', 'minimum': 0, 'maximum': 10},
+        'max_items': 2},
+    'ratios': {'items': {'type': 'int', 'enum': [0.5]}},
+}}
+
+
+@pytest.mark.parametrize('kwargs', [{}, dict(packing_numbers=True),
+        dict(packing_numbers=True, with_packed_element_events=False)])
+def test_packed_sequences(kwargs):
+    found = [(v.path, v.message) for v in validate_stream(packed,
+            packed_schema, **kwargs)]
+    assert found == [
+        ((0, 'values', 1), "25 is more than the maximum 10"),
+        ((0, 'values', 2), "-3 is less than the minimum 0"),
+        ((0, 'values'), "3 items is more than the maximum 2"),
+        ((0, 'ratios', 0), "expected int, found tag:yaml.org,2002:float"),
+        ((0, 'ratios', 1), "expected int, found tag:yaml.org,2002:float"),
+        ((0, 'ratios', 1), "2.5 is not one of the allowed values"),
+    ]
+
+
+def test_packed_sequences_marked_at_sequence():
+    [violation] = validate_stream(packed, {'keys': {'ratios': {'items':
+            {'maximum': 1}}}}, packing_numbers=True,
+            with_packed_element_events=False)
+    assert violation.path == (0, 'ratios', 1)
+    assert violation.mark.index == packed.index('[0.5')
@@ -1,13 +1,51 @@
 
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
-from builtins import *
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
 
 
 
-import yaml
-from .elaborator import Elaborator, ElaboratorSettings
-from .saxifier import Saxifier
+import importlib
+
+# Names exported from submodules, which are only imported when one of their
+# names is first used (on Python 3.7 and later; before that, on import).
+_lazy_exports = {
+        'Elaborator': 'elaborator',
+        'ElaboratorSettings': 'elaborator',
+        'Saxifier': 'saxifier',
+        'TreeSaxifier': 'saxifier',
+        'diff_streams': 'diff',
+        'streams_equal': 'diff',
+        'PipelinedParser': 'pipeline',
+        'EventConstructor': 'constructor',
+        'construct_documents': 'constructor',
+        'process_stream_parallel': 'parallel',
+        'ProcessingContext': 'pool',
+        'emit_stream': 'emitting',
+        'validate_stream': 'schema',
+        'extract_columns': 'columnar',
+        }
+
+def _import_export(name):
+    module = importlib.import_module('.' + _lazy_exports[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in _lazy_exports:
+            raise AttributeError("module %r has no attribute %r"
+                    % (__name__, name))
+        return _import_export(name)
+
+    def __dir__():
+        return sorted(set(globals()) | set(_lazy_exports))
+else:
+    for _name in _lazy_exports:
+        _import_export(_name)
 
 def _collapse(*dicts):
     result = {}
@@ -19,21 +57,61 @@ def _get_settings(*args, **kwargs):
     all = args + (kwargs,)
     collapsed = _collapse(*all)
 
+    from .elaborator import ElaboratorSettings
     return ElaboratorSettings.default._replace(**collapsed)
 
-def process_stream(stream, Loader=yaml.Loader, **kwargs):
+def process_stream(stream, Loader=None, pipelined=False,
+        pipeline_chunk_size=256, pipeline_queue_size=16, resume_from=None,
+        **kwargs):
     """
     Elaborate on the first YAML document in the stream.
+
+    ``Loader`` defaults to ``yaml.Loader``.
+
+    If ``pipelined`` is true, the stream is read and parsed in a separate
+    thread which passes events along in chunks of ``pipeline_chunk_size``
+    through a queue of at most ``pipeline_queue_size`` chunks (see
+    ``yaml_elaborate.pipeline``).
+
+    If ``resume_from`` is a checkpoint taken from an earlier run on the same
+    input (see ``yaml_elaborate.checkpoint``), the stream is elaborated from
+    that checkpoint on, with the settings saved in it except those given
+    again. ``stream`` must then be a string, ``bytes``, or a file (seekable,
+    if binary) at its start.
     """
+    from .elaborator import Elaborator
+    if Loader is None:
+        import yaml
+        Loader = yaml.Loader
+
+    if resume_from is not None:
+        kwargs = _collapse(resume_from.settings, kwargs,
+                dict(resumed_from=resume_from))
+    if resume_from is not None or kwargs.get('checkpointing'):
+        from .checkpoint import DecodingReader, _checkpointed_input
+        stream = _checkpointed_input(stream, resume_from)
+        if kwargs.get('checkpointing') and isinstance(stream, DecodingReader):
+            kwargs['checkpointing'] = stream
+
     loader = Loader(stream)
-    settings = _get_settings(kwargs, parser=loader)
+    parser = loader
+    if pipelined:
+        from .pipeline import PipelinedParser
+        parser = PipelinedParser(loader, pipeline_chunk_size,
+                pipeline_queue_size)
+        if kwargs.get('resolver') is None:
+            kwargs['resolver'] = loader
+    settings = _get_settings(kwargs, parser=parser)
     
     try:
         elaborator = Elaborator(settings)
         for ee in elaborator.process(): yield ee
     finally:
+        if pipelined:
+            parser.close()
         loader.dispose()
 
 def saxify_event_stream(event_stream, sax_handler, **kwargs):
+    from .saxifier import Saxifier
     return Saxifier(event_stream, sax_handler, **kwargs).run()
 
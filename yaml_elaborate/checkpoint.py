@@ -0,0 +1,318 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Checkpoints for resuming the elaboration of a stream.
+
+With the elaborator's ``checkpointing`` setting, the ``DocumentEndEvent`` of
+each document carries a ``Checkpoint`` (as its ``checkpoint`` attribute)
+recording where in the input the next document may begin, how many documents
+came before it, and the settings of the run. Given that checkpoint,
+``process_stream(stream, resume_from=checkpoint)`` seeks to that position and
+elaborates the rest of the stream without reading anything before it; marks
+(and later checkpoints) are as if the whole stream had been read.
+
+A checkpoint is a ``namedtuple`` of plain values, so ``checkpoint._asdict()``
+can be stored (as JSON, say) and turned back into a checkpoint with
+``Checkpoint(**d)``.
+
+The ``offset`` of a checkpoint counts characters if the input is text, and
+bytes if it is binary (``bytes`` or a binary file), in which case
+``encoding`` names the encoding of the input. Binary input is read through a
+``DecodingReader``, which maps positions in the decoded text back to offsets
+in the input. A byte order mark is skipped by the ``DecodingReader``, so that
+marks count characters from the one after it with any ``Loader``.
+"""
+
+__all__ = ['Checkpoint', 'DecodingReader', 'ResumedParser']
+
+import codecs
+import io
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+
+from yaml.error import Mark, MarkedYAMLError
+
+
+Checkpoint = namedtuple('Checkpoint', ['offset', 'encoding', 'index', 'line',
+        'column', 'document', 'settings'])
+Checkpoint.__doc__ = """
+Position after a document: ``offset`` into the input (in characters, or in
+bytes of ``encoding`` if that is not ``None``), the same position as the
+``index``, ``line``, and ``column`` of a mark, the number of documents up to
+that point (``document``), and a dict of the elaborator settings of the run
+that have plain values.
+"""
+
+# Settings not saved in checkpoints.
+_unsaved_settings = ('parser', 'resolver', 'resumed_from')
+
+_plain_types = (type(None), bool, int, float, str)
+
+
+def _checkpoint_at(mark, document, settings):
+    # Checkpoint for the position of mark, after document documents.
+    reader = settings.checkpointing
+    if isinstance(reader, DecodingReader):
+        offset = reader.byte_offset(mark.index)
+        encoding = reader.encoding
+        reader.release(mark.index)
+    else:
+        offset = mark.index
+        encoding = None
+
+    saved = {}
+    for name, value in settings._asdict().items():
+        if name not in _unsaved_settings and isinstance(value, _plain_types):
+            saved[name] = value
+    saved['checkpointing'] = True
+
+    return Checkpoint(offset, encoding, mark.index, mark.line, mark.column,
+            document, saved)
+
+
+# Input
+
+def _is_binary(stream):
+    return isinstance(stream, bytes) or (not isinstance(stream, str)
+            and isinstance(stream.read(0), bytes))
+
+def _checkpointed_input(stream, checkpoint=None):
+    # What a Loader should read for checkpoints of stream to be taken: a
+    # DecodingReader for binary input, and stream itself otherwise. If
+    # checkpoint is given, the input is first moved to its offset; a text
+    # file, which cannot be seeked to a character offset, is read up to it.
+    if checkpoint is None:
+        if _is_binary(stream):
+            return DecodingReader(stream)
+        return stream
+
+    offset = checkpoint.offset
+    if _is_binary(stream):
+        if checkpoint.encoding is None:
+            raise ValueError("checkpoint of a text stream cannot be used "
+                    "with binary input")
+        if isinstance(stream, bytes):
+            stream = io.BytesIO(stream)
+        stream.seek(offset)
+        return DecodingReader(stream, checkpoint.encoding, offset,
+                checkpoint.index)
+
+    if checkpoint.encoding is not None:
+        raise ValueError("checkpoint of a binary stream cannot be used "
+                "with text input")
+    if isinstance(stream, str):
+        return stream[offset:]
+    while offset > 0:
+        skipped = stream.read(min(offset, DecodingReader.chunk_size))
+        if not skipped:
+            break
+        offset -= len(skipped)
+    return stream
+
+
+class DecodingReader(object):
+    """
+    Text stream for a YAML reader that decodes a binary ``stream``, and maps
+    the index of each character it has returned back to the offset of that
+    character's first byte in ``stream``.
+
+    Reading starts at ``offset`` (by default, the current position of
+    ``stream``), with the first character counted as ``index``. If
+    ``encoding`` is ``None``, it is found as PyYAML does: UTF-16 if the stream
+    starts with a UTF-16 byte order mark, and UTF-8 otherwise; a byte order
+    mark is skipped. ``stream`` may also be ``bytes``.
+
+    Offsets can be found for characters not yet released by ``release()``.
+    The text of recent reads is kept for this; older text is read again from
+    ``stream`` if it is seekable, and kept until released if not.
+    """
+
+    chunk_size = 65536
+
+    # Number of chunks of text kept when the stream is seekable.
+    _kept_chunks = 16
+
+    def __init__(self, stream, encoding=None, offset=None, index=0):
+        if isinstance(stream, bytes):
+            self.name = '<byte string>'
+            stream = io.BytesIO(stream)
+        else:
+            self.name = getattr(stream, 'name', '<file>')
+        self._stream = stream
+        self._seekable = bool(getattr(stream, 'seekable', None)
+                and stream.seekable())
+        if offset is None:
+            offset = stream.tell() if self._seekable else 0
+
+        self._head = b''
+        if encoding is None:
+            encoding, bom_size = self._detect_encoding()
+            offset += bom_size
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+
+        self._lock = threading.Lock()
+        # Bytes passed to the decoder, and bytes decoded, as offsets.
+        self._fed = offset
+        self._decoded = offset
+        self._index = index
+        # Index of the first character of each chunk of text read, and for
+        # each, [first byte offset, end byte offset, text or None].
+        self._starts = []
+        self._chunks = []
+
+    def _detect_encoding(self):
+        head = b''
+        while len(head) < 3:
+            data = self._stream.read(3 - len(head))
+            if not data:
+                break
+            head += data
+        if head.startswith(codecs.BOM_UTF16_LE):
+            encoding, bom_size = 'utf-16-le', 2
+        elif head.startswith(codecs.BOM_UTF16_BE):
+            encoding, bom_size = 'utf-16-be', 2
+        elif head.startswith(codecs.BOM_UTF8):
+            encoding, bom_size = 'utf-8', 3
+        else:
+            encoding, bom_size = 'utf-8', 0
+        self._head = head[bom_size:]
+        return encoding, bom_size
+
+    def read(self, size=-1):
+        with self._lock:
+            while True:
+                data = self._stream.read(size if size > 0 else
+                        self.chunk_size)
+                if self._head:
+                    data = self._head + data
+                    self._head = b''
+                final = not data
+                text = self._decoder.decode(data, final)
+                self._fed += len(data)
+                if text or final:
+                    break
+
+            if text:
+                start = self._decoded
+                self._decoded = self._fed - len(self._decoder.getstate()[0])
+                self._starts.append(self._index)
+                self._chunks.append([start, self._decoded, text])
+                self._index += len(text)
+                if self._seekable and len(self._chunks) > self._kept_chunks:
+                    self._chunks[-self._kept_chunks - 1][2] = None
+            return text
+
+    def byte_offset(self, index):
+        """
+        Returns the offset in the stream of the character at ``index``, or
+        of the end of the text read if ``index`` is just past it.
+        """
+        with self._lock:
+            if index >= self._index:
+                if index > self._index:
+                    raise ValueError("character %d has not been read" % index)
+                return self._decoded
+            i = bisect_right(self._starts, index) - 1
+            if i < 0:
+                raise ValueError("character %d has been released" % index)
+            start, end, text = self._chunks[i]
+            if text is None:
+                text = self._read_again(start, end)
+            prefix = text[:index - self._starts[i]]
+            return start + len(codecs.encode(prefix, self.encoding))
+
+    def release(self, index):
+        """
+        Drops what is kept for finding the offsets of characters before
+        ``index``.
+        """
+        with self._lock:
+            i = bisect_right(self._starts, index) - 1
+            if i > 0:
+                del self._starts[:i]
+                del self._chunks[:i]
+
+    def _read_again(self, start, end):
+        position = self._stream.tell()
+        try:
+            self._stream.seek(start)
+            data = self._stream.read(end - start)
+        finally:
+            self._stream.seek(position)
+        return codecs.decode(data, self.encoding)
+
+
+# Resumed parsing
+
+def _shift_error(error, index, line, column):
+    for attr in ('context_mark', 'problem_mark'):
+        mark = getattr(error, attr, None)
+        if mark is not None:
+            setattr(error, attr, _shift_mark(mark, index, line, column))
+
+def _shift_mark(mark, index, line, column):
+    if mark.line == 0:
+        column += mark.column
+    else:
+        column = mark.column
+    return Mark(mark.name, mark.index + index, mark.line + line, column,
+            None, None)
+
+class ResumedParser(object):
+    """
+    Presents the events of ``parser``, which parses the input from the
+    position of ``checkpoint`` on, with marks moved to that position (as are
+    the marks of a ``MarkedYAMLError`` it raises).
+    """
+
+    def __init__(self, parser, checkpoint):
+        self._parser = parser
+        self._index = checkpoint.index
+        self._line = checkpoint.line
+        self._column = checkpoint.column
+        self._last = None
+
+    def _shifted(self, event):
+        if event is not None and event is not self._last:
+            index, line, column = self._index, self._line, self._column
+            start_mark = event.start_mark
+            end_mark = event.end_mark
+            if start_mark is not None:
+                event.start_mark = _shift_mark(start_mark, index, line,
+                        column)
+            if end_mark is start_mark:
+                event.end_mark = event.start_mark
+            elif end_mark is not None:
+                event.end_mark = _shift_mark(end_mark, index, line, column)
+            self._last = event
+        return event
+
+    def peek_event(self):
+        try:
+            return self._shifted(self._parser.peek_event())
+        except MarkedYAMLError as e:
+            _shift_error(e, self._index, self._line, self._column)
+            raise
+
+    def check_event(self, *choices):
+        try:
+            return self._parser.check_event(*choices)
+        except MarkedYAMLError as e:
+            _shift_error(e, self._index, self._line, self._column)
+            raise
+
+    def get_event(self):
+        try:
+            return self._shifted(self._parser.get_event())
+        except MarkedYAMLError as e:
+            _shift_error(e, self._index, self._line, self._column)
+            raise
@@ -0,0 +1,348 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Columnar extraction of record sequences.
+
+Much YAML data is a sequence of flat mappings ("records"). ``extract_columns``
+reads such a sequence from a flat stream of elaborated events and fills one
+typed buffer per requested column straight from the ``ScalarEvent`` values and
+their resolved tags, without building a dict (or any other object) per record.
+The rows are produced in row groups of a fixed number of records.
+
+A column has one of these types:
+
+-   ``'int'``: ``int`` scalars, in an ``array.array('q')``.
+-   ``'float'``: ``int`` or ``float`` scalars, in an ``array.array('d')``.
+-   ``'bool'``: ``bool`` scalars, in an ``array.array('b')``.
+-   ``'str'``: the text of any scalar, in a list.
+
+A ``null`` scalar, or a key missing from a record, is a null: its slot in the
+values holds ``0``, ``0.0``, ``False``, or ``None``, and its slot in the null
+mask (a ``bytearray``) holds 1. If NumPy is installed, values other than
+strings, and null masks, are given as NumPy arrays instead. Keys of a record
+that are not columns are skipped, whatever their values. A value of the wrong
+type or out of the range of its column, a collection or alias in a column, a
+record that is not a mapping, or a key given twice in a record raises
+``ColumnarError``.
+"""
+
+__all__ = ['extract_columns', 'RowGroup', 'Column', 'ColumnarError']
+
+from array import array
+from collections import namedtuple
+
+from yaml.error import MarkedYAMLError
+from yaml.events import (DocumentStartEvent, SequenceStartEvent,
+        SequenceEndEvent, MappingStartEvent, MappingEndEvent, AliasEvent,
+        ScalarEvent)
+
+from .events import ExtendedEvent
+from .packing import simple_number_kind
+from .scalars import construct_scalar_value
+
+_null_tag = 'tag:yaml.org,2002:null'
+_bool_tag = 'tag:yaml.org,2002:bool'
+_int_tag = 'tag:yaml.org,2002:int'
+_float_tag = 'tag:yaml.org,2002:float'
+
+
+RowGroup = namedtuple('RowGroup', ['start', 'size', 'columns'])
+RowGroup.__doc__ = """
+``size`` records starting at record ``start`` (0-based, counted across the
+sequence) of a record sequence. ``columns`` is a dict from each column name
+to its ``Column``.
+"""
+
+Column = namedtuple('Column', ['values', 'nulls'])
+Column.__doc__ = """
+The values of one column in a row group, and its null mask (1 or true where
+the value is null or missing).
+"""
+
+
+class ColumnarError(MarkedYAMLError):
+    pass
+
+def _err_column_value(problem, mark):
+    return ColumnarError(None, None, problem, mark)
+
+
+# Column buffers
+
+class _ColumnBuffer(object):
+    # Values and null mask of one column in the current row group.
+    typecode = None
+    null_value = None
+
+    def __init__(self, name):
+        self.name = name
+        self.clear()
+
+    def clear(self):
+        if self.typecode is None:
+            self.values = []
+        else:
+            self.values = array(self.typecode)
+        self.nulls = bytearray()
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def add(self, event):
+        tag = event.tag
+        if tag == _null_tag:
+            self.add_null()
+            return
+        try:
+            self.values.append(self.convert(tag, event.value,
+                    event.start_mark))
+        except OverflowError:
+            raise _err_column_value("value %s is out of range of %s column "
+                    "%r" % (event.value, self.kind, self.name),
+                    event.start_mark)
+        self.nulls.append(0)
+
+    def add_null(self):
+        self.values.append(self.null_value)
+        self.nulls.append(1)
+
+    def _mismatch(self, tag, mark):
+        return _err_column_value("cannot store a value tagged %s in %s "
+                "column %r" % (tag, self.kind, self.name), mark)
+
+    def column(self):
+        # The buffers as a Column, then new empty buffers.
+        values, nulls = self.values, self.nulls
+        self.clear()
+        try:
+            import numpy
+        except ImportError:
+            return Column(values, nulls)
+        if self.typecode is not None:
+            values = numpy.frombuffer(values, dtype=self.dtype)
+        return Column(values, numpy.frombuffer(nulls, dtype=numpy.bool_))
+
+class _IntBuffer(_ColumnBuffer):
+    kind = 'int'
+    typecode = 'q'
+    dtype = 'int64'
+    null_value = 0
+
+    def convert(self, tag, text, mark):
+        if tag != _int_tag:
+            raise self._mismatch(tag, mark)
+        if simple_number_kind(text) == 'int':
+            return int(text)
+        return construct_scalar_value(tag, text)
+
+class _FloatBuffer(_ColumnBuffer):
+    kind = 'float'
+    typecode = 'd'
+    dtype = 'float64'
+    null_value = 0.0
+
+    def convert(self, tag, text, mark):
+        if tag == _float_tag or tag == _int_tag:
+            if simple_number_kind(text) is not None:
+                return float(text)
+            return float(construct_scalar_value(tag, text))
+        raise self._mismatch(tag, mark)
+
+class _BoolBuffer(_ColumnBuffer):
+    kind = 'bool'
+    typecode = 'b'
+    dtype = 'bool'
+    null_value = False
+
+    def convert(self, tag, text, mark):
+        if tag != _bool_tag:
+            raise self._mismatch(tag, mark)
+        return construct_scalar_value(tag, text)
+
+class _StrBuffer(_ColumnBuffer):
+    kind = 'str'
+
+    def convert(self, tag, text, mark):
+        return str(text)
+
+_buffer_types = {
+        'int': _IntBuffer,
+        'float': _FloatBuffer,
+        'bool': _BoolBuffer,
+        'str': _StrBuffer,
+        }
+
+
+# Extraction
+
+def _core_events(events):
+    for ee in events:
+        if not isinstance(ee, ExtendedEvent):
+            yield ee
+
+def _skip_value(events, event):
+    # Consume the rest of the value that starts with event.
+    if not isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+        return
+    depth = 1
+    for ee in events:
+        if isinstance(ee, (SequenceStartEvent, MappingStartEvent)):
+            depth += 1
+        elif isinstance(ee, (SequenceEndEvent, MappingEndEvent)):
+            depth -= 1
+            if depth == 0:
+                return
+
+def _path_matches(path, target):
+    if len(path) != len(target):
+        return False
+    if target[0] is not None and path[0] != target[0]:
+        return False
+    return tuple(path[1:]) == tuple(target[1:])
+
+class _Extractor(object):
+    def __init__(self, columns, row_group_size):
+        if isinstance(columns, dict):
+            columns = columns.items()
+        self._buffers = []
+        self._by_key = {}
+        for name, kind in columns:
+            try:
+                buffer_type = _buffer_types[kind]
+            except KeyError:
+                raise ValueError("unknown column type %r" % (kind,))
+            column_buffer = buffer_type(name)
+            self._buffers.append(column_buffer)
+            self._by_key[name] = column_buffer
+        self._row_group_size = row_group_size
+        self._start = 0
+
+    def records(self, events):
+        # Reads the records of a sequence whose start event has been read,
+        # yielding full row groups, then the last partial one.
+        row = 0
+        for ee in events:
+            if isinstance(ee, SequenceEndEvent):
+                break
+            if not isinstance(ee, MappingStartEvent):
+                raise _err_column_value("expected a record mapping, found %s"
+                        % type(ee).__name__, ee.start_mark)
+            self._record(events, row)
+            row += 1
+            if row == self._row_group_size:
+                yield self._row_group(row)
+                row = 0
+        if row:
+            yield self._row_group(row)
+        self._start = 0
+
+    def _record(self, events, row):
+        by_key = self._by_key
+        for key_event in events:
+            if isinstance(key_event, MappingEndEvent):
+                break
+            column_buffer = None
+            if isinstance(key_event, ScalarEvent):
+                column_buffer = by_key.get(str(key_event.value))
+            else:
+                _skip_value(events, key_event)
+            value_event = next(events)
+
+            if column_buffer is None:
+                _skip_value(events, value_event)
+                continue
+            if len(column_buffer) > row:
+                raise _err_column_value("duplicate key %r in record"
+                        % column_buffer.name, key_event.start_mark)
+            if not isinstance(value_event, ScalarEvent):
+                raise _err_column_value("expected a scalar in column %r, "
+                        "found %s" % (column_buffer.name,
+                            type(value_event).__name__),
+                        value_event.start_mark)
+            column_buffer.add(value_event)
+
+        for column_buffer in self._buffers:
+            if len(column_buffer) == row:
+                column_buffer.add_null()
+
+    def _row_group(self, size):
+        columns = dict((column_buffer.name, column_buffer.column())
+                for column_buffer in self._buffers)
+        group = RowGroup(self._start, size, columns)
+        self._start += size
+        return group
+
+def extract_columns(events, path, columns, row_group_size=65536):
+    """
+    Reads the record sequence at ``path`` from a flat stream of elaborated
+    ``events`` (see ``yaml_elaborate.columnar``), yielding a ``RowGroup`` for
+    every ``row_group_size`` records and one for any remaining records.
+
+    ``path`` is a tuple of the 0-based document index (or ``None`` for every
+    document) followed by the mapping keys and sequence indices leading to
+    the sequence, as in ``yaml_elaborate.diff``; ``(0,)`` is the root of the
+    first document. ``columns`` is a dict, or a sequence of pairs, from the
+    key of each column in the records to its type.
+    """
+    target = tuple(path)
+    extractor = _Extractor(columns, row_group_size)
+    events = _core_events(events)
+
+    document_index = -1
+    # Path to the current collection, and for each open collection, whether
+    # it is a mapping, whether a key is expected, the last key, and the
+    # number of values read.
+    path = []
+    frames = []
+    for ee in events:
+        if isinstance(ee, DocumentStartEvent):
+            document_index += 1
+            continue
+        if not isinstance(ee, (ScalarEvent, AliasEvent, SequenceStartEvent,
+                MappingStartEvent, SequenceEndEvent, MappingEndEvent)):
+            continue
+
+        if isinstance(ee, (SequenceEndEvent, MappingEndEvent)):
+            frames.pop()
+            path.pop()
+        else:
+            if not frames:
+                component = document_index
+            else:
+                frame = frames[-1]
+                if not frame[0]:
+                    component = frame[3]
+                elif frame[1]:
+                    component = None
+                    frame[2] = ee.value if isinstance(ee,
+                            ScalarEvent) else None
+                else:
+                    component = frame[2]
+
+            depth = len(path) + 1
+            if isinstance(ee, SequenceStartEvent) and _path_matches(
+                    path + [component], target):
+                for group in extractor.records(events): yield group
+            elif isinstance(ee, (SequenceStartEvent, MappingStartEvent)):
+                if depth < len(target) and component is not None and (
+                        _path_matches(path + [component], target[:depth])):
+                    frames.append([isinstance(ee, MappingStartEvent), True,
+                            None, 0])
+                    path.append(component)
+                    continue
+                _skip_value(events, ee)
+
+        # A value has ended; advance its parent.
+        if frames:
+            frame = frames[-1]
+            if frame[0]:
+                frame[1] = not frame[1]
+            if not frame[0] or frame[1]:
+                frame[3] += 1
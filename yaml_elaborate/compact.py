@@ -0,0 +1,334 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Compact storage for fully composed documents.
+
+A ``CompactTree`` holds the nodes of one document in pre-order as parallel
+arrays (kind, interned tag, value, style, marks, and the position just past
+each node's last descendant) instead of as PyYAML ``Node`` objects. Node
+objects are only created on demand, as views: ``CompactScalarNode``,
+``CompactSequenceNode``, and ``CompactMappingNode`` subclass the
+corresponding PyYAML node classes, so resolvers (including path resolvers)
+and other code checking node types and attributes work with them unchanged.
+A view reads its attributes from the tree each time they are accessed,
+except that ``value`` of a collection view is a list of child views built when
+first read and then kept by the view. Code that changes a node in place, such
+as the merge key (``<<``) handling of PyYAML's constructors, which removes
+pairs from ``value`` and assigns ``value`` and ``tag``, changes only the view
+and not the tree.
+
+A tree may also keep key indexes of its mappings (see ``index_keys()``), with
+which ``CompactMappingNode.get()`` finds a value without scanning the pairs.
+
+Marks are stored as integers and recreated without the source buffer, so
+``get_snippet()`` of a recreated mark returns ``None``.
+"""
+
+__all__ = ['CompactTree', 'CompactScalarNode', 'CompactSequenceNode',
+        'CompactMappingNode']
+
+from array import array
+
+from yaml.error import Mark
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+
+from .indexing import index_key
+
+_SCALAR = 0
+_SEQUENCE = 1
+_MAPPING = 2
+_ALIAS = 3
+
+# Scalar styles and collection flow styles, stored as small integers.
+_style_codes = {None: 0, '': 1, "'": 2, '"': 3, '|': 4, '>': 5}
+_styles = (None, '', "'", '"', '|', '>')
+_flow_style_codes = {None: 0, True: 1, False: 2}
+_flow_styles = (None, True, False)
+
+_no_mark = -1
+
+_str_tag = 'tag:yaml.org,2002:str'
+
+
+class CompactTree(object):
+    """
+    Array-backed storage for the nodes of a single document. Nodes are
+    appended in pre-order: a collection is started, its children are added,
+    and then it is finished.
+    """
+
+    def __init__(self):
+        self.name = None
+        self._kinds = bytearray()
+        self._styles = bytearray()
+        self._tags = array('l')
+        self._tag_table = []
+        self._tag_ids = {}
+        self._values = []
+        self._ends = array('l')
+        # Start index, line, column, then end index, line, column.
+        self._marks = array('q')
+        self._key_indexes = {}
+
+    def __len__(self):
+        return len(self._kinds)
+
+    @property
+    def root(self):
+        """
+        View of the first node, or ``None`` if the tree is empty.
+        """
+        if not self._kinds:
+            return None
+        return self.node(0)
+
+    def add_scalar(self, tag, value, start_mark, end_mark, style=None):
+        """
+        Adds a scalar node, returning its view.
+        """
+        index = self._add(_SCALAR, tag, value, _style_codes[style],
+                start_mark, end_mark)
+        self._ends.append(index + 1)
+        return CompactScalarNode(self, index)
+
+    def start_sequence(self, tag, start_mark, flow_style=None):
+        """
+        Starts a sequence node, returning its view. Its elements are the
+        nodes added before it is finished.
+        """
+        index = self._start(_SEQUENCE, tag, start_mark, flow_style)
+        return CompactSequenceNode(self, index)
+
+    def start_mapping(self, tag, start_mark, flow_style=None):
+        """
+        Starts a mapping node, returning its view. Its keys and values are the
+        nodes added, alternately, before it is finished.
+        """
+        index = self._start(_MAPPING, tag, start_mark, flow_style)
+        return CompactMappingNode(self, index)
+
+    def finish(self, node, end_mark):
+        """
+        Finishes the collection node whose view is ``node``.
+        """
+        index = node._index
+        self._ends[index] = len(self._kinds)
+        self._set_mark(index * 6 + 3, end_mark)
+
+    def add_alias(self, target, start_mark, end_mark):
+        """
+        Adds a reference to the already added node whose view is ``target``,
+        returning the view of that node.
+        """
+        index = self._add(_ALIAS, None, target._index, 0, start_mark,
+                end_mark)
+        self._ends.append(index + 1)
+        return target
+
+    def index_keys(self, node):
+        """
+        Returns a new, empty key index for the mapping whose view is
+        ``node``, to be filled in by the caller with the position of the key
+        of each pair, by the key's index key (see ``yaml_elaborate.indexing``).
+        """
+        key_index = self._key_indexes[node._index] = {}
+        return key_index
+
+    def start_mark(self, index):
+        """
+        Returns the start mark of the node (or alias) at ``index``.
+        """
+        return self._mark(index * 6)
+
+    def node(self, index):
+        """
+        Returns a view of the node at ``index``. The view of an alias is a
+        view of the node it refers to.
+        """
+        kind = self._kinds[index]
+        if kind == _ALIAS:
+            index = self._values[index]
+            kind = self._kinds[index]
+        return _view_types[kind](self, index)
+
+    def children(self, index):
+        """
+        Yields the positions of the children of the collection at ``index``.
+        """
+        ends = self._ends
+        child = index + 1
+        end = ends[index]
+        while child < end:
+            yield child
+            child = ends[child]
+
+    def _start(self, kind, tag, start_mark, flow_style):
+        index = self._add(kind, tag, None, _flow_style_codes[flow_style],
+                start_mark, None)
+        self._ends.append(index + 1)
+        return index
+
+    def _add(self, kind, tag, value, style_code, start_mark, end_mark):
+        index = len(self._kinds)
+        self._kinds.append(kind)
+        self._styles.append(style_code)
+        self._tags.append(self._tag_id(tag))
+        self._values.append(value)
+        self._marks.extend((_no_mark,) * 6)
+        self._set_mark(index * 6, start_mark)
+        self._set_mark(index * 6 + 3, end_mark)
+        return index
+
+    def _tag_id(self, tag):
+        try:
+            return self._tag_ids[tag]
+        except KeyError:
+            tag_id = len(self._tag_table)
+            self._tag_table.append(tag)
+            self._tag_ids[tag] = tag_id
+            return tag_id
+
+    def _set_mark(self, offset, mark):
+        if mark is None:
+            return
+        if self.name is None:
+            self.name = mark.name
+        marks = self._marks
+        marks[offset] = mark.index
+        marks[offset + 1] = mark.line
+        marks[offset + 2] = mark.column
+
+    def _mark(self, offset):
+        marks = self._marks
+        if marks[offset] == _no_mark:
+            return None
+        return Mark(self.name, marks[offset], marks[offset + 1],
+                marks[offset + 2], None, None)
+
+
+# Views
+
+class _CompactNodeView(object):
+    # Mixin for node views. Attributes are read from the tree; the
+    # constructors of the PyYAML node classes are bypassed.
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def tag(self):
+        try:
+            return self._tag
+        except AttributeError:
+            tree = self._tree
+            return tree._tag_table[tree._tags[self._index]]
+
+    @tag.setter
+    def tag(self, tag):
+        self._tag = tag
+
+    @property
+    def start_mark(self):
+        return self._tree._mark(self._index * 6)
+
+    @property
+    def end_mark(self):
+        return self._tree._mark(self._index * 6 + 3)
+
+    def __eq__(self, other):
+        return (isinstance(other, _CompactNodeView)
+                and self._tree is other._tree and self._index == other._index)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+
+class CompactScalarNode(_CompactNodeView, ScalarNode):
+    """
+    View of a scalar node in a ``CompactTree``.
+    """
+
+    @property
+    def value(self):
+        return self._tree._values[self._index]
+
+    @property
+    def style(self):
+        return _styles[self._tree._styles[self._index]]
+
+class _CompactCollectionNode(_CompactNodeView):
+    @property
+    def flow_style(self):
+        return _flow_styles[self._tree._styles[self._index]]
+
+    @property
+    def value(self):
+        try:
+            return self._value
+        except AttributeError:
+            value = self._value = self._children()
+            return value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+class CompactSequenceNode(_CompactCollectionNode, SequenceNode):
+    """
+    View of a sequence node in a ``CompactTree``.
+    """
+
+    def _children(self):
+        tree = self._tree
+        return [tree.node(child) for child in tree.children(self._index)]
+
+class CompactMappingNode(_CompactCollectionNode, MappingNode):
+    """
+    View of a mapping node in a ``CompactTree``.
+    """
+
+    def _children(self):
+        tree = self._tree
+        nodes = [tree.node(child) for child in tree.children(self._index)]
+        return list(zip(nodes[0::2], nodes[1::2]))
+
+    @property
+    def key_index(self):
+        return self._tree._key_indexes.get(self._index)
+
+    def get(self, key, default=None, tag=_str_tag):
+        """
+        Returns the view of the value node of the last pair whose key equals
+        ``key``, a node or scalar text to be taken as having ``tag``, or
+        ``default`` if there is none. Without a key index, the pairs are
+        scanned.
+        """
+        tree = self._tree
+        key = index_key(key, tag)
+        if key is None:
+            return default
+        key_index = self.key_index
+        if key_index is not None:
+            position = key_index.get(key)
+        else:
+            position = None
+            children = tree.children(self._index)
+            for child in children:
+                if index_key(tree.node(child)) == key:
+                    position = child
+                next(children)
+        if position is None:
+            return default
+        return tree.node(tree._ends[position])
+
+_view_types = (CompactScalarNode, CompactSequenceNode, CompactMappingNode)
@@ -0,0 +1,301 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Construction of native Python data directly from elaborated events.
+
+``EventConstructor`` builds the same values as ``yaml.safe_load()`` (dicts,
+lists, sets, lists of pairs, and the standard scalar types, including merge
+keys and recursive structures) from the events produced by the elaborator,
+one document at a time, without composing ``Node`` objects. It relies on the
+tags already resolved by the elaborator, so ``resolving_tags`` must be left
+on. Extra events are ignored, so the same event stream can be handled by
+other consumers as it is fed to the constructor.
+"""
+
+__all__ = ['EventConstructor', 'construct_documents']
+
+from yaml.constructor import ConstructorError
+from yaml.events import (DocumentStartEvent, DocumentEndEvent,
+        SequenceStartEvent, SequenceEndEvent,
+        MappingStartEvent, MappingEndEvent,
+        AliasEvent, ScalarEvent)
+
+from .scalars import construct_scalar_value
+
+_str_tag = 'tag:yaml.org,2002:str'
+_value_tag = 'tag:yaml.org,2002:value'
+_merge_tag = 'tag:yaml.org,2002:merge'
+
+
+def _err_undefined_tag(tag, start_mark):
+    return ConstructorError(None, None,
+            "could not determine a constructor for the tag %r" % tag,
+            start_mark)
+
+def _err_unhashable_key(start_mark, key_mark):
+    return ConstructorError("while constructing a mapping", start_mark,
+            "found unhashable key", key_mark)
+
+def _err_bad_merge(start_mark, found, value_mark):
+    return ConstructorError("while constructing a mapping", start_mark,
+            "expected a mapping or list of mappings for merging, but found %s"
+            % found, value_mark)
+
+def _err_bad_pair(context, start_mark, found, value_mark):
+    return ConstructorError(context, start_mark,
+            "expected a mapping of length 1, but found %s" % found,
+            value_mark)
+
+
+# Frames for collections under construction. ``add()`` receives each
+# completed child along with its tag and start mark.
+
+class _SequenceFrame(object):
+    def __init__(self, value, start_mark):
+        self.value = value
+        self.start_mark = start_mark
+
+    def expects_key(self):
+        return False
+
+    def add(self, value, tag, mark):
+        self.value.append(value)
+
+    def finish(self):
+        pass
+
+class _PairsFrame(_SequenceFrame):
+    # !!omap and !!pairs: a sequence of single-pair mappings becoming a list
+    # of tuples.
+    def __init__(self, value, start_mark, context):
+        super(_PairsFrame, self).__init__(value, start_mark)
+        self.context = context
+
+    def add(self, value, tag, mark):
+        if isinstance(value, dict):
+            value = list(value.items())
+        elif not isinstance(value, _PairList):
+            raise _err_bad_pair(self.context, self.start_mark,
+                    type(value).__name__, mark)
+        if len(value) != 1:
+            raise _err_bad_pair(self.context, self.start_mark,
+                    "a mapping of length %d" % len(value), mark)
+        self.value.append(value[0])
+
+class _PairList(list):
+    # Pairs of an unanchored mapping that is an element of !!omap or !!pairs;
+    # its keys need not be hashable.
+    pass
+
+class _PairListFrame(object):
+    def __init__(self, start_mark):
+        self.value = _PairList()
+        self.start_mark = start_mark
+        self._key = None
+        self._has_key = False
+
+    def expects_key(self):
+        return not self._has_key
+
+    def add(self, value, tag, mark):
+        if self._has_key:
+            self.value.append((self._key, value))
+            self._key = None
+            self._has_key = False
+        else:
+            self._key = value
+            self._has_key = True
+
+    def finish(self):
+        pass
+
+class _MappingFrame(object):
+    def __init__(self, value, start_mark):
+        self.value = value
+        self.start_mark = start_mark
+        self._pairs = []
+        self._merged = []
+        self._key = None
+        self._key_tag = None
+        self._key_mark = None
+        self._has_key = False
+
+    def expects_key(self):
+        return not self._has_key
+
+    def add(self, value, tag, mark):
+        if not self._has_key:
+            self._key = value
+            self._key_tag = tag
+            self._key_mark = mark
+            self._has_key = True
+            return
+
+        self._has_key = False
+        if self._key_tag == _merge_tag:
+            self._merge(value, mark)
+            return
+
+        key = self._key
+        try:
+            hash(key)
+        except TypeError:
+            raise _err_unhashable_key(self.start_mark, self._key_mark)
+        self._pairs.append((key, value))
+
+    def _merge(self, value, mark):
+        # As in SafeConstructor.flatten_mapping(), a later mapping in a merged
+        # list is overridden by an earlier one, and all merged pairs are
+        # overridden by the mapping's own pairs.
+        if isinstance(value, dict):
+            self._merged.extend(value.items())
+        elif isinstance(value, list):
+            for submapping in value:
+                if not isinstance(submapping, dict):
+                    raise ConstructorError("while constructing a mapping",
+                            self.start_mark,
+                            "expected a mapping for merging, but found %s"
+                            % type(submapping).__name__, mark)
+            for submapping in reversed(value):
+                self._merged.extend(submapping.items())
+        else:
+            raise _err_bad_merge(self.start_mark, type(value).__name__,
+                    mark)
+
+    def finish(self):
+        value = self.value
+        for k, v in self._merged:
+            value[k] = v
+        for k, v in self._pairs:
+            value[k] = v
+
+class _SetFrame(_MappingFrame):
+    def finish(self):
+        for k, v in self._merged:
+            self.value.add(k)
+        for k, v in self._pairs:
+            self.value.add(k)
+
+
+class EventConstructor(object):
+    """
+    Constructs Python data from elaborated events passed to ``feed()`` one
+    at a time. After the ``DocumentEndEvent`` of each document has been fed,
+    ``data`` holds the value of that document.
+    """
+
+    def __init__(self):
+        self.data = None
+        self._frames = []
+        self._anchors = {}
+
+    def feed(self, event):
+        """
+        Accepts the next event. Returns true if the event completed a
+        document, whose value is then available as ``data``.
+        """
+        if isinstance(event, ScalarEvent):
+            self._feed_scalar(event)
+        elif isinstance(event, SequenceStartEvent):
+            self._start_sequence(event)
+        elif isinstance(event, MappingStartEvent):
+            self._start_mapping(event)
+        elif isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+            frame = self._frames.pop()
+            packed_values = getattr(event, 'packed_values', None)
+            if packed_values is not None and not frame.value:
+                # The element events were withheld.
+                for value in packed_values.tolist():
+                    frame.add(value, None, event.start_mark)
+            frame.finish()
+            self._complete(frame.value, None, frame.start_mark)
+        elif isinstance(event, AliasEvent):
+            self._complete(self._anchors[event.anchor], None,
+                    event.start_mark)
+        elif isinstance(event, DocumentStartEvent):
+            self.data = None
+            self._frames = []
+            self._anchors = {}
+        elif isinstance(event, DocumentEndEvent):
+            self._anchors = {}
+            return True
+        return False
+
+    def _feed_scalar(self, event):
+        tag = event.tag
+        if (tag == _value_tag and self._frames
+                and self._frames[-1].expects_key()):
+            tag = _str_tag
+
+        if tag == _merge_tag:
+            # Only meaningful as a key; the frame checks the tag.
+            value = event.value
+        else:
+            try:
+                value = construct_scalar_value(tag, event.value,
+                        event.start_mark, event.end_mark)
+            except KeyError:
+                raise _err_undefined_tag(tag, event.start_mark)
+
+        self._set_anchor(event, value)
+        self._complete(value, tag, event.start_mark)
+
+    def _start_sequence(self, event):
+        tag = event.tag
+        if tag == 'tag:yaml.org,2002:seq':
+            frame = _SequenceFrame([], event.start_mark)
+        elif tag == 'tag:yaml.org,2002:omap':
+            frame = _PairsFrame([], event.start_mark,
+                    "while constructing an ordered map")
+        elif tag == 'tag:yaml.org,2002:pairs':
+            frame = _PairsFrame([], event.start_mark,
+                    "while constructing pairs")
+        else:
+            raise _err_undefined_tag(tag, event.start_mark)
+
+        self._set_anchor(event, frame.value)
+        self._frames.append(frame)
+
+    def _start_mapping(self, event):
+        tag = event.tag
+        parent = self._frames[-1] if self._frames else None
+        if tag == 'tag:yaml.org,2002:map':
+            if isinstance(parent, _PairsFrame) and event.anchor is None:
+                frame = _PairListFrame(event.start_mark)
+            else:
+                frame = _MappingFrame({}, event.start_mark)
+        elif tag == 'tag:yaml.org,2002:set':
+            frame = _SetFrame(set(), event.start_mark)
+        else:
+            raise _err_undefined_tag(tag, event.start_mark)
+
+        self._set_anchor(event, frame.value)
+        self._frames.append(frame)
+
+    def _set_anchor(self, event, value):
+        if event.anchor is not None:
+            self._anchors[event.anchor] = value
+
+    def _complete(self, value, tag, mark):
+        if self._frames:
+            self._frames[-1].add(value, tag, mark)
+        else:
+            self.data = value
+
+
+def construct_documents(events):
+    """
+    Yields the constructed value of each document in a flat stream of
+    elaborated events.
+    """
+    constructor = EventConstructor()
+    for event in events:
+        if constructor.feed(event):
+            yield constructor.data
@@ -0,0 +1,381 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Streaming comparison of two YAML streams.
+
+Both streams are elaborated in lockstep (with extra events, content hashes,
+and expanded aliases) and compared node by node, so neither stream is ever
+loaded as a whole. Differences are reported by path: a tuple whose first item
+is the 0-based document index, followed by the sequence index (from
+``ElementStartEvent``) or mapping key of each enclosing node. A mapping key is
+given as its scalar value, or as its content hash (see
+``yaml_elaborate.hashing``) if the key is not a scalar.
+"""
+
+__all__ = ['Difference', 'diff_streams', 'streams_equal']
+
+from collections import namedtuple
+
+import yaml
+from yaml.events import (SequenceStartEvent, SequenceEndEvent,
+        MappingStartEvent, MappingEndEvent, ScalarEvent)
+
+from .elaborator import (Elaborator, ElaboratorSettings,
+        _err_limit_exceeded)
+
+
+Difference = namedtuple('Difference', ['kind', 'path', 'a_mark', 'b_mark'])
+Difference.__doc__ = """
+A single difference between two streams. ``kind`` is ``'added'`` (present
+only in the second stream), ``'removed'`` (present only in the first stream),
+or ``'changed'`` (present in both with a different tag, kind, or value).
+``a_mark`` and ``b_mark`` are the start marks of the node in each stream, or
+``None`` where it is absent.
+"""
+
+def _added(path, b_mark):
+    return Difference('added', path, None, b_mark)
+
+def _removed(path, a_mark):
+    return Difference('removed', path, a_mark, None)
+
+def _changed(path, a_mark, b_mark):
+    return Difference('changed', path, a_mark, b_mark)
+
+
+class _Cursor(object):
+    # Peekable iterator over events. peek() and next() return None at the
+    # end.
+    def __init__(self, events):
+        self._events = iter(events)
+        self._peeked = None
+        self._has_peeked = False
+
+    def peek(self):
+        if not self._has_peeked:
+            self._peeked = next(self._events, None)
+            self._has_peeked = True
+        return self._peeked
+
+    def next(self):
+        event = self.peek()
+        self._has_peeked = False
+        self._peeked = None
+        return event
+
+    def close(self):
+        close = getattr(self._events, 'close', None)
+        if close is not None:
+            close()
+
+def _is_start(event):
+    return isinstance(event, (SequenceStartEvent, MappingStartEvent))
+
+def _is_end(event):
+    return isinstance(event, (SequenceEndEvent, MappingEndEvent))
+
+def _read_value(cursor):
+    # Consume the events of one node and return them as a list.
+    events = []
+    depth = 0
+    while True:
+        event = cursor.next()
+        events.append(event)
+        if _is_start(event):
+            depth += 1
+        elif _is_end(event):
+            depth -= 1
+        if depth == 0 and not _is_start(event):
+            return events
+
+def _skip_value(cursor):
+    # Consume the events of one node.
+    depth = 0
+    while True:
+        event = cursor.next()
+        if _is_start(event):
+            depth += 1
+        elif _is_end(event):
+            depth -= 1
+        if depth == 0 and not _is_start(event):
+            return
+
+class _Key(object):
+    # A mapping key read from a pair.
+    def __init__(self, events):
+        self.events = events
+        self.content_hash = events[-1].content_hash
+        self.start_mark = events[0].start_mark
+        if len(events) == 1 and isinstance(events[0], ScalarEvent):
+            self.component = events[0].value
+        else:
+            self.component = self.content_hash
+
+def _read_key(cursor):
+    # Consume a pair up to and including its PairValueStartEvent.
+    cursor.next() # PairStartEvent
+    cursor.next() # PairKeyStartEvent
+    key = _Key(_read_value(cursor))
+    cursor.next() # PairKeyEndEvent
+    cursor.next() # PairValueStartEvent
+    return key
+
+def _finish_pair(cursor):
+    cursor.next() # PairValueEndEvent
+    cursor.next() # PairEndEvent
+
+
+class _StreamComparer(object):
+    def __init__(self, ignoring_key_order, max_buffered_events):
+        self._ignoring_key_order = ignoring_key_order
+        self._max_buffered_events = max_buffered_events
+        self._buffered_events = 0
+
+    def compare_streams(self, ca, cb):
+        index = 0
+        while ca.peek() is not None or cb.peek() is not None:
+            path = (index,)
+            if cb.peek() is None:
+                yield _removed(path, ca.peek().start_mark)
+                self._skip_document(ca)
+            elif ca.peek() is None:
+                yield _added(path, cb.peek().start_mark)
+                self._skip_document(cb)
+            else:
+                ca.next() # DocumentStartEvent
+                cb.next()
+                for d in self.compare_values(ca, cb, path): yield d
+                ca.next() # DocumentEndEvent
+                cb.next()
+            index += 1
+
+    def _skip_document(self, cursor):
+        cursor.next()
+        _skip_value(cursor)
+        cursor.next()
+
+    def compare_values(self, ca, cb, path):
+        ea = ca.peek()
+        eb = cb.peek()
+
+        if type(ea) is not type(eb) or ea.tag != eb.tag:
+            # Reported before the subtrees are read, in case the caller
+            # stops at the first difference.
+            yield _changed(path, ea.start_mark, eb.start_mark)
+            _skip_value(ca)
+            _skip_value(cb)
+        elif isinstance(ea, SequenceStartEvent):
+            for d in self._compare_sequences(ca, cb, path): yield d
+        elif isinstance(ea, MappingStartEvent):
+            for d in self._compare_mappings(ca, cb, path): yield d
+        else:
+            ca.next()
+            cb.next()
+            if ea.content_hash != eb.content_hash:
+                yield _changed(path, ea.start_mark, eb.start_mark)
+
+    def _compare_sequences(self, ca, cb, path):
+        ca.next() # SequenceStartEvent
+        cb.next()
+
+        while True:
+            a_more = not isinstance(ca.peek(), SequenceEndEvent)
+            b_more = not isinstance(cb.peek(), SequenceEndEvent)
+
+            if a_more and b_more:
+                index = ca.next().index
+                cb.next()
+                for d in self.compare_values(ca, cb, path + (index,)):
+                    yield d
+                ca.next()
+                cb.next()
+            elif a_more:
+                index = ca.next().index
+                yield _removed(path + (index,), ca.peek().start_mark)
+                _skip_value(ca)
+                ca.next()
+            elif b_more:
+                index = cb.next().index
+                yield _added(path + (index,), cb.peek().start_mark)
+                _skip_value(cb)
+                cb.next()
+            else:
+                break
+
+        ca.next() # SequenceEndEvent
+        cb.next()
+
+    def _compare_mappings(self, ca, cb, path):
+        ca.next() # MappingStartEvent
+        cb.next()
+
+        if self._ignoring_key_order:
+            pairs = self._compare_unordered_pairs(ca, cb, path)
+        else:
+            pairs = self._compare_ordered_pairs(ca, cb, path)
+        for d in pairs: yield d
+
+        ca.next() # MappingEndEvent
+        cb.next()
+
+    def _compare_ordered_pairs(self, ca, cb, path):
+        while True:
+            a_more = not isinstance(ca.peek(), MappingEndEvent)
+            b_more = not isinstance(cb.peek(), MappingEndEvent)
+
+            if a_more and b_more:
+                ka = _read_key(ca)
+                kb = _read_key(cb)
+                if ka.content_hash == kb.content_hash:
+                    for d in self.compare_values(ca, cb,
+                            path + (ka.component,)): yield d
+                else:
+                    yield _removed(path + (ka.component,), ka.start_mark)
+                    yield _added(path + (kb.component,), kb.start_mark)
+                    _skip_value(ca)
+                    _skip_value(cb)
+                _finish_pair(ca)
+                _finish_pair(cb)
+            elif a_more:
+                ka = _read_key(ca)
+                yield _removed(path + (ka.component,), ka.start_mark)
+                _skip_value(ca)
+                _finish_pair(ca)
+            elif b_more:
+                kb = _read_key(cb)
+                yield _added(path + (kb.component,), kb.start_mark)
+                _skip_value(cb)
+                _finish_pair(cb)
+            else:
+                break
+
+    def _compare_unordered_pairs(self, ca, cb, path):
+        # Pairs whose keys line up are compared as they stream. Otherwise a
+        # pair is compared against a buffered pair with the same key from the
+        # other stream, or is buffered itself to wait for one.
+        pending_a = {}
+        pending_b = {}
+
+        while True:
+            a_more = not isinstance(ca.peek(), MappingEndEvent)
+            b_more = not isinstance(cb.peek(), MappingEndEvent)
+            if not (a_more or b_more):
+                break
+
+            ka = _read_key(ca) if a_more else None
+            kb = _read_key(cb) if b_more else None
+
+            if (ka is not None and kb is not None
+                    and ka.content_hash == kb.content_hash):
+                for d in self.compare_values(ca, cb,
+                        path + (ka.component,)): yield d
+            else:
+                if ka is not None:
+                    for d in self._match_pending(ka, ca, pending_b,
+                            pending_a, path, False): yield d
+                if kb is not None:
+                    for d in self._match_pending(kb, cb, pending_a,
+                            pending_b, path, True): yield d
+
+            if a_more:
+                _finish_pair(ca)
+            if b_more:
+                _finish_pair(cb)
+
+        for pending, kind in ((pending_a, _removed), (pending_b, _added)):
+            for entries in pending.values():
+                for key, value_events in entries:
+                    self._buffered_events -= len(value_events)
+                    yield kind(path + (key.component,), key.start_mark)
+
+    def _match_pending(self, key, cursor, other_pending, own_pending, path,
+            is_b):
+        entries = other_pending.get(key.content_hash)
+        if entries:
+            other_key, value_events = entries.pop(0)
+            if not entries:
+                del other_pending[key.content_hash]
+            self._buffered_events -= len(value_events)
+
+            buffered = _Cursor(value_events)
+            if is_b:
+                values = self.compare_values(buffered, cursor,
+                        path + (key.component,))
+            else:
+                values = self.compare_values(cursor, buffered,
+                        path + (key.component,))
+            for d in values: yield d
+        else:
+            value_events = _read_value(cursor)
+            self._buffered_events += len(value_events)
+            if (self._max_buffered_events is not None
+                    and self._buffered_events > self._max_buffered_events):
+                raise _err_limit_exceeded(
+                        "number of events buffered for unordered keys",
+                        self._max_buffered_events, key.start_mark)
+            own_pending.setdefault(key.content_hash, []).append(
+                    (key, value_events))
+
+
+def _elaborate(stream, Loader, kwargs):
+    loader = Loader(stream)
+    settings = ElaboratorSettings.default._replace(**kwargs)._replace(
+            parser=loader, flat=True, including_ends=False,
+            with_extra_events=True, hashing_content=True,
+            expand_aliases=True)
+    try:
+        for ee in Elaborator(settings).process(): yield ee
+    finally:
+        loader.dispose()
+
+def diff_streams(a, b, Loader=yaml.Loader, first_only=False,
+        ignoring_key_order=False, max_buffered_events=None, **kwargs):
+    """
+    Compares two YAML streams, yielding a ``Difference`` for each added,
+    removed, or changed node. The streams are read in lockstep and only as
+    far as needed; a subtree that differs is reported once at its root.
+
+    Further keyword arguments are elaborator settings applied to both
+    streams; ``flat``, ``including_ends``, ``with_extra_events``,
+    ``hashing_content``, and ``expand_aliases`` are always overridden. Scalars
+    are compared by content hash, so equal values written differently (e.g.
+    ``0x10`` and ``16``) are equal.
+
+    If ``first_only`` is true, reading stops at the first difference.
+
+    If ``ignoring_key_order`` is false (default), mapping pairs are compared
+    in order. If true, pairs are matched by key regardless of order; pairs
+    that cannot be matched immediately are buffered until a pair with the
+    same key arrives from the other stream or the mapping ends.
+    ``max_buffered_events`` (default ``None``, meaning unlimited) bounds the
+    number of events buffered this way; exceeding it raises
+    ``ElaboratorLimitError``.
+    """
+    ca = _Cursor(_elaborate(a, Loader, kwargs))
+    cb = _Cursor(_elaborate(b, Loader, kwargs))
+    comparer = _StreamComparer(ignoring_key_order, max_buffered_events)
+
+    try:
+        for d in comparer.compare_streams(ca, cb):
+            yield d
+            if first_only:
+                return
+    finally:
+        ca.close()
+        cb.close()
+
+def streams_equal(a, b, Loader=yaml.Loader, **kwargs):
+    """
+    Returns whether two YAML streams are equal as compared by
+    ``diff_streams()``, stopping at the first difference.
+    """
+    for d in diff_streams(a, b, Loader, first_only=True, **kwargs):
+        return False
+    return True
@@ -1,11 +1,13 @@
 
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
-from builtins import *
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
 
 
 
-__all__ = ['Elaborator', 'ElaboratorError']
+__all__ = ['Elaborator', 'ElaboratorError', 'ElaboratorLimitError']
 
 from yaml.error import MarkedYAMLError
 from yaml.events import (StreamStartEvent, StreamEndEvent,
@@ -19,8 +21,25 @@ from yaml.nodes import ScalarNode, SequenceNode, MappingNode
 from .events import (ElementStartEvent, ElementEndEvent, PairStartEvent,
         PairEndEvent, PairKeyStartEvent, PairKeyEndEvent,
         PairValueStartEvent, PairValueEndEvent)
+from .hashing import scalar_hash, alias_hash, SequenceHasher, MappingHasher
+from .scalars import canonical_scalar_value, SpilledScalar, SpillFile
+from .packing import NumberPacker, simple_number_kind, resolves_numbers_simply
+from .compact import CompactTree
+from .resolver import CompiledResolver
+from .indexing import IndexedMappingNode, index_key
+from .interning import InternTable
+from .checkpoint import ResumedParser, _checkpoint_at
 
 from collections import namedtuple
+import copy
+
+
+_int_tag = 'tag:yaml.org,2002:int'
+_float_tag = 'tag:yaml.org,2002:float'
+_number_tags = {'int': _int_tag, 'float': _float_tag}
+
+# Longer keys are not interned, so that the intern table stays small.
+_max_interned_key_length = 256
 
 
 def _drain(*generators):
@@ -59,6 +78,11 @@ def _err_undefined_alias(anchor, start_mark):
     return ElaboratorError(None, None, "found undefined alias %r" % anchor,
             start_mark)
 
+def _err_recursive_alias(anchor, start_mark):
+    return ElaboratorError(None, None,
+            "cannot expand alias %r inside its own anchored node" % anchor,
+            start_mark)
+
 def _err_duplicate_anchor(anchor, first_mark, second_mark):
     return ElaboratorError(
             "found duplicate anchor %r; first occurrence" % anchor,
@@ -66,6 +90,22 @@ def _err_duplicate_anchor(anchor, first_mark, second_mark):
             "second occurrence",
             second_mark)
 
+def _err_duplicate_key(key, first_mark, second_mark):
+    return ElaboratorError(
+            "found duplicate mapping key %r; first occurrence" % key,
+            first_mark,
+            "second occurrence",
+            second_mark)
+
+
+class ElaboratorLimitError(ElaboratorError):
+    # Error specifically resulting from a configured resource limit
+    pass
+
+def _err_limit_exceeded(description, limit, start_mark):
+    return ElaboratorLimitError(None, None,
+            "%s exceeds the limit of %d" % (description, limit), start_mark)
+
 
 class ElaboratorUnexpectedEventTypeError(ElaboratorError):
     # Error specifically resulting from the failure of a node type check
@@ -105,6 +145,26 @@ _default_elaborator_settings_table = (
         ('including_ends', None),
         ('single', False),
         ('flat', False),
+        ('max_depth', None),
+        ('max_collection_size', None),
+        ('max_scalar_length', None),
+        ('max_anchors', None),
+        ('max_documents', None),
+        ('expand_aliases', False),
+        ('max_alias_expansion', None),
+        ('hashing_content', False),
+        ('packing_numbers', False),
+        ('with_packed_element_events', True),
+        ('compiling_resolver', False),
+        ('indexing_keys', False),
+        ('rejecting_duplicate_keys', False),
+        ('spilling_scalars_over', None),
+        ('spilling_scalars_to', 'file'),
+        ('interning_strings', False),
+        ('interning_scalars_up_to', None),
+        ('intern_table_size', 65536),
+        ('checkpointing', False),
+        ('resumed_from', None),
         )
 
 class ElaboratorSettings(namedtuple('ElaboratorSettings',
@@ -146,7 +206,12 @@ class ElaboratorSettings(namedtuple('ElaboratorSettings',
     (default), a reduced tree representation is used which holds fewer nodes
     in memory while still ideally providing the resolver with enough
     information to resolve tags; this may theoretically make path-based tag
-    resolution less accurate (test cases are needed).
+    resolution less accurate (test cases are needed). If ``composing_fully``
+    is ``'compact'``, the complete tree is instead stored in a
+    ``yaml_elaborate.compact.CompactTree``, which keeps nodes in arrays and
+    creates ``Node`` views of them only on demand. Whenever the tree is
+    composed fully, its root node is set as the ``node`` attribute of the
+    ``DocumentEndEvent``.
 
     If ``resolving_tags`` is true (default), ``resolver`` is used to resolve
     tags, which are then used to rewrite the tags in the events themselves. If
@@ -162,6 +227,105 @@ class ElaboratorSettings(namedtuple('ElaboratorSettings',
     accepted before the end of the stream. If true, zero documents or one
     document will be accepted; if the start of a second document appears
     before the end of the stream, an error is raised.
+
+    ``max_depth``, ``max_collection_size``, ``max_scalar_length``,
+    ``max_anchors``, and ``max_documents`` (all ``None`` by default, meaning
+    unlimited) bound, respectively, the nesting depth of collections (the
+    outermost collection has depth 1), the number of elements in a sequence or
+    pairs in a mapping, the length of a scalar value, the number of anchors in
+    a document, and the number of documents in the stream. Exceeding a limit
+    raises an ``ElaboratorLimitError`` marked at the offending event, before
+    that event is yielded.
+
+    If ``expand_aliases`` is true, the events of each anchored node are
+    recorded as they are produced, and each alias to that node is replaced in
+    the output by a fresh copy of those events (with anchors removed) instead
+    of an ``AliasEvent``. The recorded events of a document share one buffer;
+    a node anchored inside another anchored node is a slice of its ancestor's
+    recording, and only events inside anchored nodes are recorded at all. If
+    false (default), aliases are passed through as ``AliasEvent``.
+    ``max_alias_expansion`` (default ``None``, meaning unlimited) bounds the
+    total number of events replayed for aliases in a single document;
+    exceeding it raises an ``ElaboratorLimitError``. Setting a budget is
+    strongly recommended for untrusted input, where nested aliases can expand
+    exponentially.
+
+    If ``hashing_content`` is true, a content hash (see
+    ``yaml_elaborate.hashing``) of each node is computed as it streams and set
+    as the ``content_hash`` attribute of its ``ScalarEvent``,
+    ``SequenceEndEvent``, or ``MappingEndEvent`` (and of each ``AliasEvent``,
+    which takes the hash of its anchored node). The hash of a collection is
+    built from the hashes of its children without retaining the children. If
+    false (default), no hashes are computed.
+
+    If ``packing_numbers`` is true, the values of a non-empty sequence whose
+    elements all resolve to ``int`` or ``float`` are collected into a single
+    array, set as the ``packed_values`` attribute of its
+    ``SequenceEndEvent``: a NumPy ``int64`` or ``float64`` array if NumPy is
+    installed, or an ``array.array`` of typecode ``'q'`` or ``'d'`` otherwise.
+    Any float among the elements makes all the values floats. Plain decimal
+    numbers are recognized and converted in batches without calling the
+    resolver, provided the resolver resolves them as ``yaml.Loader`` does and
+    has no path resolvers. If false (default), no values are packed. If
+    ``with_packed_element_events`` is false, the events of the elements
+    themselves are withheld while a sequence can still be packed; they are
+    only produced (in order, before any later element) if the sequence turns
+    out not to be packable, or to mix ints and floats. If true (default),
+    element events are produced as usual.
+
+    If ``compiling_resolver`` is true, ``resolver`` is wrapped in a
+    ``yaml_elaborate.resolver.CompiledResolver``, which resolves plain
+    scalars to the same tags using one combined pattern per first character
+    and a small cache. If false (default), ``resolver`` is used directly.
+
+    If ``indexing_keys`` is true and the tree is composed fully, each mapping
+    node keeps an index of its scalar keys (by resolved tag and canonical
+    value; see ``yaml_elaborate.indexing``), filled in as its pairs arrive,
+    and its ``get()`` method finds the value node of a key in constant time.
+    Mapping nodes are then ``yaml_elaborate.indexing.IndexedMappingNode``
+    objects, or ``CompactMappingNode`` views with the index kept by the tree.
+    If false (default), no index is kept.
+
+    If ``rejecting_duplicate_keys`` is true, a scalar key equal (by the same
+    rule) to an earlier key of the same mapping raises an ``ElaboratorError``
+    marked at both keys, as soon as the second key has been produced and
+    before its value is read. Only the keys of the mappings currently open
+    are held, whether or not the tree is composed fully. If false (default),
+    duplicate keys are passed through.
+
+    If ``spilling_scalars_over`` is set to a length, the value of each scalar
+    longer than that many characters is replaced, once its tag is resolved
+    and its hash computed, by a ``yaml_elaborate.scalars.SpilledScalar``
+    holding the text in an anonymous temporary file shared by the spilled
+    scalars of the document (if ``spilling_scalars_to`` is ``'file'``, the
+    default) or in an encoded buffer (if it is ``'memory'``). The event, any
+    node composed from it, and any anchor referring to that node then share
+    this object, which can be read in chunks, instead of keeping the text. If
+    ``None`` (default), values are left as ``str``.
+
+    If ``interning_strings`` is true, the tags, anchors, and scalar mapping
+    keys (of up to 256 characters) of the events (and so of the nodes) are
+    replaced by the equal string already held in a
+    ``yaml_elaborate.interning.InternTable``, so that retained events and
+    trees share one copy of each. If
+    ``interning_scalars_up_to`` is also set to a length, the values of all
+    scalars no longer than that are interned as well. The table belongs to
+    the elaborator, lasts across documents and streams, and holds at most
+    ``intern_table_size`` (default 65536) strings; ``interning_statistics()``
+    reports its counts and the memory saved. If false (default), strings are
+    left as the parser produced them.
+
+    If ``checkpointing`` is true, the ``DocumentEndEvent`` of each document
+    gets a ``checkpoint`` attribute, a ``yaml_elaborate.checkpoint.Checkpoint``
+    from which the stream can be resumed after that document. Its offset
+    counts characters, unless ``checkpointing`` is the
+    ``yaml_elaborate.checkpoint.DecodingReader`` the parser reads from, in
+    which case it counts bytes of the input. If false (default), no
+    checkpoints are taken. If ``resumed_from`` is set to a checkpoint, the
+    parser is taken to read the stream from the position of that checkpoint:
+    its marks are moved to that position, and documents are counted (for
+    ``max_documents``, ``single``, and checkpoints) from those before it. If
+    ``None`` (default), the parser reads the stream from the start.
     """
     pass
 
@@ -175,7 +339,9 @@ ElaboratorSettings.default = _default_elaborator_settings
 
 class Elaborator(object):
     """
-    Produces a modified stream of events from a YAML parser.
+    Produces a modified stream of events from a YAML parser. Once a stream
+    has been processed (or its generator closed), ``process()`` may be
+    called again after the parser has been given a new stream.
     """
 
     def __init__(self, settings=None):
@@ -190,16 +356,74 @@ class Elaborator(object):
         if not self._events:
             raise TypeError("Setting 'parser' must be set")
 
+        self._resumed_from = settings.resumed_from
+        if self._resumed_from is not None:
+            self._events = ResumedParser(parser, self._resumed_from)
+
         if not settings.resolving_tags:
             resolver = None
         elif resolver is None:
             # The caller may simply pass a Loader object.
             resolver = parser
+        if resolver is not None and settings.compiling_resolver:
+            resolver = CompiledResolver(resolver)
         self._resolver = resolver
 
         self._settings = settings
 
+        self._composing = bool(settings.composing_fully)
+        self._compact = settings.composing_fully == 'compact'
+        # Whether collection nodes hold their children themselves.
+        self._composing_nodes = self._composing and not self._compact
+
+        self._indexing_keys = settings.indexing_keys and self._composing
+        self._rejecting_duplicate_keys = settings.rejecting_duplicate_keys
+
+        self._spilling_scalars_over = settings.spilling_scalars_over
+        self._spilling_scalars_to = settings.spilling_scalars_to
+        self._spill_file = None
+
+        self._interner = None
+        self._interning_scalars_up_to = None
+        if settings.interning_strings:
+            self._interner = InternTable(settings.intern_table_size)
+            self._interning_scalars_up_to = settings.interning_scalars_up_to
+
+        self._max_depth = settings.max_depth
+        self._max_collection_size = settings.max_collection_size
+        self._max_scalar_length = settings.max_scalar_length
+        self._max_anchors = settings.max_anchors
+        self._max_documents = settings.max_documents
+
+        self._expanding_aliases = settings.expand_aliases
+        self._max_alias_expansion = settings.max_alias_expansion
+
+        self._hashing = settings.hashing_content
+
+        self._packing_numbers = settings.packing_numbers
+        self._packing_simple_numbers = (settings.packing_numbers
+                and resolver is not None and resolves_numbers_simply(resolver))
+
         self._anchors = None
+        self._recording = None
+        self._recorded_spans = None
+        self._recording_open = 0
+        self._alias_expansion_count = 0
+        self._hashers = None
+        self._anchor_hashes = None
+        self._last_hash = None
+        self._depth = 0
+        self._document_count = 0
+        self._tree = None
+
+    def interning_statistics(self):
+        """
+        Returns the ``InternStatistics`` of the strings interned so far, or
+        ``None`` if ``interning_strings`` is not set.
+        """
+        if self._interner is None:
+            return None
+        return self._interner.statistics()
 
     def process(self):
         """
@@ -226,6 +450,11 @@ class Elaborator(object):
     def _process_stream(self, including_ends, single):
         # Accept entire YAML event stream.
         # Output is always nonflat (all flattening occurs in process()).
+        self._depth = 0
+        self._document_count = 0
+        if self._resumed_from is not None:
+            self._document_count = self._resumed_from.document
+
         start_events = self._process_stream_start_event()
         if including_ends:
             yield start_events
@@ -235,7 +464,7 @@ class Elaborator(object):
         if single:
             # Accept 0 or 1 document.
             sink_document = _Sink()
-            if self._has_more():
+            if self._document_count == 0 and self._has_more():
                 yield self._accept_document(sink_document)
             document = sink_document.value
 
@@ -260,22 +489,60 @@ class Elaborator(object):
     def _accept_document(self, sink_node):
         try:
             self._anchors = {}
+            if self._expanding_aliases:
+                self._recording = []
+                self._recorded_spans = {}
+                self._recording_open = 0
+                self._alias_expansion_count = 0
+            if self._hashing:
+                self._hashers = []
+                self._anchor_hashes = {}
+            if self._compact:
+                self._tree = CompactTree()
+            # Scalars of each document are spilled to a file of their own,
+            # which is closed once none of them is referenced.
+            self._spill_file = None
+
+            self._document_count += 1
+            if (self._max_documents is not None
+                    and self._document_count > self._max_documents):
+                raise _err_limit_exceeded("number of documents",
+                        self._max_documents, self._event_peek().start_mark)
 
             for ee in self._drop_next_event_if(DocumentStartEvent, True):
                 yield ee
 
-            for ee in self._accept_any_value(None, None, sink_node):
+            sink_root = _Sink()
+            for ee in self._accept_any_value(None, None, sink_root):
                 yield ee
+            _put(sink_node, sink_root.value)
+
+            if self._composing and self._event_peek_isa(DocumentEndEvent):
+                self._event_peek().node = sink_root.value
+
+            if (self._settings.checkpointing
+                    and self._event_peek_isa(DocumentEndEvent)):
+                end_event = self._event_peek()
+                end_event.checkpoint = _checkpoint_at(end_event.end_mark,
+                        self._document_count, self._settings)
 
             for ee in self._drop_next_event_if(DocumentEndEvent, True):
                 yield ee
         finally:
             self._anchors = None
+            self._recording = None
+            self._recorded_spans = None
+            self._hashers = None
+            self._anchor_hashes = None
+            self._tree = None
 
     def _accept_concrete_value(self, parent, index, sink_node):
         # Accept a Scalar, Sequence, or Mapping
-        anchor = self._event_peek().anchor
-        self._validate_anchor(anchor)
+        peeked_event = self._event_peek()
+        anchor = peeked_event.anchor
+        if anchor is not None and self._interner is not None:
+            anchor = peeked_event.anchor = self._interner.intern(anchor)
+        self._validate_anchor(anchor, peeked_event.start_mark)
 
         self._resolver_descend(parent, index)
 
@@ -292,8 +559,14 @@ class Elaborator(object):
             raise _err_unexpected_event_type(type(peeked_event),
                     peeked_event.start_mark, expected_types=expected_types)
 
+        if anchor is not None and self._expanding_aliases:
+            events = self._record_anchored(anchor, events)
+
         for ee in events: yield ee
 
+        if anchor is not None and self._hashing:
+            self._anchor_hashes[anchor] = self._last_hash
+
         self._resolver_ascend()
 
     def _accept_any_value(self, parent, index, sink_node):
@@ -307,16 +580,84 @@ class Elaborator(object):
         for ee in events: yield ee
 
     def _accept_alias(self, sink_referent):
-        start_event = self._event_next()
-        yield start_event
+        alias_event = self._event_next()
         # nb: no end_event here
 
-        anchor = start_event.anchor
+        anchor = alias_event.anchor
+        if self._interner is not None:
+            anchor = alias_event.anchor = self._interner.intern(anchor)
         if anchor not in self._anchors:
-            raise _err_undefined_alias(anchor, start_event.start_mark)
-        _put(sink_referent, self._anchors[anchor])
+            raise _err_undefined_alias(anchor, alias_event.start_mark)
+
+        if self._hashing:
+            content_hash = self._anchor_hashes.get(anchor)
+            if content_hash is None:
+                # The anchored node is still open.
+                content_hash = alias_hash(anchor)
+            alias_event.content_hash = content_hash
+            self._add_hash(content_hash)
+
+        if self._expanding_aliases:
+            for ee in self._expand_alias(alias_event): yield ee
+        else:
+            yield alias_event
+
+        referent = self._anchors[anchor]
+        if self._compact:
+            self._tree.add_alias(referent, alias_event.start_mark,
+                    alias_event.end_mark)
+
+        _put(sink_referent, referent)
+
+    def _expand_alias(self, alias_event):
+        # Replay the events recorded for the anchored node in place of the
+        # alias.
+        anchor = alias_event.anchor
+        span = self._recorded_spans[anchor]
+        if span is None:
+            # The anchored node is still open.
+            raise _err_recursive_alias(anchor, alias_event.start_mark)
+        start, end = span
+
+        self._alias_expansion_count += end - start
+        if (self._max_alias_expansion is not None
+                and self._alias_expansion_count > self._max_alias_expansion):
+            raise _err_limit_exceeded("number of events expanded from aliases",
+                    self._max_alias_expansion, alias_event.start_mark)
+
+        recording = self._recording
+        for index in range(start, end):
+            ee = copy.copy(recording[index])
+            if getattr(ee, 'anchor', None) is not None:
+                ee.anchor = None
+            yield ee
+
+    def _record_anchored(self, anchor, events):
+        # Pass events through, noting the span of the shared recording they
+        # occupy. Only the outermost anchored node appends to the recording;
+        # any anchored node nested inside it occupies a slice of the same
+        # span.
+        recording = self._recording
+        outermost = not self._recording_open
+        start = len(recording)
+        self._recorded_spans[anchor] = None
+
+        self._recording_open += 1
+        for ee in events:
+            if outermost:
+                recording.append(ee)
+            yield ee
+        self._recording_open -= 1
+
+        self._recorded_spans[anchor] = (start, len(recording))
 
     def _accept_scalar(self, anchor, sink_node):
+        if self._max_scalar_length is not None:
+            peeked_event = self._event_peek()
+            if len(peeked_event.value) > self._max_scalar_length:
+                raise _err_limit_exceeded("scalar length",
+                        self._max_scalar_length, peeked_event.start_mark)
+
         start_event = self._event_next()
         # nb: no end_event here
 
@@ -324,16 +665,35 @@ class Elaborator(object):
                 start_event.value, start_event.implicit)
 
         start_event.tag = tag
+
+        if self._hashing:
+            content_hash = scalar_hash(tag,
+                    canonical_scalar_value(tag, start_event.value))
+            start_event.content_hash = content_hash
+            self._add_hash(content_hash)
+
+        if (self._spilling_scalars_over is not None
+                and len(start_event.value) > self._spilling_scalars_over):
+            if (self._spill_file is None
+                    and self._spilling_scalars_to == 'file'):
+                self._spill_file = SpillFile()
+            start_event.value = SpilledScalar(start_event.value,
+                    self._spilling_scalars_to, spill_file=self._spill_file)
+        elif (self._interning_scalars_up_to is not None
+                and len(start_event.value) <= self._interning_scalars_up_to):
+            start_event.value = self._interner.intern(start_event.value)
+
         yield start_event
 
-        node = ScalarNode(tag, start_event.value, start_event.start_mark,
-                start_event.end_mark, style=start_event.style)
+        node = self._new_scalar_node(tag, start_event)
 
         self._set_anchor(anchor, node)
 
         _put(sink_node, node)
 
     def _accept_sequence(self, anchor, sink_node):
+        self._enter_collection()
+
         start_event = self._event_next()
 
         tag = self._resolve_tag(start_event.tag, SequenceNode, None,
@@ -342,13 +702,45 @@ class Elaborator(object):
         start_event.tag = tag
         yield start_event
 
-        node = SequenceNode(tag, [], start_event.start_mark, None,
-                flow_style=start_event.flow_style)
+        if self._hashing:
+            self._hashers.append(SequenceHasher(tag))
+
+        if self._compact:
+            node = self._tree.start_sequence(tag, start_event.start_mark,
+                    start_event.flow_style)
+        else:
+            node = SequenceNode(tag, [], start_event.start_mark, None,
+                    flow_style=start_event.flow_style)
 
         self._set_anchor(anchor, node)
 
+        max_size = self._max_collection_size
+
+        packer = None
+        if self._packing_numbers:
+            packer = NumberPacker(
+                    not self._settings.with_packed_element_events)
+
         index = 0
         while not self._event_peek_isa(SequenceEndEvent):
+            if max_size is not None and index >= max_size:
+                raise self._err_collection_size("number of sequence elements")
+
+            if packer is not None:
+                kind = self._simple_number_kind(self._event_peek())
+                if (kind is not None and packer.withholding and packer.withheld
+                        and packer.withheld[0].tag != _number_tags[kind]):
+                    # Ints and floats are mixed, so the packed values (all
+                    # floats) would not give the ints back.
+                    for ee in self._release_withheld(packer): yield ee
+                if kind is not None:
+                    for ee in self._accept_simple_number(node, index, packer,
+                            kind): yield ee
+                    index += 1
+                    continue
+                if packer.withholding:
+                    for ee in self._release_withheld(packer): yield ee
+
             if self._settings.with_extra_events:
                 yield ElementStartEvent(index, self._event_peek().start_mark)
 
@@ -357,34 +749,73 @@ class Elaborator(object):
             for ee in self._accept_any_value(node, index, sink_element):
                 yield ee
 
-            if self._settings.composing_fully:
+            if self._composing_nodes:
                 node.value.append(sink_element.value)
 
+            if packer is not None and not packer.add_node(sink_element.value):
+                # Not homogeneous; stop packing.
+                packer = None
+
             if self._settings.with_extra_events:
                 yield ElementEndEvent(index, self._event_peek().start_mark)
 
             index += 1
 
         end_event = self._event_next()
+        if self._hashing:
+            self._end_hash(end_event)
+        if packer is not None and index:
+            end_event.packed_values = packer.values()
         yield end_event
 
-        node.end_mark = end_event.end_mark
+        self._finish_node(node, end_event)
+
+        self._depth -= 1
 
         _put(sink_node, node)
 
     def _accept_mapping(self, anchor, sink_node):
+        self._enter_collection()
+
         start_event = self._event_next()
         tag = self._resolve_tag(start_event.tag, MappingNode, None, start_event.implicit)
 
         start_event.tag = tag
         yield start_event
 
-        node = MappingNode(tag, [], start_event.start_mark, None,
-                flow_style=start_event.flow_style)
+        if self._hashing:
+            self._hashers.append(MappingHasher(tag))
+
+        if self._compact:
+            node = self._tree.start_mapping(tag, start_event.start_mark,
+                    start_event.flow_style)
+        elif self._indexing_keys:
+            node = IndexedMappingNode(tag, [], start_event.start_mark, None,
+                    flow_style=start_event.flow_style)
+        else:
+            node = MappingNode(tag, [], start_event.start_mark, None,
+                    flow_style=start_event.flow_style)
 
         self._set_anchor(anchor, node)
 
+        key_index = None
+        if self._indexing_keys:
+            if self._compact:
+                key_index = self._tree.index_keys(node)
+            else:
+                key_index = node.key_index
+        elif self._rejecting_duplicate_keys:
+            key_index = {}
+
+        max_size = self._max_collection_size
+
+        count = 0
         while not self._event_peek_isa(MappingEndEvent):
+            if max_size is not None:
+                if count >= max_size:
+                    raise self._err_collection_size("number of mapping pairs")
+                count += 1
+
             sink_key = _Sink()
             sink_value = _Sink()
 
@@ -393,8 +824,28 @@ class Elaborator(object):
                 yield PairStartEvent(mark)
                 yield PairKeyStartEvent(mark)
 
+            if key_index is not None:
+                # Where this occurrence of the key can be found again.
+                key_mark = self._event_peek().start_mark
+                if not self._indexing_keys:
+                    locator = key_mark
+                elif self._compact:
+                    locator = len(self._tree)
+                else:
+                    locator = len(node.value)
+
+            if self._interner is not None and self._event_peek_isa(
+                    ScalarEvent):
+                key_event = self._event_peek()
+                if len(key_event.value) <= _max_interned_key_length:
+                    key_event.value = self._interner.intern(key_event.value)
+
             for ee in self._accept_any_value(node, None, sink_key): yield ee
 
+            if key_index is not None:
+                self._index_key(node, key_index, sink_key.value, locator,
+                        key_mark)
+
             if self._settings.with_extra_events:
                 mark = self._event_peek().start_mark
                 yield PairKeyEndEvent(mark)
@@ -408,16 +859,102 @@ class Elaborator(object):
                 yield PairValueEndEvent(mark)
                 yield PairEndEvent(mark)
 
-            if self._settings.composing_fully:
+            if self._composing_nodes:
                 node.value.append((sink_key.value, sink_value.value))
 
         end_event = self._event_next()
+        if self._hashing:
+            self._end_hash(end_event)
         yield end_event
 
-        node.end_mark = end_event.end_mark
+        self._finish_node(node, end_event)
+
+        self._depth -= 1
 
         _put(sink_node, node)
 
+    def _index_key(self, node, key_index, key_node, locator, key_mark):
+        key = index_key(key_node)
+        if key is None:
+            return
+        if self._rejecting_duplicate_keys and key in key_index:
+            raise _err_duplicate_key(key_node.value,
+                    self._locate_key(node, key_index[key]), key_mark)
+        key_index[key] = locator
+
+    def _locate_key(self, node, locator):
+        # The start mark of the earlier key found at locator.
+        if not self._indexing_keys:
+            return locator
+        if self._compact:
+            return self._tree.start_mark(locator)
+        return node.value[locator][0].start_mark
+
+    def _simple_number_kind(self, event):
+        # 'int' or 'float' if event is a plain scalar whose tag can be known
+        # without the resolver; None otherwise.
+        if (self._packing_simple_numbers and type(event) is ScalarEvent
+                and event.tag is None and event.anchor is None
+                and event.style is None and event.implicit[0]):
+            return simple_number_kind(event.value)
+        return None
+
+    def _accept_simple_number(self, parent, index, packer, kind):
+        # Variation of _accept_any_value() for a sequence element known to be
+        # a plain int or float. The element's events are either yielded or
+        # withheld in the packer.
+        if self._max_scalar_length is not None:
+            peeked_event = self._event_peek()
+            if len(peeked_event.value) > self._max_scalar_length:
+                raise _err_limit_exceeded("scalar length",
+                        self._max_scalar_length, peeked_event.start_mark)
+
+        event = self._event_next()
+        is_float = kind == 'float'
+        tag = _float_tag if is_float else _int_tag
+        event.tag = tag
+        packer.add_text(event.value, is_float)
+
+        if self._hashing:
+            content_hash = scalar_hash(tag,
+                    canonical_scalar_value(tag, event.value))
+            event.content_hash = content_hash
+            self._add_hash(content_hash)
+
+        if self._composing:
+            node = self._new_scalar_node(tag, event)
+            if self._composing_nodes:
+                parent.value.append(node)
+
+        if packer.withholding:
+            packer.withheld.append(event)
+            return
+
+        if self._settings.with_extra_events:
+            yield ElementStartEvent(index, event.start_mark)
+        yield event
+        if self._settings.with_extra_events:
+            yield ElementEndEvent(index, self._event_peek().start_mark)
+
+    def _release_withheld(self, packer):
+        # Yield the withheld element events, which are the first elements of
+        # the sequence, and stop withholding.
+        withheld = packer.withheld
+        packer.withheld = []
+        packer.withholding = False
+
+        with_extra_events = self._settings.with_extra_events
+        for index, event in enumerate(withheld):
+            if with_extra_events:
+                yield ElementStartEvent(index, event.start_mark)
+            yield event
+            if with_extra_events:
+                if index + 1 < len(withheld):
+                    end_mark = withheld[index + 1].start_mark
+                else:
+                    end_mark = self._event_peek().start_mark
+                yield ElementEndEvent(index, end_mark)
+
     # Support methods
 
     def _drop_next_event_if(self, event_type, required=False):
@@ -450,26 +987,68 @@ class Elaborator(object):
             # If consuming an end event fails, the next event is a non-end
             # event.
             peeked_event = self._event_peek()
-            raise _err_extra_document(document.start_mark,
-                    peeked_event.start_mark)
+            first_mark = None
+            if document is not None:
+                first_mark = document.start_mark
+            raise _err_extra_document(first_mark, peeked_event.start_mark)
 
     def _has_more(self):
         return not self._event_peek_isa(StreamEndEvent)
 
+    def _new_scalar_node(self, tag, event):
+        if self._compact:
+            return self._tree.add_scalar(tag, event.value, event.start_mark,
+                    event.end_mark, event.style)
+        return ScalarNode(tag, event.value, event.start_mark,
+                event.end_mark, style=event.style)
+
+    def _finish_node(self, node, end_event):
+        if self._compact:
+            self._tree.finish(node, end_event.end_mark)
+        else:
+            node.end_mark = end_event.end_mark
+
     def _set_anchor(self, anchor, node):
         if anchor is not None:
             self._anchors[anchor] = node
 
-    def _validate_anchor(self, anchor):
+    def _validate_anchor(self, anchor, start_mark):
         if anchor is not None:
             if anchor in self._anchors:
                 raise _err_duplicate_anchor(anchor,
-                        self._anchors[anchor].start_mark, event.start_mark)
+                        self._anchors[anchor].start_mark, start_mark)
+            if (self._max_anchors is not None
+                    and len(self._anchors) >= self._max_anchors):
+                raise _err_limit_exceeded("number of anchors",
+                        self._max_anchors, start_mark)
+
+    def _add_hash(self, content_hash):
+        # Pass the hash of a completed node to the enclosing collection.
+        self._last_hash = content_hash
+        if self._hashers:
+            self._hashers[-1].add(content_hash)
+
+    def _end_hash(self, end_event):
+        content_hash = self._hashers.pop().hexdigest()
+        end_event.content_hash = content_hash
+        self._add_hash(content_hash)
+
+    def _enter_collection(self):
+        self._depth += 1
+        if self._max_depth is not None and self._depth > self._max_depth:
+            raise _err_limit_exceeded("nesting depth", self._max_depth,
+                    self._event_peek().start_mark)
+
+    def _err_collection_size(self, description):
+        return _err_limit_exceeded(description, self._max_collection_size,
+                self._event_peek().start_mark)
 
     def _resolve_tag(self, tag, kind, scalar_value, implicit):
         if self._settings.resolving_tags:
             if tag is None or tag == '!':
                 tag = self._resolver_resolve(kind, scalar_value, implicit)
+        if self._interner is not None:
+            tag = self._interner.intern(tag)
         return tag
 
     def _resolver_descend(self, parent, index):
@@ -0,0 +1,140 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Emission of elaborated event streams back to YAML.
+
+``emit_stream()`` writes the events of a ``process_stream()`` output (flat or
+grouped by document) as YAML text in a single streaming pass, with one of
+PyYAML's emitters. The extension events of ``yaml_elaborate.events`` are
+left out (attributes the elaborator adds to core events, such as
+``content_hash``, are ignored by the emitters). Sequences whose element
+events were withheld by ``with_packed_element_events=False`` are written
+from their packed values, and spilled scalar values are read back.
+
+Tags rewritten by the resolver are written only where the parser found them
+necessary (as given by each event's ``implicit``), so the output resolves to
+the same tags as the input; with ``explicit_tags``, every resolved tag is
+written instead.
+"""
+
+__all__ = ['emit_stream']
+
+import copy
+
+import yaml
+from yaml.events import (Event, StreamStartEvent, StreamEndEvent,
+        SequenceStartEvent, SequenceEndEvent, MappingStartEvent,
+        AliasEvent, ScalarEvent)
+from yaml.representer import SafeRepresenter
+
+from .events import ExtendedEvent
+from .scalars import SpilledScalar
+
+_representer = SafeRepresenter()
+
+
+def _dumper_type(backend):
+    if backend in ('auto', 'c'):
+        try:
+            return yaml.CDumper
+        except AttributeError:
+            if backend == 'c':
+                raise ImportError("PyYAML was built without LibYAML")
+    elif backend != 'python':
+        raise ValueError("unknown emitter backend %r" % backend)
+    return yaml.Dumper
+
+def _flatten(events):
+    # process_stream() output, flat or grouped into generators.
+    for item in events:
+        if isinstance(item, Event):
+            yield item
+        else:
+            for ee in item: yield ee
+
+def _packed_scalars(values, explicit_tags):
+    implicit = (False, False) if explicit_tags else (True, False)
+    for value in values:
+        if isinstance(value, float):
+            node = _representer.represent_float(value)
+        else:
+            node = _representer.represent_int(int(value))
+        yield ScalarEvent(None, node.tag, implicit, node.value)
+
+def _core_events(events, explicit_tags):
+    started = False
+    ended = False
+    # For each open sequence, whether any of its elements has been seen.
+    sequences = []
+
+    for ee in _flatten(events):
+        if isinstance(ee, ExtendedEvent):
+            continue
+
+        if not started and not isinstance(ee, StreamStartEvent):
+            yield StreamStartEvent()
+        started = True
+        ended = isinstance(ee, StreamEndEvent)
+
+        if sequences and isinstance(ee, (SequenceStartEvent,
+                MappingStartEvent, AliasEvent, ScalarEvent)):
+            sequences[-1] = True
+
+        if isinstance(ee, SequenceEndEvent):
+            has_elements = sequences.pop()
+            packed_values = getattr(ee, 'packed_values', None)
+            if not has_elements and packed_values is not None:
+                for pe in _packed_scalars(packed_values, explicit_tags):
+                    yield pe
+        if isinstance(ee, SequenceStartEvent):
+            sequences.append(False)
+
+        yield _core_event(ee, explicit_tags)
+
+    if not started:
+        yield StreamStartEvent()
+    if not ended:
+        yield StreamEndEvent()
+
+def _core_event(ee, explicit_tags):
+    # ee, or a copy of it changed as the emitter needs.
+    if isinstance(ee, ScalarEvent):
+        spilled = isinstance(ee.value, SpilledScalar)
+        tagging = explicit_tags and ee.tag is not None
+        if spilled or tagging:
+            ee = copy.copy(ee)
+            if spilled:
+                ee.value = str(ee.value)
+            if tagging:
+                ee.implicit = (False, False)
+    elif isinstance(ee, (SequenceStartEvent, MappingStartEvent)):
+        if explicit_tags and ee.tag is not None:
+            ee = copy.copy(ee)
+            ee.implicit = False
+    return ee
+
+def emit_stream(events, stream=None, backend='auto', explicit_tags=False,
+        **kwargs):
+    """
+    Writes elaborated ``events`` (see ``yaml_elaborate.emitting``) to
+    ``stream`` as YAML. If ``stream`` is ``None``, the YAML is returned as a
+    string instead.
+
+    ``backend`` is ``'c'`` for PyYAML's LibYAML-based ``CEmitter``,
+    ``'python'`` for its pure-Python ``Emitter``, or ``'auto'`` (default) for
+    the former if PyYAML was built with LibYAML. If ``explicit_tags`` is
+    true, the tag of every node is written. The remaining keyword arguments
+    (``canonical``, ``indent``, ``width``, ``allow_unicode``,
+    ``line_break``) are passed to the emitter, as by ``yaml.emit()``.
+
+    Stream start and end events are added if ``events`` lacks them.
+    """
+    return yaml.emit(_core_events(events, explicit_tags), stream,
+            Dumper=_dumper_type(backend), **kwargs)
@@ -1,7 +1,9 @@
 
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
-from builtins import *
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
 
 
 from yaml.events import Event
@@ -0,0 +1,98 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Content hashes for YAML nodes, computed incrementally from the hashes of
+their children.
+
+A hash covers the resolved tag and the canonical value of a node, and never
+its style, anchor, or marks. Every hash is a SHA-256 hex digest:
+
+-   A scalar hashes ``"S"``, its tag, and its canonical value (see
+    ``yaml_elaborate.scalars.canonical_scalar_value``).
+-   A sequence hashes ``"Q"``, its tag, and the hashes of its elements in
+    order.
+-   A mapping hashes ``"M"``, its tag, its number of pairs, and the sum
+    (modulo 2**256) of the hashes of its pairs, where each pair hashes the
+    hash of its key followed by the hash of its value. The result does not
+    depend on the order of the pairs.
+-   An alias has the hash of its anchored node. An alias occurring inside its
+    own anchored node hashes ``"A"`` and the anchor instead.
+"""
+
+__all__ = ['scalar_hash', 'alias_hash', 'SequenceHasher', 'MappingHasher']
+
+import binascii
+import hashlib
+
+_modulus = 1 << 256
+
+def _text_bytes(text):
+    return text.encode('utf-8', 'surrogatepass')
+
+def _start(kind, tag):
+    h = hashlib.sha256(_text_bytes(kind))
+    h.update(_text_bytes(tag or ''))
+    h.update(b'\0')
+    return h
+
+def scalar_hash(tag, canonical_value):
+    """
+    Returns the hash of a scalar from its tag and canonical value.
+    """
+    h = _start('S', tag)
+    h.update(_text_bytes(canonical_value))
+    return h.hexdigest()
+
+def alias_hash(anchor):
+    """
+    Returns the hash used for an alias that cannot be resolved to a completed
+    node.
+    """
+    return _start('A', anchor).hexdigest()
+
+class SequenceHasher(object):
+    """
+    Accumulates the hash of a sequence from the hashes of its elements.
+    """
+    def __init__(self, tag):
+        self._hash = _start('Q', tag)
+
+    def add(self, child_hash):
+        self._hash.update(_text_bytes(child_hash))
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+class MappingHasher(object):
+    """
+    Accumulates the hash of a mapping from the hashes of its keys and values,
+    added alternately.
+    """
+    def __init__(self, tag):
+        self._tag = tag
+        self._key_hash = None
+        self._count = 0
+        self._sum = 0
+
+    def add(self, child_hash):
+        if self._key_hash is None:
+            self._key_hash = child_hash
+            return
+
+        pair = hashlib.sha256(_text_bytes(self._key_hash + child_hash))
+        self._sum = (self._sum + int(pair.hexdigest(), 16)) % _modulus
+        self._count += 1
+        self._key_hash = None
+
+    def hexdigest(self):
+        h = _start('M', self._tag)
+        h.update(_text_bytes('%d\0' % self._count))
+        h.update(binascii.unhexlify('%064x' % self._sum))
+        return h.hexdigest()
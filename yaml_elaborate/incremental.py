@@ -0,0 +1,386 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Incremental re-elaboration of YAML text after localized edits.
+
+``IncrementalElaborator`` keeps the elaborated events of each document of a
+text along with the offset at which each document begins. After an edit, only
+the documents touched by the edit are elaborated again; the marks of the
+other documents are shifted (lazily, when their events are next requested)
+rather than recomputed.
+
+Each document occupies the text from the start of the line on which its
+first token appears up to the start of the next document (or the end of the
+text); the first document also owns anything before it. A document after the
+touched ones is only left alone if it begins with an explicit ``---``, since
+otherwise the edit could change where it begins; documents are added to the
+re-elaborated region until one does.
+
+Documents are held in segments of up to ``_segment_size`` documents. The
+shift of the documents after an edit is recorded once per later segment and
+applied to its documents only when they are next used, and the documents an
+edit touches are found by bisecting on their offsets. The work done by an
+edit therefore grows with the touched documents, and only by a small
+per-segment step with the size of the text.
+"""
+
+__all__ = ['IncrementalElaborator', 'DocumentChange']
+
+from bisect import bisect_right
+from collections import namedtuple
+
+import yaml
+from yaml.error import Mark, MarkedYAMLError
+from yaml.events import DocumentStartEvent
+
+from .elaborator import Elaborator, ElaboratorSettings
+
+
+DocumentChange = namedtuple('DocumentChange',
+        ['index', 'removed', 'documents'])
+DocumentChange.__doc__ = """
+Result of an edit: the documents from position ``index`` through
+``index + removed - 1`` were replaced by the event lists in ``documents``.
+"""
+
+
+def _shift_marks(events, index_delta, line_delta, name=None):
+    # Replace the marks of events, in place, with marks moved by the given
+    # number of characters and lines. Marks shared between events remain
+    # shared.
+    shifted = {}
+
+    def shift(mark):
+        if mark is None:
+            return None
+        key = id(mark)
+        try:
+            return shifted[key]
+        except KeyError:
+            new_mark = Mark(mark.name if name is None else name,
+                    mark.index + index_delta, mark.line + line_delta,
+                    mark.column, None, None)
+            shifted[key] = new_mark
+            return new_mark
+
+    for event in events:
+        event.start_mark = shift(event.start_mark)
+        event.end_mark = shift(event.end_mark)
+
+def _shift_error(error, index_delta, line_delta, name):
+    for attr in ('context_mark', 'problem_mark'):
+        mark = getattr(error, attr, None)
+        if mark is not None:
+            setattr(error, attr, Mark(name, mark.index + index_delta,
+                    mark.line + line_delta, mark.column, None, None))
+
+# Most documents held by a segment.
+_segment_size = 64
+
+
+def _line_start(mark):
+    return mark.index - mark.column
+
+def _is_explicit_start(text, offset):
+    return (text.startswith('---', offset)
+            and text[offset + 3:offset + 4] in ('', ' ', '\t', '\r', '\n'))
+
+
+class _Document(object):
+    # Events of one document, with any shift of their marks still pending.
+    __slots__ = ('start', 'line', 'head_end', '_events', '_index_delta',
+            '_line_delta')
+
+    def __init__(self, start, line, head_end, events):
+        self.start = start
+        self.line = line
+        self.head_end = head_end
+        self._events = events
+        self._index_delta = 0
+        self._line_delta = 0
+
+    def shift(self, index_delta, line_delta):
+        self.start += index_delta
+        self.line += line_delta
+        self.head_end += index_delta
+        self._index_delta += index_delta
+        self._line_delta += line_delta
+
+    def events(self):
+        if self._events is not None and (self._index_delta or
+                self._line_delta):
+            _shift_marks(self._events, self._index_delta, self._line_delta)
+        self._index_delta = 0
+        self._line_delta = 0
+        return self._events
+
+
+def _segments_of(documents):
+    return [documents[i:i + _segment_size]
+            for i in range(0, len(documents), _segment_size)]
+
+
+class IncrementalElaborator(object):
+    """
+    Holds a YAML text and its elaborated events per document, and updates
+    them after edits by re-elaborating only the documents an edit touches.
+
+    ``Loader`` is used to parse each re-elaborated region, and ``name`` is
+    the source name used in marks. Further keyword arguments are elaborator
+    settings; ``flat``, ``including_ends``, and ``single`` are always
+    overridden.
+
+    If re-elaborating after an edit fails, the edit is still applied, the
+    touched documents are replaced by a single document whose events are
+    ``None``, and the error (with marks relative to the whole text) is
+    raised. That region is elaborated again by the next edit that touches
+    it.
+    """
+
+    def __init__(self, text, Loader=yaml.Loader, name='<unicode string>',
+            **kwargs):
+        self._Loader = Loader
+        self._name = name
+        self._kwargs = kwargs
+        self._text = ''
+        # Lists of consecutive documents. For each, the index of its first
+        # document, and the offset and line where that document starts; the
+        # documents themselves are shifted to match when next used.
+        self._segments = []
+        self._firsts = []
+        self._starts = []
+        self._lines = []
+        self._count = 0
+        self._stream_start_event = None
+        self._stream_end_event = None
+
+        self.edit(0, 0, text)
+
+    @property
+    def text(self):
+        return self._text
+
+    def __len__(self):
+        return self._count
+
+    def document_events(self, index):
+        """
+        Returns the list of events of the document at ``index``, or ``None``
+        if that document failed to elaborate.
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("document index out of range")
+        return self._document(index).events()
+
+    def events(self):
+        """
+        Yields the events of the whole stream, including the
+        ``StreamStartEvent`` and ``StreamEndEvent``.
+        """
+        yield self._stream_start_event
+        for number in range(len(self._segments)):
+            for document in self._settle(number):
+                for ee in document.events() or (): yield ee
+        yield self._stream_end_event
+
+    def edit(self, start, end, replacement):
+        """
+        Replaces ``text[start:end]`` with ``replacement`` and re-elaborates
+        the documents the edit touches. Returns a ``DocumentChange``.
+        """
+        old_text = self._text
+        text = old_text[:start] + replacement + old_text[end:]
+        index_delta = len(replacement) - (end - start)
+        line_delta = replacement.count('\n') - old_text.count('\n', start, end)
+
+        count = self._count
+        first, last = self._touched_range(start, end)
+
+        # Extend the region past documents whose start the edit may move.
+        while (last + 1 < count and not _is_explicit_start(old_text,
+                self._document(last + 1).start)):
+            last += 1
+
+        if first == 0:
+            region_start, region_line = 0, 0
+        else:
+            region_start = self._document(first).start
+            region_line = self._document(first).line
+        if last + 1 < count:
+            region_end = self._document(last + 1).start + index_delta
+        else:
+            region_end = len(text)
+
+        self._text = text
+        has_tail = last + 1 < count
+        if has_tail:
+            self._shift_from(last + 1, index_delta, line_delta)
+            _shift_marks([self._stream_end_event], index_delta, line_delta)
+
+        try:
+            stream_start_event, new_documents, stream_end_event = (
+                    self._elaborate(text[region_start:region_end],
+                        region_start, region_line))
+        except MarkedYAMLError:
+            # Until it elaborates again, treat the whole region as the
+            # start marker of a document.
+            self._replace(first, last, [_Document(region_start, region_line,
+                    region_end, None)])
+            raise
+
+        if first == 0:
+            self._stream_start_event = stream_start_event
+        if not has_tail:
+            self._stream_end_event = stream_end_event
+        self._replace(first, last, new_documents)
+
+        return DocumentChange(first, last + 1 - first,
+                [document.events() for document in new_documents])
+
+    def _locate(self, index):
+        # Position of the segment holding the document at index, and the
+        # position of the document in it.
+        number = bisect_right(self._firsts, index) - 1
+        return number, index - self._firsts[number]
+
+    def _settle(self, number):
+        # Shifts the documents of a segment to where the segment starts, and
+        # returns them.
+        documents = self._segments[number]
+        first = documents[0]
+        index_delta = self._starts[number] - first.start
+        line_delta = self._lines[number] - first.line
+        if index_delta or line_delta:
+            for document in documents:
+                document.shift(index_delta, line_delta)
+        return documents
+
+    def _document(self, index):
+        number, position = self._locate(index)
+        return self._settle(number)[position]
+
+    def _last_starting_by(self, offset):
+        # Index of the last document whose span starts at or before offset
+        # (the span of the first document starting at 0).
+        number = max(bisect_right(self._starts, offset) - 1, 0)
+        starts = [document.start for document in self._settle(number)]
+        position = max(bisect_right(starts, offset) - 1, 0)
+        return self._firsts[number] + position
+
+    def _touched_range(self, start, end):
+        # Indices of the first and last documents whose spans, taken as
+        # closed intervals, intersect [start, end], plus the document before
+        # the first if the edit starts within the first's start marker.
+        if not self._count:
+            return 0, -1
+        first = self._last_starting_by(start)
+        last = self._last_starting_by(end)
+        if first > 0 and start <= self._document(first).head_end:
+            # The edit may remove what separates the document from the one
+            # before it.
+            first -= 1
+        return first, last
+
+    def _shift_from(self, index, index_delta, line_delta):
+        # Shifts the documents from index on; those of later segments are
+        # only shifted when next used.
+        number, position = self._locate(index)
+        if position:
+            for document in self._settle(number)[position:]:
+                document.shift(index_delta, line_delta)
+            number += 1
+        if index_delta:
+            self._starts[number:] = [start + index_delta
+                    for start in self._starts[number:]]
+        if line_delta:
+            self._lines[number:] = [line + line_delta
+                    for line in self._lines[number:]]
+
+    def _replace(self, first, last, new_documents):
+        # Replaces the documents from first through last (none if last is
+        # first - 1) with new_documents.
+        segments = self._segments
+        if not segments:
+            first_number, last_number = 0, -1
+            documents = new_documents
+        else:
+            if first < self._count:
+                first_number, first_position = self._locate(first)
+            else:
+                first_number = len(segments) - 1
+                first_position = len(segments[-1])
+            if last >= first:
+                last_number, last_position = self._locate(last)
+            else:
+                last_number, last_position = first_number, first_position - 1
+
+            documents = (self._settle(first_number)[:first_position]
+                    + new_documents
+                    + self._settle(last_number)[last_position + 1:])
+            # Absorb a following segment rather than leave a small one.
+            if (len(documents) < _segment_size // 2
+                    and last_number + 1 < len(segments)):
+                last_number += 1
+                documents += self._settle(last_number)
+
+        new_segments = _segments_of(documents)
+        replaced = slice(first_number, last_number + 1)
+        segments[replaced] = new_segments
+        self._starts[replaced] = [segment[0].start
+                for segment in new_segments]
+        self._lines[replaced] = [segment[0].line for segment in new_segments]
+
+        count_delta = len(new_documents) - (last + 1 - first)
+        self._count += count_delta
+        firsts = self._firsts
+        index = firsts[first_number] if first_number < len(firsts) else 0
+        new_firsts = []
+        for segment in new_segments:
+            new_firsts.append(index)
+            index += len(segment)
+        tail = firsts[last_number + 1:]
+        if count_delta:
+            tail = [other + count_delta for other in tail]
+        firsts[first_number:] = new_firsts + tail
+
+    def _elaborate(self, text, index_base, line_base):
+        # Elaborate a region of the text, returning its stream start event,
+        # its documents, and its stream end event.
+        loader = self._Loader(text)
+        settings = ElaboratorSettings.default._replace(**self._kwargs)._replace(
+                parser=loader, flat=True, including_ends=True, single=False)
+
+        try:
+            events = list(Elaborator(settings).process())
+        except MarkedYAMLError as e:
+            _shift_error(e, index_base, line_base, self._name)
+            raise
+        finally:
+            loader.dispose()
+
+        _shift_marks(events, index_base, line_base, self._name)
+
+        documents = []
+        document_events = None
+        for event in events[1:-1]:
+            if isinstance(event, DocumentStartEvent):
+                document_events = []
+                if documents:
+                    start = _line_start(event.start_mark)
+                    line = event.start_mark.line
+                else:
+                    start, line = index_base, line_base
+                documents.append(_Document(start, line,
+                        event.end_mark.index, document_events))
+            document_events.append(event)
+
+        return events[0], documents, events[-1]
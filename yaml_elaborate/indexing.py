@@ -0,0 +1,68 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Key indexes for composed mappings.
+
+With the elaborator's ``indexing_keys`` setting, each composed mapping keeps
+a dict from the index key of each of its scalar keys to the position of its
+pair, filled in as pairs arrive. The index key of a scalar is its resolved tag
+together with its canonical value (see ``yaml_elaborate.scalars``), so keys
+that are equal as data, such as ``0x10`` and ``16``, are the same key. Keys
+that are collections, and merge (``<<``) keys, are not indexed.
+"""
+
+__all__ = ['IndexedMappingNode', 'index_key']
+
+from yaml.nodes import ScalarNode, MappingNode
+
+from .scalars import canonical_scalar_value
+
+_str_tag = 'tag:yaml.org,2002:str'
+_merge_tag = 'tag:yaml.org,2002:merge'
+
+
+def index_key(key, tag=_str_tag):
+    """
+    Returns the index key of ``key``, which is either a node or scalar text
+    to be taken as having ``tag``. Returns ``None`` if such a key is not
+    indexed.
+    """
+    if isinstance(key, ScalarNode):
+        tag = key.tag
+        key = key.value
+    elif not isinstance(key, str):
+        return None
+    if tag == _merge_tag:
+        return None
+    return (tag, canonical_scalar_value(tag, key))
+
+
+class IndexedMappingNode(MappingNode):
+    """
+    ``MappingNode`` whose ``key_index`` maps the index key of each indexed key
+    to the position in ``value`` of the last pair with that key.
+    """
+
+    def __init__(self, tag, value, start_mark=None, end_mark=None,
+            flow_style=None):
+        super(IndexedMappingNode, self).__init__(tag, value, start_mark,
+                end_mark, flow_style)
+        self.key_index = {}
+
+    def get(self, key, default=None, tag=_str_tag):
+        """
+        Returns the value node of the last pair whose key equals ``key``, a
+        node or scalar text to be taken as having ``tag``, or ``default`` if
+        there is none.
+        """
+        position = self.key_index.get(index_key(key, tag))
+        if position is None:
+            return default
+        return self.value[position][1]
@@ -0,0 +1,84 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Interning of repeated strings.
+
+Each event from the parser carries its own string objects, so a tag, an
+anchor, a mapping key, or an enum-like value repeated throughout a stream is
+held as a separate copy by every retained event or node. An ``InternTable``
+maps each string it has seen to the first object seen with that text, so that
+all copies after the first can be dropped in favour of that one.
+
+The table is bounded: once it holds ``max_size`` strings, strings not already
+in it are passed through unchanged. It counts hits and misses and estimates
+the memory saved, which is the size of each duplicate replaced by the
+interned copy (freed if nothing else refers to the duplicate).
+"""
+
+__all__ = ['InternTable', 'InternStatistics']
+
+from collections import namedtuple
+
+
+InternStatistics = namedtuple('InternStatistics',
+        ['size', 'hits', 'misses', 'saved_bytes'])
+InternStatistics.__doc__ = """
+Counts of an ``InternTable``: strings held, strings replaced by an interned
+copy, strings not found, and the total size in bytes of the replaced strings.
+"""
+
+
+class InternTable(object):
+    """
+    Bounded table of interned strings.
+    """
+
+    def __init__(self, max_size=65536):
+        self._max_size = max_size
+        self._table = {}
+        self._hits = 0
+        self._misses = 0
+        self._saved_bytes = 0
+
+    def intern(self, text):
+        """
+        Returns the interned string equal to ``text``, adding ``text`` to the
+        table if it is not there and the table is not full. ``None`` is
+        returned unchanged.
+        """
+        if text is None:
+            return None
+        try:
+            interned = self._table[text]
+        except KeyError:
+            self._misses += 1
+            if len(self._table) < self._max_size:
+                self._table[text] = text
+            return text
+        if interned is not text:
+            self._hits += 1
+            self._saved_bytes += sys.getsizeof(text)
+        return interned
+
+    def statistics(self):
+        """
+        Returns the ``InternStatistics`` of this table so far.
+        """
+        return InternStatistics(len(self._table), self._hits, self._misses,
+                self._saved_bytes)
+
+    def clear(self):
+        """
+        Empties the table and resets its statistics.
+        """
+        self._table = {}
+        self._hits = 0
+        self._misses = 0
+        self._saved_bytes = 0
@@ -0,0 +1,187 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Memory regression harness for the streaming guarantees.
+
+Generated YAML streams of increasing size are read, without ever being held
+in memory whole, through ``process_stream()`` under several settings while
+``tracemalloc`` records the peak memory of each run. Where streaming is
+promised (elaborating without ``composing_fully``, streams of many small
+documents, and the Saxifier), the peak must stay flat as the input grows;
+the other scenarios are only reported, to show their growth.
+
+Run it as::
+
+    python -m yaml_elaborate.memcheck [SIZE ...]
+
+It prints the peak of each scenario at each size and exits with status 1 if
+the peak of a flat scenario grew, fitted across the sizes, by more than a
+quarter of a byte per record or document. ``check_memory()`` does the same
+from Python and returns the results.
+"""
+
+__all__ = ['check_memory', 'Result']
+
+from collections import namedtuple
+import tracemalloc
+
+from xml.sax.handler import ContentHandler
+
+from . import process_stream, saxify_event_stream
+
+
+Result = namedtuple('Result', ['scenario', 'flat', 'peaks', 'passed'])
+Result.__doc__ = """
+Peak memory, in bytes, of one scenario at each size (in the order the sizes
+were given). ``flat`` is whether the scenario promises flat memory, and
+``passed`` whether it kept that promise (always true if it makes none).
+"""
+
+# Allowed growth of the peak of a flat scenario, in bytes per record or
+# document, fitted across the sizes. The peaks of these scenarios (about 20
+# to 26 KiB) vary by a few hundred bytes between sizes, while a leak of one
+# byte per item has a slope of 1.
+_max_flat_slope = 0.25
+
+_default_sizes = (1000, 4000, 16000)
+
+
+class _GeneratedStream(object):
+    # File-like object reading text from an iterator of chunks, so that the
+    # input is never in memory whole.
+    name = '<generated>'
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        result = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return result
+
+
+def _one_document(size):
+    # A single document: a sequence of small records.
+    for i in range(size):
+        yield ("- name: item%d\n  value: %d\n  tags: [a, b, 'c']\n"
+                "  note: |\n    line %d\n" % (i, i, i))
+
+def _many_documents(size):
+    # A stream of small documents.
+    for i in range(size):
+        yield "--- {name: item%d, value: %d, tags: [a, b]}\n" % (i, i)
+
+
+def _elaborate(chunks, **kwargs):
+    for ee in process_stream(_GeneratedStream(chunks), flat=True, **kwargs):
+        pass
+
+def _saxify(chunks):
+    saxify_event_stream(process_stream(_GeneratedStream(chunks), flat=True),
+            ContentHandler())
+
+
+# (name, promises flat memory, function of size)
+_scenarios = (
+        ('one document', True,
+            lambda size: _elaborate(_one_document(size))),
+        ('one document, extra events off', True,
+            lambda size: _elaborate(_one_document(size),
+                with_extra_events=False)),
+        ('one document, hashing', True,
+            lambda size: _elaborate(_one_document(size),
+                hashing_content=True)),
+        ('many documents', True,
+            lambda size: _elaborate(_many_documents(size))),
+        ('many documents, composing fully', True,
+            lambda size: _elaborate(_many_documents(size),
+                composing_fully=True)),
+        ('saxifier', True,
+            lambda size: _saxify(_one_document(size))),
+        ('one document, composing fully', False,
+            lambda size: _elaborate(_one_document(size),
+                composing_fully=True)),
+        ('one document, compact', False,
+            lambda size: _elaborate(_one_document(size),
+                composing_fully='compact')),
+        ('one document, composing, interning', False,
+            lambda size: _elaborate(_one_document(size),
+                composing_fully=True, interning_strings=True,
+                interning_scalars_up_to=16)),
+        )
+
+
+def _peak(function, size):
+    tracemalloc.start()
+    try:
+        function(size)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _slope(sizes, peaks):
+    # Least-squares growth of peaks per unit of size.
+    if len(sizes) < 2:
+        return 0.0
+    mean_size = sum(sizes) / len(sizes)
+    mean_peak = sum(peaks) / len(peaks)
+    variance = sum((size - mean_size) ** 2 for size in sizes)
+    if not variance:
+        return 0.0
+    return sum((size - mean_size) * (peak - mean_peak)
+            for size, peak in zip(sizes, peaks)) / variance
+
+def check_memory(sizes=_default_sizes, report=None):
+    """
+    Runs every scenario at each of ``sizes`` (numbers of records or
+    documents) and returns a list of ``Result``. If ``report`` is given, it
+    is called with each line of a printable table as results come in.
+    """
+    sizes = sorted(sizes)
+    if report is not None:
+        report("%-36s %s" % ("scenario (peak KiB)",
+                " ".join("%9d" % size for size in sizes)))
+
+    # Warm up imports and caches so that they do not count as growth.
+    for name, flat, function in _scenarios:
+        function(10)
+
+    results = []
+    for name, flat, function in _scenarios:
+        peaks = [_peak(function, size) for size in sizes]
+        passed = not flat or _slope(sizes, peaks) <= _max_flat_slope
+        results.append(Result(name, flat, peaks, passed))
+        if report is not None:
+            note = '' if not flat else ('  flat' if passed else '  GREW')
+            report("%-36s %s%s" % (name,
+                    " ".join("%9d" % (peak // 1024) for peak in peaks), note))
+    return results
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    sizes = [int(arg) for arg in args] or _default_sizes
+    results = check_memory(sizes, report=print)
+    failed = [result.scenario for result in results if not result.passed]
+    if failed:
+        print("memory grew in: %s" % ", ".join(failed))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
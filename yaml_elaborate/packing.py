@@ -0,0 +1,166 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Packing of numeric sequence elements into arrays.
+
+Used by the elaborator's ``packing_numbers`` setting. Plain decimal integers
+and floats are recognized with a single pattern instead of the resolver's
+per-character list of patterns, and their text is converted in batches; the
+result is a NumPy array if NumPy is installed, or an ``array.array``
+otherwise.
+"""
+
+__all__ = ['NumberPacker', 'simple_number_kind', 'resolves_numbers_simply',
+        'concatenate_packed']
+
+from array import array
+import re
+
+from yaml.resolver import Resolver
+
+from .scalars import construct_scalar_value
+
+_int_tag = 'tag:yaml.org,2002:int'
+_float_tag = 'tag:yaml.org,2002:float'
+
+_batch_size = 1024
+
+# Subsets of the YAML 1.1 int and float patterns of yaml.resolver.Resolver
+# which Python's int() and float() parse identically. The int pattern is
+# limited to 18 digits so that every match fits in a signed 64-bit integer.
+_simple_number_pattern = re.compile(r'''^(?:
+    (?P<int>[-+]?(?:0|[1-9][0-9]{0,17}))
+    |(?P<float>[-+]?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?)
+    )$''', re.X)
+
+_simple_number_match = _simple_number_pattern.match
+
+_number_first_characters = '-+.0123456789'
+
+def resolves_numbers_simply(resolver):
+    """
+    Returns whether ``resolver`` resolves plain scalars matching the simple
+    number patterns exactly as ``yaml.resolver.Resolver`` does, so that
+    ``simple_number_kind()`` may stand in for it.
+    """
+    try:
+        implicit_resolvers = resolver.yaml_implicit_resolvers
+        path_resolvers = resolver.yaml_path_resolvers
+    except AttributeError:
+        return False
+    if path_resolvers:
+        return False
+    standard = Resolver.yaml_implicit_resolvers
+    for first in tuple(_number_first_characters) + (None,):
+        if implicit_resolvers.get(first) != standard.get(first):
+            return False
+    return True
+
+def simple_number_kind(value):
+    """
+    Returns ``'int'`` or ``'float'`` if ``value`` is plain scalar text
+    matching one of the simple number patterns, and ``None`` otherwise.
+    """
+    match = _simple_number_match(value)
+    if match is None:
+        return None
+    return match.lastgroup
+
+
+class NumberPacker(object):
+    """
+    Accumulates the numeric elements of a sequence. Integers are stored as
+    signed 64-bit values until the first float is added, after which all
+    values are stored as doubles.
+
+    ``withheld`` holds events that the elaborator has not yet yielded, to be
+    released if the sequence turns out to contain other elements.
+    """
+
+    def __init__(self, withholding=False):
+        self.withholding = withholding
+        self.withheld = []
+        self._values = array('q')
+        self._pending = []
+        self._pending_float = False
+
+    def add_text(self, text, is_float):
+        # Add the text of a simple number; conversion is batched.
+        self._pending.append(text)
+        if is_float:
+            self._pending_float = True
+        if len(self._pending) >= _batch_size:
+            self._convert_pending()
+
+    def add_value(self, value):
+        # Add an already-constructed number. Returns False if it cannot be
+        # stored.
+        self._convert_pending()
+        if isinstance(value, float) and self._values.typecode != 'd':
+            self._values = array('d', self._values)
+        try:
+            self._values.append(value)
+        except OverflowError:
+            return False
+        return True
+
+    def add_node(self, node):
+        # Add the value of an int or float ScalarNode. Returns False for any
+        # other node.
+        tag = getattr(node, 'tag', None)
+        if tag not in (_int_tag, _float_tag) or not isinstance(
+                node.value, str):
+            return False
+        try:
+            value = construct_scalar_value(tag, node.value)
+        except ValueError:
+            return False
+        return self.add_value(value)
+
+    def _convert_pending(self):
+        pending = self._pending
+        if not pending:
+            return
+        if self._pending_float and self._values.typecode != 'd':
+            self._values = array('d', self._values)
+        if self._values.typecode == 'd':
+            self._values.extend(map(float, pending))
+        else:
+            self._values.extend(map(int, pending))
+        self._pending = []
+        self._pending_float = False
+
+    def values(self):
+        """
+        Returns the packed values as a NumPy array, or as an
+        ``array.array`` if NumPy is not installed.
+        """
+        self._convert_pending()
+        try:
+            import numpy
+        except ImportError:
+            return self._values
+        dtype = numpy.float64 if self._values.typecode == 'd' else numpy.int64
+        return numpy.frombuffer(self._values, dtype=dtype)
+
+def concatenate_packed(parts):
+    """
+    Concatenates packed value arrays, as returned by ``NumberPacker.values()``,
+    into one. If any part holds floats, the result holds floats.
+    """
+    if any(isinstance(part, array) for part in parts):
+        typecodes = set(part.typecode for part in parts)
+        result = array('d' if 'd' in typecodes else 'q')
+        for part in parts:
+            result.extend(part if part.typecode == result.typecode
+                    else array(result.typecode, part))
+        return result
+    import numpy
+    return numpy.concatenate(parts)
@@ -0,0 +1,390 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Parallel elaboration of a single large document.
+
+When a stream holds one document whose top level is a block sequence or
+block mapping, the text is split at the lines where its top-level items
+begin (found by scanning for lines starting in column 0, without parsing),
+and consecutive runs of items ("shards") are elaborated in worker processes.
+Each shard is parsed as a document of the same kind as the whole, so keys,
+tags, and the parent collection seen by the resolver are as they would be
+for the whole document. The events of the shards are then stitched back
+together in order: the marks of each shard are shifted to their place in the
+whole text, the indices of top-level ``ElementStartEvent`` and
+``ElementEndEvent`` are renumbered, and per-collection results on the
+top-level end event (``content_hash``, ``packed_values``) are recombined.
+If ``Loader`` reads with PyYAML's pure-Python reader, the marks are also
+given the whole text as their buffer, as in a serial run, so that they show
+a snippet of it.
+
+The scan is only a guess at item boundaries, so it is checked: if any shard
+fails to elaborate or does not hold exactly the items expected of it, or if
+the shards together would break an anchor rule or a configured limit, the
+whole text is elaborated serially instead, which also reports any error with
+its proper marks. The serial path is also taken when the document cannot be
+sharded (several documents, flow or tagged top level, too few items) or the
+settings cannot be honored in parallel: path resolvers (which may check
+sequence indices), ``composing_fully``, a given ``parser`` or ``resolver``
+object, a ``max_alias_expansion`` budget, ``rejecting_duplicate_keys``
+(whose top-level keys would be split across shards), spilled scalars (which
+cannot be sent back from workers), checkpointing or resuming, and
+``hashing_content`` combined with withheld packed element events.
+"""
+
+__all__ = ['process_stream_parallel']
+
+import multiprocessing
+import re
+
+import yaml
+from yaml.error import YAMLError
+from yaml.reader import Reader
+from yaml.events import (StreamStartEvent, StreamEndEvent,
+        DocumentStartEvent, DocumentEndEvent,
+        SequenceStartEvent, SequenceEndEvent,
+        MappingStartEvent, MappingEndEvent,
+        AliasEvent, ScalarEvent)
+
+from .elaborator import Elaborator, ElaboratorSettings
+from .events import (ElementStartEvent, ElementEndEvent, PairValueEndEvent,
+        PairEndEvent)
+from .hashing import SequenceHasher, MappingHasher
+from .incremental import _shift_marks
+from .packing import concatenate_packed
+
+_seq_tag = 'tag:yaml.org,2002:seq'
+_map_tag = 'tag:yaml.org,2002:map'
+
+# Blank, comment, and directive lines, and a bare document start marker,
+# before the first item.
+_header_line = re.compile(r'''(?:[ \t]*(?:\#[^\n]*)?|%[^\n]*
+        |---[ \t]*(?:\#[^\n]*)?)(?:\n|\Z)''', re.X)
+
+# Lines starting in column 0 with neither whitespace nor a comment.
+_item_line = re.compile(r'^[^ \t\r\n#]', re.M)
+
+_marker_line = re.compile(r'(?:---|\.\.\.)(?:[ \t\r\n]|\Z)')
+_entry_line = re.compile(r'-(?:[ \t\r\n]|\Z)')
+
+
+def _scan_items(text):
+    # Returns (kind, offsets): whether the top level looks like a block
+    # sequence ('seq') or block mapping ('map'), and the offset of the first
+    # line of each top-level item. Returns (None, None) if the text cannot be
+    # split.
+    position = 0
+    while position < len(text):
+        match = _header_line.match(text, position)
+        if match is None or match.end() == position:
+            break
+        position = match.end()
+    if position >= len(text):
+        return None, None
+
+    kind = 'seq' if _entry_line.match(text, position) else 'map'
+    offsets = []
+    for match in _item_line.finditer(text, position):
+        offset = match.start()
+        if _marker_line.match(text, offset):
+            # Another document, or an explicit end; not split.
+            return None, None
+        if kind == 'seq':
+            if _entry_line.match(text, offset):
+                offsets.append(offset)
+        elif text[offset] != ':' and not _entry_line.match(text, offset):
+            # A line starting with ':' continues an explicit ('?') key, and
+            # one starting with '-' is an entry of an indentless sequence.
+            offsets.append(offset)
+    return kind, offsets
+
+
+def _elaborate_shard(shard):
+    # Runs in a worker process. Returns the list of events of the shard,
+    # with marks relative to the whole text, or None if it fails.
+    text, Loader, kwargs, index_base, line_base, name = shard
+    loader = Loader(text)
+    settings = ElaboratorSettings.default._replace(**kwargs)._replace(
+            parser=loader, flat=True, including_ends=True, single=False)
+    try:
+        events = list(Elaborator(settings).process())
+    except YAMLError:
+        return None
+    finally:
+        loader.dispose()
+    _shift_marks(events, index_base, line_base, name)
+    return events
+
+
+class _Stitcher(object):
+    # Combines the event lists of the shards, or finds that they cannot be
+    # combined.
+
+    def __init__(self, kind, settings):
+        self._start_type = (SequenceStartEvent if kind == 'seq'
+                else MappingStartEvent)
+        self._end_type = (SequenceEndEvent if kind == 'seq'
+                else MappingEndEvent)
+        self._default_tag = _seq_tag if kind == 'seq' else _map_tag
+        self._children_per_item = 1 if kind == 'seq' else 2
+        self._settings = settings
+
+    def _is_plain_shard(self, events):
+        # Whether events are those of a single document whose top level is
+        # an untagged, unanchored block collection of the expected kind.
+        if len(events) < 6:
+            return False
+        start = events[2]
+        return (isinstance(events[0], StreamStartEvent)
+                and isinstance(events[1], DocumentStartEvent)
+                and type(start) is self._start_type
+                and start.anchor is None and not start.flow_style
+                and start.implicit
+                and start.tag in (None, self._default_tag)
+                and type(events[-3]) is self._end_type
+                and isinstance(events[-2], DocumentEndEvent)
+                and isinstance(events[-1], StreamEndEvent))
+
+    def stitch(self, shards, item_counts):
+        # Returns the list of events of the whole document, or None.
+        settings = self._settings
+        hashing = settings.hashing_content
+        withholding = (settings.packing_numbers
+                and not settings.with_packed_element_events)
+
+        if hashing:
+            if self._start_type is SequenceStartEvent:
+                hasher = SequenceHasher(shards[0][2].tag)
+            else:
+                hasher = MappingHasher(shards[0][2].tag)
+
+        anchors = set()
+        packed = []
+        withheld_shards = 0
+        items = []
+        total = 0
+        for events, item_count in zip(shards, item_counts):
+            if not self._is_plain_shard(events):
+                return None
+            end = events[-3]
+            inner = events[3:-3]
+
+            children = 0
+            depth = 0
+            for ee in inner:
+                anchor = getattr(ee, 'anchor', None)
+                if anchor is not None and not isinstance(ee, AliasEvent):
+                    if anchor in anchors:
+                        return None
+                    anchors.add(anchor)
+
+                if isinstance(ee, (SequenceStartEvent, MappingStartEvent)):
+                    depth += 1
+                    continue
+                if isinstance(ee, (SequenceEndEvent, MappingEndEvent)):
+                    depth -= 1
+                    completed = depth == 0
+                else:
+                    completed = depth == 0 and isinstance(ee,
+                            (ScalarEvent, AliasEvent))
+                if completed:
+                    children += 1
+                    if hashing:
+                        hasher.add(ee.content_hash)
+                elif depth == 0 and isinstance(ee,
+                        (ElementStartEvent, ElementEndEvent)):
+                    ee.index += total
+
+            packed_values = getattr(end, 'packed_values', None)
+            if packed_values is not None:
+                packed.append(packed_values)
+                if withholding and not children:
+                    children = len(packed_values)
+                    withheld_shards += 1
+
+            if children != item_count * self._children_per_item:
+                return None
+            total += item_count
+            items.append(inner)
+
+        if settings.max_collection_size is not None and (
+                total > settings.max_collection_size):
+            return None
+        if settings.max_anchors is not None and (
+                len(anchors) > settings.max_anchors):
+            return None
+
+        # The events closing the last item of a shard are marked where the
+        # next item begins, as they would be in the whole document.
+        for inner, next_inner in zip(items, items[1:]):
+            if not next_inner:
+                continue
+            mark = next_inner[0].start_mark
+            for ee in reversed(inner):
+                if not isinstance(ee, (ElementEndEvent, PairValueEndEvent,
+                        PairEndEvent)):
+                    break
+                ee.start_mark = ee.end_mark = mark
+
+        if 0 < withheld_shards < len(shards):
+            # Some shards withheld events that the whole would not.
+            return None
+        if withheld_shards and len(set(_holds_floats(values)
+                for values in packed)) > 1:
+            # The whole mixes ints and floats, so it would not withhold.
+            return None
+
+        end = shards[-1][-3]
+        if len(packed) == len(shards):
+            end.packed_values = concatenate_packed(packed)
+        elif packed and withholding:
+            # Some shards withheld events that the whole would not.
+            return None
+        elif hasattr(end, 'packed_values'):
+            del end.packed_values
+        if hashing:
+            end.content_hash = hasher.hexdigest()
+
+        result = shards[0][:3]
+        for inner in items:
+            result.extend(inner)
+        result.extend(shards[-1][-3:])
+        return result
+
+
+def _process_serially(text, name, Loader, settings):
+    loader = Loader(text)
+    loader.name = name
+    try:
+        for ee in Elaborator(settings._replace(parser=loader)).process():
+            yield ee
+    finally:
+        loader.dispose()
+
+def _process_events(events, settings):
+    # Yield events as Elaborator.process() would with these settings.
+    including_ends = settings.including_ends
+    if including_ends is None:
+        including_ends = settings.flat
+    groups = [events[1:-1]]
+    if including_ends:
+        groups = [events[:1]] + groups + [events[-1:]]
+    if settings.flat:
+        for group in groups:
+            for ee in group: yield ee
+    else:
+        for group in groups:
+            yield iter(group)
+
+def _attach_buffer(events, text):
+    # Give the marks of events the buffer and pointer that marks made by a
+    # pure-Python reader of the whole text have, so that they show a
+    # snippet of it.
+    buffer = text + '\0'
+    for event in events:
+        for mark in (event.start_mark, event.end_mark):
+            if mark is not None:
+                mark.buffer = buffer
+                mark.pointer = mark.index
+
+def _holds_floats(packed_values):
+    # Whether packed values (an array.array or NumPy array) are floats.
+    typecode = getattr(packed_values, 'typecode', None)
+    if typecode is not None:
+        return typecode == 'd'
+    return packed_values.dtype.kind == 'f'
+
+def _can_shard(settings, Loader):
+    if (settings.parser is not None or settings.resolver is not None
+            or settings.composing_fully or not settings.resolving_tags):
+        return False
+    if settings.max_documents is not None and settings.max_documents < 1:
+        return False
+    if (settings.hashing_content and settings.packing_numbers
+            and not settings.with_packed_element_events):
+        return False
+    if settings.max_alias_expansion is not None:
+        return False
+    if settings.rejecting_duplicate_keys:
+        return False
+    if settings.spilling_scalars_over is not None:
+        return False
+    if settings.checkpointing or settings.resumed_from is not None:
+        return False
+    return not getattr(Loader, 'yaml_path_resolvers', None)
+
+def process_stream_parallel(stream, Loader=yaml.Loader, workers=None,
+        shards_per_worker=4, min_items_per_shard=256, **kwargs):
+    """
+    Elaborate on a stream holding one large document, using ``workers``
+    processes (default: the number of CPUs) when its top level can be split
+    into shards (see ``yaml_elaborate.parallel``). The output is the same as
+    that of ``process_stream()`` with the same ``Loader`` and settings.
+
+    The text is split into about ``shards_per_worker`` shards per worker,
+    each with at least ``min_items_per_shard`` top-level items. In parallel
+    mode, no events are produced until every shard has been elaborated.
+    ``stream`` may be a string or a file object read as a string; bytes are
+    elaborated serially.
+    """
+    name = '<unicode string>'
+    if not isinstance(stream, str):
+        name = getattr(stream, 'name', '<file>')
+        stream = stream.read()
+    text = stream
+
+    settings = ElaboratorSettings.default._replace(**kwargs)
+
+    if not isinstance(text, str) or not _can_shard(settings, Loader):
+        return _process_serially(text, name, Loader, settings)
+
+    kind, offsets = _scan_items(text)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if offsets:
+        shard_count = min(workers * shards_per_worker,
+                len(offsets) // min_items_per_shard)
+    else:
+        shard_count = 0
+    if workers < 2 or shard_count < 2:
+        return _process_serially(text, name, Loader, settings)
+
+    # Shard boundaries, as indices into offsets; the first shard also holds
+    # anything before the first item.
+    bounds = [len(offsets) * i // shard_count for i in range(shard_count + 1)]
+    starts = [0] + [offsets[bounds[i]] for i in range(1, shard_count)]
+    ends = starts[1:] + [len(text)]
+    item_counts = [bounds[i + 1] - bounds[i] for i in range(shard_count)]
+
+    shard_kwargs = dict(kwargs)
+    shards = []
+    line = 0
+    previous = 0
+    for start, end in zip(starts, ends):
+        line += text.count('\n', previous, start)
+        previous = start
+        shards.append((text[start:end], Loader, shard_kwargs, start, line,
+                name))
+
+    pool = multiprocessing.Pool(min(workers, shard_count))
+    try:
+        results = pool.map(_elaborate_shard, shards, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    events = None
+    if all(result is not None for result in results):
+        events = _Stitcher(kind, settings).stitch(results, item_counts)
+    if events is None:
+        return _process_serially(text, name, Loader, settings)
+    if issubclass(Loader, Reader):
+        _attach_buffer(events, text)
+    return _process_events(events, settings)
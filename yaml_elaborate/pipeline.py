@@ -0,0 +1,160 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Pipelined parsing: reading and parsing run in a producer thread and hand
+events over in chunks through a bounded queue.
+
+``PipelinedParser`` wraps any object with PyYAML's ``get_event()`` (such as a
+``yaml.Loader`` or ``yaml.CLoader``) and presents the ``peek_event()``,
+``check_event()``, and ``get_event()`` interface expected of the ``parser``
+setting of the elaborator. While the consumer elaborates one chunk, the
+producer reads and parses the next ones, so slow input no longer stalls
+elaboration and output until the queue is empty. When the queue is full, the
+producer waits.
+"""
+
+__all__ = ['PipelinedParser']
+
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from yaml.events import StreamEndEvent
+
+
+class _Failure(object):
+    # Queue item carrying an exception raised by the producer.
+    def __init__(self, error):
+        self.error = error
+
+
+class PipelinedParser(object):
+    """
+    Runs ``parser.get_event()`` in a separate thread, passing events to the
+    consuming thread in lists of up to ``chunk_size`` events through a queue
+    holding at most ``queue_size`` lists.
+
+    An exception raised while parsing (including a ``MarkedYAMLError`` with
+    its marks) is raised again in the consuming thread when it reaches the
+    point in the stream where the error occurred. ``close()`` stops the
+    producer and waits for it to exit; it must be called before the wrapped
+    parser is disposed of, and is safe to call whether or not the stream was
+    read to the end.
+
+    Only the parsing side of ``parser`` is used from the producer thread; if
+    ``parser`` is also a resolver (as a ``yaml.Loader`` is), it may still be
+    used as the resolver from the consuming thread.
+    """
+
+    def __init__(self, parser, chunk_size=256, queue_size=16):
+        self._parser = parser
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(queue_size)
+        self._stopping = threading.Event()
+
+        self._chunk = []
+        self._position = 0
+        self._ended = False
+
+        self._thread = threading.Thread(target=self._produce,
+                name='yaml_elaborate pipelined parser')
+        self._thread.daemon = True
+        self._thread.start()
+
+    # Producer
+
+    def _produce(self):
+        chunk_size = self._chunk_size
+        get_event = self._parser.get_event
+        try:
+            chunk = []
+            while not self._stopping.is_set():
+                event = get_event()
+                chunk.append(event)
+                if isinstance(event, StreamEndEvent):
+                    self._put(chunk)
+                    return
+                if len(chunk) >= chunk_size:
+                    if not self._put(chunk):
+                        return
+                    chunk = []
+        except Exception as e:
+            # The events parsed before the error still come first.
+            if chunk and not self._put(chunk):
+                return
+            self._put(_Failure(e))
+
+    def _put(self, item):
+        # Put an item into the queue, waiting while it is full unless the
+        # consumer stops in the meantime.
+        while not self._stopping.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # Consumer
+
+    def _fill(self):
+        # Ensure the current chunk has an unread event. Returns False at the
+        # end of the stream.
+        while self._position >= len(self._chunk):
+            if self._ended:
+                return False
+            item = self._queue.get()
+            if isinstance(item, _Failure):
+                self._ended = True
+                raise item.error
+            self._chunk = item
+            self._position = 0
+            if isinstance(item[-1], StreamEndEvent):
+                self._ended = True
+        return True
+
+    def peek_event(self):
+        if not self._fill():
+            return None
+        return self._chunk[self._position]
+
+    def check_event(self, *choices):
+        event = self.peek_event()
+        if event is None:
+            return False
+        if not choices:
+            return True
+        for choice in choices:
+            if isinstance(event, choice):
+                return True
+        return False
+
+    def get_event(self):
+        if not self._fill():
+            return None
+        event = self._chunk[self._position]
+        self._chunk[self._position] = None
+        self._position += 1
+        return event
+
+    def close(self):
+        self._stopping.set()
+        # Unblock a producer waiting to put.
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._thread.join()
+        self._chunk = []
+        self._position = 0
@@ -0,0 +1,137 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Reuse of loaders and elaborators across many streams.
+
+A ``ProcessingContext`` holds fixed settings and keeps, for each thread, a
+small pool of loader/elaborator pairs. The elaborator bound to a pooled
+loader is run again, keeping its settings, resolver, and resolution cache.
+A pooled loader of one of PyYAML's own loader classes (``yaml.Loader``,
+``yaml.SafeLoader``, and so on, or a subclass not defining its own
+initializer) is given its next stream by setting up only its reader,
+scanner, and parser again, and emptying the composer's anchors and the
+resolver's path stacks (which an error part-way may leave set); the
+constructor is not used by the elaborator. Other pooled loaders are given
+their next stream by running their whole initializer again.
+
+With the default settings the saving is negligible: setting up a
+pure-Python loader and an elaborator takes some microseconds, while parsing
+even a payload of a few dozen characters takes hundreds. With
+``compiling_resolver``, compiling the resolver for each stream costs about
+half as much again as parsing such a payload, and pooling saves that.
+
+Only loaders built from PyYAML's pure-Python reader, scanner, and parser are
+pooled; others (such as ``yaml.CLoader``) are created for each stream, as
+``process_stream()`` does, since their initializers cannot safely be run
+twice.
+"""
+
+__all__ = ['ProcessingContext']
+
+import threading
+
+import yaml
+from yaml.parser import Parser
+from yaml.reader import Reader
+from yaml.scanner import Scanner
+
+from .elaborator import Elaborator, ElaboratorSettings
+
+
+# Initializers of PyYAML's loaders, which set up nothing but the state
+# _reset() sets up again.
+_stock_initializers = frozenset(Loader.__init__ for Loader in (yaml.BaseLoader,
+        yaml.SafeLoader, yaml.FullLoader, yaml.UnsafeLoader, yaml.Loader))
+
+
+def _reset(loader, stream):
+    # Start a pooled loader of one of PyYAML's loader classes on stream.
+    Reader.__init__(loader, stream)
+    Scanner.__init__(loader)
+    Parser.__init__(loader)
+    loader.anchors = {}
+    loader.resolver_exact_paths = []
+    loader.resolver_prefix_paths = []
+
+
+class _Entry(object):
+    # A loader and the elaborator bound to it.
+    def __init__(self, loader, elaborator):
+        self.loader = loader
+        self.elaborator = elaborator
+
+
+class ProcessingContext(object):
+    """
+    Elaborates streams with ``Loader`` and the elaborator settings given as
+    keyword arguments, reusing loaders and elaborators. Each thread has its
+    own pool of at most ``pool_size`` idle pairs; a pair is taken from the
+    pool when a stream starts and returned when its generator finishes or is
+    closed, so one context may be used from any number of threads and for
+    several streams at once.
+
+    A pooled loader keeps references to its last stream until it is reused;
+    ``clear()`` empties the calling thread's pool.
+    """
+
+    def __init__(self, Loader=yaml.Loader, pool_size=4, **kwargs):
+        self._Loader = Loader
+        self._pool_size = pool_size
+        self._settings = ElaboratorSettings.default._replace(**kwargs)
+        self._pooling = issubclass(Loader, Reader)
+        self._resetting = Loader.__init__ in _stock_initializers
+        self._local = threading.local()
+
+    def process_stream(self, stream):
+        """
+        Elaborates ``stream``, producing the same output as
+        ``yaml_elaborate.process_stream()`` with this context's loader and
+        settings.
+        """
+        entry = self._acquire(stream)
+        try:
+            for ee in entry.elaborator.process(): yield ee
+        finally:
+            self._release(entry)
+
+    def clear(self):
+        """
+        Discards the idle loaders and elaborators of the calling thread.
+        """
+        self._local.entries = []
+
+    def _entries(self):
+        try:
+            return self._local.entries
+        except AttributeError:
+            entries = self._local.entries = []
+            return entries
+
+    def _acquire(self, stream):
+        if self._pooling:
+            entries = self._entries()
+            if entries:
+                entry = entries.pop()
+                if self._resetting:
+                    _reset(entry.loader, stream)
+                else:
+                    entry.loader.__init__(stream)
+                return entry
+
+        loader = self._Loader(stream)
+        elaborator = Elaborator(self._settings._replace(parser=loader))
+        return _Entry(loader, elaborator)
+
+    def _release(self, entry):
+        entry.loader.dispose()
+        if self._pooling:
+            entries = self._entries()
+            if len(entries) < self._pool_size:
+                entries.append(entry)
@@ -0,0 +1,149 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Resolver wrapper with compiled implicit resolution.
+
+PyYAML's ``BaseResolver.resolve()`` tries the implicit resolvers registered
+for the first character of a plain scalar (followed by the wildcard
+resolvers) one regular expression at a time. ``CompiledResolver`` combines
+each such list into a single alternation of named groups, so that one match
+call finds the first resolver that matches, and remembers the results for
+short values. Everything else (path resolvers, default tags, and the
+``descend_resolver()``/``ascend_resolver()`` bookkeeping) is left to the
+wrapped resolver.
+"""
+
+__all__ = ['CompiledResolver']
+
+import re
+
+from yaml.nodes import ScalarNode
+
+_missing = object()
+
+
+def _combine(run):
+    # Combine expressions with the same flags and no groups of their own
+    # into one pattern with a named group per expression. Alternatives are
+    # tried in order, so the first group to match is that of the first
+    # expression that would match on its own. In a verbose pattern, newlines
+    # end any comment.
+    flags = run[0][1].flags
+    separator = '\n' if flags & re.VERBOSE else ''
+    pattern = '|'.join('(?P<r%d>%s%s%s)' % (i, separator, regexp.pattern,
+            separator) for i, (tag, regexp) in enumerate(run))
+    tags = dict(('r%d' % i, tag) for i, (tag, regexp) in enumerate(run))
+    return re.compile(pattern, flags).match, tags
+
+def _compile_resolvers(resolvers):
+    # Returns a function mapping a value to the tag of the first of the
+    # (tag, regexp) pairs in ``resolvers`` that matches it, or to None.
+    matchers = []
+    run = []
+    for tag, regexp in resolvers + [(None, None)]:
+        if run and (regexp is None or regexp.groups
+                or run[0][1].flags != regexp.flags):
+            if len(run) == 1:
+                matchers.append((run[0][1].match, None, run[0][0]))
+            else:
+                matchers.append(_combine(run) + (None,))
+            run = []
+        if regexp is None:
+            pass
+        elif regexp.groups:
+            matchers.append((regexp.match, None, tag))
+        else:
+            run.append((tag, regexp))
+
+    if not matchers:
+        return lambda value: None
+
+    if len(matchers) == 1:
+        match, tags, tag = matchers[0]
+        if tags is None:
+            def resolve(value):
+                if match(value) is not None:
+                    return tag
+                return None
+        else:
+            def resolve(value):
+                m = match(value)
+                if m is not None:
+                    return tags[m.lastgroup]
+                return None
+        return resolve
+
+    def resolve(value):
+        for match, tags, tag in matchers:
+            m = match(value)
+            if m is not None:
+                if tags is None:
+                    return tag
+                return tags[m.lastgroup]
+        return None
+    return resolve
+
+
+class CompiledResolver(object):
+    """
+    Wraps a resolver (such as a ``yaml.Loader``), returning the same tags
+    from ``resolve()`` with fewer regular expression matches per scalar.
+
+    The implicit resolvers of ``resolver`` are compiled when the wrapper is
+    created; resolvers added afterward are not seen. Results for plain
+    scalars of at most ``cached_length`` characters are cached, up to
+    ``cache_size`` values (the cache is cleared when full). Other attributes
+    are those of the wrapped resolver.
+    """
+
+    def __init__(self, resolver, cache_size=1024, cached_length=32):
+        self._resolver = resolver
+        self._cache_size = cache_size
+        self._cached_length = cached_length
+        self._cache = {}
+
+        implicit_resolvers = resolver.yaml_implicit_resolvers
+        wildcard_resolvers = implicit_resolvers.get(None, [])
+        self._by_first = dict((first, _compile_resolvers(resolvers +
+                wildcard_resolvers)) for first, resolvers in
+                implicit_resolvers.items() if first is not None)
+        self._wildcard = _compile_resolvers(wildcard_resolvers)
+
+        # Without path resolvers, an unmatched plain scalar gets the default
+        # tag.
+        self._scalar_default = None
+        if not resolver.yaml_path_resolvers:
+            self._scalar_default = resolver.DEFAULT_SCALAR_TAG
+
+    def __getattr__(self, name):
+        return getattr(self._resolver, name)
+
+    def descend_resolver(self, current_node, current_index):
+        return self._resolver.descend_resolver(current_node, current_index)
+
+    def ascend_resolver(self):
+        return self._resolver.ascend_resolver()
+
+    def resolve(self, kind, value, implicit):
+        if kind is ScalarNode and implicit[0]:
+            cache = self._cache
+            tag = cache.get(value, _missing)
+            if tag is _missing:
+                tag = self._by_first.get(value[:1], self._wildcard)(value)
+                if len(value) <= self._cached_length:
+                    if len(cache) >= self._cache_size:
+                        cache.clear()
+                    cache[value] = tag
+            if tag is not None:
+                return tag
+            if self._scalar_default is not None:
+                return self._scalar_default
+            implicit = (False, implicit[1])
+        return self._resolver.resolve(kind, value, implicit)
@@ -1,7 +1,9 @@
 
 from __future__ import (absolute_import, division,
                                 print_function, unicode_literals)
-from builtins import *
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
 
 
 """
@@ -80,7 +82,9 @@ These elements and attributes are defined:
             should be inserted in this element's stead.
             -   ``anchor``: The anchor being dereferenced.
         -   ``ess:scalar``: A non-aggregate value. The content of this element
-            is the scalar value with any quoting already removed.
+            is the scalar value with any quoting already removed. Long
+            values (including ``SpilledScalar`` values) are passed to the
+            handler in several ``characters()`` calls of bounded size.
             -   ``anchor``: The anchor whose referent is this scalar.
             -   ``tag``: The tag for this scalar.
             -   ``sty:plain-implicit``: ``true`` if omitting the tag would not
@@ -129,15 +133,26 @@ These elements and attributes are defined:
     -   ``sty:pair-value``: The value of a pair. Contains exactly one value
         element, which is the pair's value.
 
+Tree building
+-------------
+
+``TreeSaxifier`` produces the same elements and attributes, but feeds them
+straight to a tree builder (``xml.etree.ElementTree.TreeBuilder``, or
+``lxml.etree.TreeBuilder`` if lxml is installed) instead of to a SAX
+handler, using element and attribute names in ElementTree's ``{nsname}local``
+form. It can build one tree for the whole stream, or one per document, so
+that each document's tree can be released before the next is built.
 
 """
 
-__all__ = ['Saxifier']
+__all__ = ['Saxifier', 'TreeSaxifier']
 
 import re
 from collections import namedtuple
 from xml.sax.xmlreader import AttributesNSImpl
 
+from .scalars import SpilledScalar, scalar_chunks
+
 _EventTypeInfo = namedtuple('_EventTypeInfo', ['node_name', 'node_event',
     'is_essential', 'object_properties', 'essential_attributes'])
 
@@ -248,7 +263,8 @@ class Saxifier(object):
             include_ancillary_elements=True,
             essential_prefix=None,
             stylistic_prefix=None,
-            hide_implicit_if_true=False):
+            hide_implicit_if_true=False,
+            scalar_chunk_size=65536):
 
         self._events = events
         self._handler = handler
@@ -256,6 +272,7 @@ class Saxifier(object):
         self._include_stylistic_attributes = include_stylistic_attributes
         self._include_ancillary_elements = include_ancillary_elements
         self._hide_implicit_if_true = hide_implicit_if_true
+        self._scalar_chunk_size = scalar_chunk_size
 
         if stylistic_prefix is None:
             stylistic_prefix = 'sty'
@@ -307,7 +324,7 @@ class Saxifier(object):
 
         for nsname in reversed(self._nsnames_to_register):
             prefix = self._nsname_prefix_all[nsname]
-            self._handler.startPrefixMapping(prefix, nsname)
+            self._handler.endPrefixMapping(prefix)
 
         if not self._partial:
             self._handler.endDocument()
@@ -360,12 +377,18 @@ class Saxifier(object):
         # Flatten two-part implicit
         self._convert_two_part_implicit(p, is_plain_scalar)
 
+        # A spilled value is too large for an attribute; it is only streamed
+        # as content.
+        spilled_value = None
+        if isinstance(p.get('value'), SpilledScalar):
+            spilled_value = p.pop('value')
+
         # Normalize names and stringify values
         ad = self._prep_unqualified_attributes_dict(p)
 
         # Annotate property keys with prefixes
         qp = dict()
-        for key, value in ad.viewitems():
+        for key, value in ad.items():
             is_attr_essential = key in info.essential_attributes
 
             # Skip stylistic attributes if disabled
@@ -381,8 +404,12 @@ class Saxifier(object):
             qp[attr_nsname, key] = value
         
         if node_name == 'scalar':
-            text = str(p.pop('value'))
-            self._simple_element(event_nsname, node_name, text, qp)
+            value = p.pop('value', spilled_value)
+            if (isinstance(value, SpilledScalar)
+                    or len(value) > self._scalar_chunk_size):
+                self._chunked_element(event_nsname, node_name, value, qp)
+            else:
+                self._simple_element(event_nsname, node_name, str(value), qp)
         elif node_name == 'alias':
             self._empty_element(event_nsname, node_name, qp)
         else:
@@ -461,7 +488,7 @@ class Saxifier(object):
             yield (self._xml_like_from_camel(k), v)
 
     def _dashify_keys(self, d):
-        return dict(self._dashify_iteritems_keys(d.viewitems()))
+        return dict(self._dashify_iteritems_keys(d.items()))
 
     def _stringify_iteritems_values(self, items):
         for k, v in items:
@@ -475,7 +502,7 @@ class Saxifier(object):
             yield (k, v)
 
     def _stringify_values(self, d):
-        return dict(self._stringify_iteritems_values(d.viewitems()))
+        return dict(self._stringify_iteritems_values(d.items()))
 
     def _prep_unqualified_attributes_dict(self, *attr_dicts, **attr_kwargs):
         d = self._combine_dicts(*attr_dicts, **attr_kwargs)
@@ -511,7 +538,7 @@ class Saxifier(object):
         name_to_value = dict()
         name_to_qname = dict()
 
-        for name, value in qualified_attributes_dict.viewitems():
+        for name, value in qualified_attributes_dict.items():
             if value is None:
                 continue
 
@@ -545,6 +572,15 @@ class Saxifier(object):
 
         self._end_element(nsname, local_name)
 
+    def _chunked_element(self, nsname, local_name, value,
+            qualified_attributes_dict=None):
+        self._start_element(nsname, local_name, qualified_attributes_dict)
+
+        for chunk in scalar_chunks(value, self._scalar_chunk_size):
+            self._handler.characters(chunk)
+
+        self._end_element(nsname, local_name)
+
     def _empty_element(self, nsname, local_name,
             qualified_attributes_dict=None):
         self._simple_element(nsname, local_name, None,
@@ -561,21 +597,41 @@ class Saxifier(object):
 
     _trimming_pattern = re.compile(r'^-|-$')
 
+    # XML-like names by CamelCase name, shared by all instances.
+    _xml_like_names = {}
+
     def _xml_like_from_camel(self, camel_name):
         """
         Turns a CamelCase name like (e.g. "FooBarBaz") into an XML-like name
         (e.g. "foo-bar-baz").
         """
+        try:
+            return self._xml_like_names[camel_name]
+        except KeyError:
+            pass
         s = camel_name
         s = self._uppercase_pattern.sub(r' \1', s)
         s = self._interword_pattern.sub('-', s)
         s = self._trimming_pattern.sub('', s)
-        return s.lower()
+        s = self._xml_like_names[camel_name] = s.lower()
+        return s
 
 
     _event_type_info_pattern = re.compile(r'^(.*?)(Start|End|)Event$')
 
+    # Event type info by event class name, shared by all instances.
+    _event_type_infos = {}
+
     def _event_type_info(self, camel_name):
+        try:
+            return self._event_type_infos[camel_name]
+        except KeyError:
+            pass
+        info = self._event_type_infos[camel_name] = (
+                self._find_event_type_info(camel_name))
+        return info
+
+    def _find_event_type_info(self, camel_name):
         # Extract meaningful parts of class name
         # (e.g. "StreamStartEvent" -> "stream", "start") then look them up in
         # the event types table. The CamelCasing is adjusted to hyphenated
@@ -599,3 +655,213 @@ class Saxifier(object):
         except KeyError:
             raise ValueError("%r is not a known event" % camel_name)
 
+
+def _tree_builder_type(backend):
+    # Returns (TreeBuilder class, whether it is lxml's).
+    if backend in ('auto', 'lxml'):
+        try:
+            from lxml.etree import TreeBuilder
+            return TreeBuilder, True
+        except ImportError:
+            if backend == 'lxml':
+                raise
+    elif backend != 'etree':
+        raise ValueError("unknown tree builder backend %r" % backend)
+    from xml.etree.ElementTree import TreeBuilder
+    return TreeBuilder, False
+
+class TreeSaxifier(Saxifier):
+    """
+    Builds element trees from an event stream, with the same elements and
+    attributes as ``Saxifier`` produces (the remaining keyword arguments are
+    those of ``Saxifier``, except ``handler`` and ``partial``).
+
+    ``backend`` is ``'etree'`` for ``xml.etree.ElementTree``, ``'lxml'`` for
+    ``lxml.etree``, or ``'auto'`` (default) for lxml if it is installed and
+    ElementTree otherwise. With lxml, the namespace prefixes are declared on
+    each root element; ElementTree chooses its own prefixes when
+    serializing.
+
+    The element name and kind of each event class are worked out once, and
+    attributes are read from each event directly into the builder's
+    attribute dict, without the intermediate dicts ``Saxifier`` builds for
+    a SAX handler.
+    """
+
+    def __init__(self, events, backend='auto', **kwargs):
+        super(TreeSaxifier, self).__init__(events, None, partial=True,
+                **kwargs)
+        self._builder_type, self._lxml = _tree_builder_type(backend)
+        self._builder = None
+        self._at_root = False
+        self._element_tags = {}
+        self._attribute_keys = {}
+        # (element tag, kind) by event class name; None if skipped.
+        self._plans = {}
+
+    def run(self):
+        """
+        Builds a tree of the whole stream and returns its root element,
+        ``ess:stream``.
+        """
+        self._new_builder()
+        for event in self._events:
+            event_type_name = type(event).__name__
+            info = self._event_type_info(event_type_name)
+            self._each_event(event, event_type_name, info)
+        return self._close_builder()
+
+    def iter_documents(self):
+        """
+        Yields the root element, ``ess:document``, of a tree built for each
+        document of the stream. The ``ess:stream`` element is omitted.
+        """
+        for event in self._events:
+            event_type_name = type(event).__name__
+            info = self._event_type_info(event_type_name)
+            if info.node_name == 'stream':
+                continue
+            if info.node_name == 'document' and info.node_event == 'start':
+                self._new_builder()
+            self._each_event(event, event_type_name, info)
+            if info.node_name == 'document' and info.node_event == 'end':
+                yield self._close_builder()
+
+    def _each_event(self, event, event_type_name, info):
+        try:
+            plan = self._plans[event_type_name]
+        except KeyError:
+            plan = self._plans[event_type_name] = self._plan(info)
+        if plan is None:
+            return
+        tag, kind = plan
+
+        if kind == 'end':
+            self._builder.end(tag)
+            return
+
+        attrib = self._tree_attributes(event, info)
+        if kind == 'start':
+            self._start_tree_element(tag, attrib)
+            return
+
+        self._start_tree_element(tag, attrib)
+        if kind == 'scalar':
+            for chunk in scalar_chunks(event.value, self._scalar_chunk_size):
+                self._builder.data(chunk)
+        self._builder.end(tag)
+
+    def _plan(self, info):
+        if not (self._include_ancillary_elements or info.is_essential):
+            return None
+        tag = self._element_tag(self._get_xml_element_nsname(
+                info.is_essential), info.node_name)
+        if info.node_name in ('scalar', 'alias'):
+            return tag, info.node_name
+        return tag, info.node_event
+
+    def _tree_attributes(self, event, info):
+        # The attributes Saxifier._each_event would produce, keyed as for
+        # ElementTree.
+        attrib = {}
+        properties = info.object_properties
+        essential = info.essential_attributes
+        stylistic = {}
+
+        for name in ('anchor', 'tag'):
+            if name in essential:
+                value = getattr(event, name, None)
+                if value is not None:
+                    attrib[name] = _attribute_text(value)
+
+        if 'implicit' in properties:
+            implicit = getattr(event, 'implicit', None)
+            try:
+                implicit_if_plain, implicit_if_not_plain = implicit
+            except TypeError:
+                pass
+            else:
+                is_plain_scalar = (info.node_name == 'scalar'
+                        and _scalar_style_names.get(
+                            getattr(event, 'style', None)) in (None, 'plain'))
+                stylistic['plain-implicit'] = implicit_if_plain
+                stylistic['quoted-implicit'] = implicit_if_not_plain
+                implicit = (implicit_if_plain if is_plain_scalar
+                        else implicit_if_not_plain)
+            if implicit is not None:
+                implicit = _attribute_text(implicit)
+                if not (self._hide_implicit_if_true and implicit == 'true'):
+                    attrib['implicit'] = implicit
+
+        if not self._include_stylistic_attributes:
+            return attrib
+
+        for name in ('encoding', 'explicit', 'version', 'tags', 'index',
+                'value'):
+            if name in properties:
+                stylistic[name] = getattr(event, name, None)
+        if isinstance(stylistic.get('value'), SpilledScalar):
+            del stylistic['value']
+        if 'flow_style' in properties:
+            stylistic['style'] = ('flow' if getattr(event, 'flow_style', None)
+                    else 'block')
+        elif 'style' in properties:
+            stylistic['style'] = _scalar_style_names.get(
+                    getattr(event, 'style', None))
+        if info.is_essential:
+            for prefix in ('start', 'end'):
+                mark = getattr(event, prefix + '_mark', None)
+                if mark:
+                    stylistic[prefix + '-source'] = mark.name
+                    stylistic[prefix + '-line'] = mark.line + 1
+                    stylistic[prefix + '-column'] = mark.column + 1
+
+        for name, value in stylistic.items():
+            if value is not None:
+                attrib[self._attribute_key((_stylistic_nsname, name))] = (
+                        _attribute_text(value))
+        return attrib
+
+    def _start_tree_element(self, tag, attrib):
+        if self._lxml and self._at_root:
+            nsmap = dict((self._nsname_prefix_all[nsname], nsname)
+                    for nsname in self._nsnames_to_register)
+            self._builder.start(tag, attrib, nsmap)
+        else:
+            self._builder.start(tag, attrib)
+        self._at_root = False
+
+    def _new_builder(self):
+        self._builder = self._builder_type()
+        self._at_root = True
+
+    def _close_builder(self):
+        root = self._builder.close()
+        self._builder = None
+        return root
+
+    def _element_tag(self, nsname, local_name):
+        name = (nsname, local_name)
+        try:
+            return self._element_tags[name]
+        except KeyError:
+            tag = self._element_tags[name] = _clark_name(nsname, local_name)
+            return tag
+
+    def _attribute_key(self, name):
+        try:
+            return self._attribute_keys[name]
+        except KeyError:
+            key = self._attribute_keys[name] = _clark_name(*name)
+            return key
+
+def _clark_name(nsname, local_name):
+    if nsname is None:
+        return local_name
+    return '{%s}%s' % (nsname, local_name)
+
+def _attribute_text(value):
+    # As Saxifier._stringify_values: JSON-like booleans, else str().
+    if value is True or value is False:
+        return str(value).lower()
+    return str(value)
@@ -0,0 +1,273 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+__all__ = ['construct_scalar_value', 'canonical_scalar_value',
+        'SpilledScalar', 'SpillFile', 'scalar_chunks']
+
+import io
+import tempfile
+
+from yaml.constructor import SafeConstructor
+
+
+class _ScalarValue(object):
+    # Stand-in for a ScalarNode carrying only what the scalar constructors
+    # of SafeConstructor look at.
+    __slots__ = ('value', 'start_mark', 'end_mark')
+
+    def __init__(self, value, start_mark=None, end_mark=None):
+        self.value = value
+        self.start_mark = start_mark
+        self.end_mark = end_mark
+
+class _ScalarValueConstructor(SafeConstructor):
+    # SafeConstructor whose scalar constructors accept a _ScalarValue in
+    # place of a ScalarNode, so that scalars can be constructed straight from
+    # events.
+    def construct_scalar(self, node):
+        return node.value
+
+_scalar_value_constructor = _ScalarValueConstructor()
+
+_standard_scalar_tags = (
+        'tag:yaml.org,2002:null',
+        'tag:yaml.org,2002:bool',
+        'tag:yaml.org,2002:int',
+        'tag:yaml.org,2002:float',
+        'tag:yaml.org,2002:binary',
+        'tag:yaml.org,2002:timestamp',
+        'tag:yaml.org,2002:str',
+        )
+
+_standard_scalar_constructors = dict(
+        (tag, SafeConstructor.yaml_constructors[tag])
+        for tag in _standard_scalar_tags)
+
+def construct_scalar_value(tag, value, start_mark=None, end_mark=None):
+    """
+    Constructs the Python value of a scalar with a standard YAML tag exactly
+    as ``yaml.constructor.SafeConstructor`` would, but without a
+    ``ScalarNode``. Raises ``KeyError`` if ``tag`` is not one of the standard
+    scalar tags.
+    """
+    constructor = _standard_scalar_constructors[tag]
+    if isinstance(value, SpilledScalar):
+        value = str(value)
+    return constructor(_scalar_value_constructor,
+            _ScalarValue(value, start_mark, end_mark))
+
+
+# Canonical text of each standard value type, as used for content hashing.
+
+def _canonical_null(value):
+    return ''
+
+def _canonical_bool(value):
+    return 'true' if value else 'false'
+
+def _canonical_int(value):
+    return '%d' % value
+
+def _canonical_float(value):
+    return repr(value)
+
+def _canonical_timestamp(value):
+    return value.isoformat()
+
+_canonicalizers = {
+        'tag:yaml.org,2002:null': _canonical_null,
+        'tag:yaml.org,2002:bool': _canonical_bool,
+        'tag:yaml.org,2002:int': _canonical_int,
+        'tag:yaml.org,2002:float': _canonical_float,
+        'tag:yaml.org,2002:timestamp': _canonical_timestamp,
+        }
+
+def canonical_scalar_value(tag, value):
+    """
+    Returns a canonical text form of a scalar value: for null, bool, int,
+    float, and timestamp scalars, this is a fixed rendering of the constructed
+    value (so that e.g. ``0x10`` and ``16`` agree); for any other tag, or a
+    value that fails to construct, it is the value unchanged.
+    """
+    canonicalizer = _canonicalizers.get(tag)
+    if canonicalizer is None:
+        return value
+    try:
+        return canonicalizer(construct_scalar_value(tag, value))
+    except (ValueError, KeyError, AttributeError):
+        return value
+
+
+# Large scalars
+
+_default_chunk_size = 65536
+
+class _SharedFileReader(io.RawIOBase):
+    # Raw reader of length bytes from offset of a file that other readers
+    # may also be reading; it seeks to its own position before each read.
+    def __init__(self, file, offset, length):
+        self._file = file
+        self._position = offset
+        self._end = offset + length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        remaining = self._end - self._position
+        if remaining <= 0:
+            return 0
+        self._file.seek(self._position)
+        count = self._file.readinto(memoryview(buffer)[:remaining])
+        self._position += count
+        return count
+
+class SpillFile(object):
+    """
+    Anonymous temporary file holding the text of any number of spilled
+    scalars, one after another, so that they share one file descriptor. The
+    file is created on the first write, and closed by ``close()`` or once
+    neither it nor any scalar spilled to it is referenced.
+    """
+
+    def __init__(self):
+        self._file = None
+        self._size = 0
+
+    def write(self, text, chunk_size=_default_chunk_size):
+        """
+        Appends ``text``, UTF-8 encoded, and returns its offset and length
+        in bytes.
+        """
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        offset = self._size
+        self._file.seek(offset)
+        for start in range(0, len(text), chunk_size):
+            data = text[start:start + chunk_size].encode('utf-8')
+            self._file.write(data)
+            self._size += len(data)
+        self._file.flush()
+        return offset, self._size - offset
+
+    def reader(self, offset, length):
+        """
+        Returns a new binary file object reading ``length`` bytes from
+        ``offset``.
+        """
+        return io.BufferedReader(_SharedFileReader(self._file, offset,
+                length))
+
+    def close(self):
+        """
+        Closes the file; scalars spilled to it can no longer be read.
+        """
+        if self._file is not None:
+            self._file.close()
+
+class SpilledScalar(object):
+    """
+    The text of a large scalar, kept UTF-8 encoded in an anonymous temporary
+    file (``to='file'``) or in a single bytes buffer in memory
+    (``to='memory'``) rather than as a ``str``. The text can be read lazily
+    with ``open()`` or ``chunks()``; ``str()`` returns all of it.
+
+    With ``to='file'``, the text is appended to ``spill_file``, a
+    ``SpillFile`` that may be shared by many scalars, or to a new one of its
+    own if that is ``None``.
+
+    A ``SpilledScalar`` compares equal to, and hashes as, its text.
+    """
+
+    def __init__(self, text, to='file', chunk_size=_default_chunk_size,
+            spill_file=None):
+        self._length = len(text)
+        self._spill_file = None
+        self._data = None
+        self._closed = False
+        if to == 'file':
+            if spill_file is None:
+                spill_file = SpillFile()
+            self._spill_file = spill_file
+            self._offset, self._size = spill_file.write(text, chunk_size)
+        elif to == 'memory':
+            self._data = text.encode('utf-8')
+        else:
+            raise ValueError("cannot spill a scalar to %r" % to)
+
+    def __len__(self):
+        return self._length
+
+    def open(self):
+        """
+        Returns a new text file object reading the text from the start.
+        """
+        if self._closed:
+            raise ValueError("the spilled scalar has been closed")
+        if self._spill_file is not None:
+            raw = self._spill_file.reader(self._offset, self._size)
+        else:
+            raw = io.BytesIO(self._data)
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+    def chunks(self, size=_default_chunk_size):
+        """
+        Yields the text in pieces of at most ``size`` characters.
+        """
+        reader = self.open()
+        try:
+            while True:
+                chunk = reader.read(size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            reader.close()
+
+    def close(self):
+        """
+        Releases this scalar's hold on its ``SpillFile``, if any (which is
+        closed once no longer referenced); the text can no longer be read.
+        """
+        if self._spill_file is not None:
+            self._spill_file = None
+            self._closed = True
+
+    def __str__(self):
+        return ''.join(self.chunks())
+
+    def __repr__(self):
+        return '<%s of %d characters>' % (type(self).__name__, self._length)
+
+    def __eq__(self, other):
+        if isinstance(other, SpilledScalar):
+            other = str(other)
+        if not isinstance(other, str):
+            return NotImplemented
+        return len(other) == self._length and str(self) == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(str(self))
+
+def scalar_chunks(value, size=_default_chunk_size):
+    """
+    Yields the text of a scalar value, a ``str`` or ``SpilledScalar``, in
+    pieces of at most ``size`` characters (none for an empty value).
+    """
+    if isinstance(value, SpilledScalar):
+        for chunk in value.chunks(size): yield chunk
+        return
+    for start in range(0, len(value), size):
+        yield value[start:start + size]
@@ -0,0 +1,409 @@
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+if sys.version_info[0] < 3:
+    from builtins import *
+
+
+
+"""
+Streaming schema validation.
+
+A schema is a dict (such as one loaded from YAML or JSON) describing the
+nodes of a document. ``compile_schema()`` turns it into a tree of rules, and
+a ``SchemaValidator`` checks elaborated events against those rules as they
+arrive, holding one frame per open collection, so that memory grows with the
+depth of the document rather than its size and a bad document can be
+rejected before it has been read to the end.
+
+A schema may contain:
+
+-   ``type``: A type name (``str``, ``int``, ``float``, ``bool``, ``null``,
+    ``timestamp``, ``binary``, ``map``, ``seq``, ``set``, ``omap``, or
+    ``pairs``, standing for the ``tag:yaml.org,2002:`` tag of that name),
+    ``number`` (``int`` or ``float``), ``any``, a full tag, or a list of
+    these. It is checked against the resolved tag of each node.
+-   ``keys``: A dict from each known key of a mapping to the schema of its
+    value. Keys are matched by the text of scalar keys.
+-   ``required``: A list of keys that a mapping must have.
+-   ``additional_keys``: Whether keys not in ``keys`` are allowed (default
+    true), or a schema for the values of such keys.
+-   ``items``: The schema of each element of a sequence.
+-   ``min_items``, ``max_items``: Bounds on the number of elements of a
+    sequence or pairs of a mapping.
+-   ``enum``: A list of the allowed values of a scalar, compared with its
+    constructed value (for standard tags) or its text.
+-   ``minimum``, ``maximum``: Bounds on the value of an ``int`` or ``float``
+    scalar.
+-   ``pattern``: A regular expression that must be found (as by
+    ``re.search()``) in the text of a scalar.
+-   ``min_length``, ``max_length``: Bounds on the length of a scalar's text.
+
+Violations are reported with a path like that of ``yaml_elaborate.diff``:
+the 0-based document index followed by the sequence index or mapping key of
+each enclosing node (a key that is not a scalar is given as its content hash
+if hashing is on, else as ``None``). Aliases are not checked unless the
+stream is elaborated with ``expand_aliases``. The events of sequences
+withheld by ``with_packed_element_events=False`` are checked from their
+packed values.
+"""
+
+__all__ = ['compile_schema', 'SchemaValidator', 'Violation',
+        'validate_stream']
+
+from collections import namedtuple
+import re
+
+import yaml
+from yaml.events import (DocumentStartEvent, SequenceStartEvent,
+        SequenceEndEvent, MappingStartEvent, MappingEndEvent, AliasEvent,
+        ScalarEvent)
+
+from .elaborator import Elaborator, ElaboratorSettings
+from .events import ElementStartEvent, PairKeyStartEvent, PairValueStartEvent
+from .scalars import construct_scalar_value
+
+_tag_prefix = 'tag:yaml.org,2002:'
+_int_tag = _tag_prefix + 'int'
+_float_tag = _tag_prefix + 'float'
+
+_type_names = ('str', 'int', 'float', 'bool', 'null', 'timestamp', 'binary',
+        'map', 'seq', 'set', 'omap', 'pairs')
+
+_schema_keywords = frozenset(('type', 'keys', 'required', 'additional_keys',
+        'items', 'min_items', 'max_items', 'enum', 'minimum', 'maximum',
+        'pattern', 'min_length', 'max_length'))
+
+
+Violation = namedtuple('Violation', ['path', 'message', 'mark'])
+Violation.__doc__ = """
+A node that breaks a schema rule: its path (see ``yaml_elaborate.schema``),
+a description of the problem, and the mark where it was found.
+"""
+
+
+# Compiling
+
+class _Rule(object):
+    # Compiled schema of one node.
+    __slots__ = ('tags', 'keys', 'required', 'additional_keys', 'items',
+            'min_items', 'max_items', 'enum', 'minimum', 'maximum',
+            'pattern', 'min_length', 'max_length')
+
+def _compile_tags(type_spec):
+    if type_spec is None:
+        return None
+    if isinstance(type_spec, str):
+        type_spec = [type_spec]
+    tags = set()
+    for name in type_spec:
+        if name == 'any':
+            return None
+        elif name == 'number':
+            tags.update((_int_tag, _float_tag))
+        elif name in _type_names:
+            tags.add(_tag_prefix + name)
+        elif ':' in name or name.startswith('!'):
+            tags.add(name)
+        else:
+            raise ValueError("unknown schema type %r" % name)
+    return frozenset(tags)
+
+def _compile_rule(schema):
+    if not isinstance(schema, dict):
+        raise ValueError("a schema must be a dict, not %r" % (schema,))
+    unknown = set(schema) - _schema_keywords
+    if unknown:
+        raise ValueError("unknown schema keywords: %s"
+                % ", ".join(sorted(repr(k) for k in unknown)))
+
+    rule = _Rule()
+    rule.tags = _compile_tags(schema.get('type'))
+    rule.keys = dict((key, _compile_rule(value))
+            for key, value in schema.get('keys', {}).items())
+    rule.required = tuple(schema.get('required', ()))
+
+    additional_keys = schema.get('additional_keys', True)
+    if isinstance(additional_keys, dict):
+        additional_keys = _compile_rule(additional_keys)
+    rule.additional_keys = additional_keys
+
+    items = schema.get('items')
+    rule.items = None if items is None else _compile_rule(items)
+    rule.min_items = schema.get('min_items')
+    rule.max_items = schema.get('max_items')
+
+    enum = schema.get('enum')
+    rule.enum = None if enum is None else [(type(v), v) for v in enum]
+    rule.minimum = schema.get('minimum')
+    rule.maximum = schema.get('maximum')
+    pattern = schema.get('pattern')
+    rule.pattern = None if pattern is None else re.compile(pattern)
+    rule.min_length = schema.get('min_length')
+    rule.max_length = schema.get('max_length')
+    return rule
+
+def compile_schema(schema):
+    """
+    Compiles a schema (see ``yaml_elaborate.schema``) for a
+    ``SchemaValidator``. Raises ``ValueError`` if the schema is malformed.
+    """
+    return _compile_rule(schema)
+
+
+# Validating
+
+def _type_description(tags):
+    return " or ".join(sorted(
+            tag[len(_tag_prefix):] if tag.startswith(_tag_prefix) else tag
+            for tag in tags))
+
+def _constructed_value(tag, text):
+    try:
+        return construct_scalar_value(tag, text)
+    except (KeyError, ValueError, TypeError, yaml.YAMLError):
+        return text
+
+class _Frame(object):
+    # An open collection.
+    __slots__ = ('rule', 'path', 'start_mark', 'is_mapping', 'count',
+            'expecting_key', 'key', 'key_mark', 'missing')
+
+    def __init__(self, rule, path, start_mark, is_mapping):
+        self.rule = rule
+        self.path = path
+        self.start_mark = start_mark
+        self.is_mapping = is_mapping
+        # Elements, or completed pairs.
+        self.count = 0
+        self.expecting_key = True
+        self.key = None
+        self.key_mark = None
+        self.missing = None
+        if is_mapping and rule is not None and rule.required:
+            self.missing = set(rule.required)
+
+class SchemaValidator(object):
+    """
+    Checks a flat stream of elaborated events against a compiled schema,
+    which applies to each document. Call ``feed(event)`` with each event in
+    order; it returns the list of the violations found at that event.
+
+    ``failed`` is set once any violation has been found. If ``fail_fast`` is
+    true, nothing more is checked after that.
+    """
+
+    def __init__(self, schema, fail_fast=False):
+        if isinstance(schema, dict):
+            schema = compile_schema(schema)
+        self._schema = schema
+        self._fail_fast = fail_fast
+        self._frames = []
+        self._document_index = -1
+        self._violations = None
+        self.failed = False
+
+    def feed(self, event):
+        if self.failed and self._fail_fast:
+            return []
+        self._violations = violations = []
+
+        if isinstance(event, (ScalarEvent, AliasEvent, SequenceStartEvent,
+                MappingStartEvent)):
+            self._value(event)
+        elif isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+            self._end(event)
+        elif isinstance(event, ElementStartEvent):
+            self._frames[-1].count = event.index
+        elif isinstance(event, PairKeyStartEvent):
+            self._frames[-1].expecting_key = True
+        elif isinstance(event, PairValueStartEvent):
+            self._frames[-1].expecting_key = False
+        elif isinstance(event, DocumentStartEvent):
+            self._document_index += 1
+            self._frames = []
+
+        self._violations = None
+        if violations:
+            self.failed = True
+        return violations
+
+    def _report(self, path, message, mark):
+        self._violations.append(Violation(path, message, mark))
+
+    def _place(self):
+        # The rule and path of the next value, reporting an unexpected key.
+        if not self._frames:
+            return self._schema, (self._document_index,)
+        frame = self._frames[-1]
+        rule = frame.rule
+        if not frame.is_mapping:
+            path = frame.path + (frame.count,)
+            return (None if rule is None else rule.items), path
+        if frame.expecting_key:
+            return None, frame.path + (None,)
+
+        path = frame.path + (frame.key,)
+        if rule is None:
+            return None, path
+        try:
+            return rule.keys[frame.key], path
+        except (KeyError, TypeError):
+            pass
+        additional_keys = rule.additional_keys
+        if additional_keys is True:
+            return None, path
+        if additional_keys is False:
+            self._report(path, "unexpected key %r" % (frame.key,),
+                    frame.key_mark)
+            return None, path
+        return additional_keys, path
+
+    def _value(self, event):
+        rule, path = self._place()
+        if self._frames:
+            frame = self._frames[-1]
+            if frame.is_mapping and frame.expecting_key:
+                frame.key_mark = event.start_mark
+                if isinstance(event, ScalarEvent):
+                    frame.key = event.value
+                else:
+                    frame.key = getattr(event, 'content_hash', None)
+
+        if rule is not None and rule.tags is not None and not isinstance(
+                event, AliasEvent) and event.tag not in rule.tags:
+            self._report(path, "expected %s, found %s" % (
+                    _type_description(rule.tags), event.tag),
+                    event.start_mark)
+
+        if isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+            self._frames.append(_Frame(rule, path, event.start_mark,
+                    isinstance(event, MappingStartEvent)))
+            return
+
+        if isinstance(event, ScalarEvent) and rule is not None:
+            self._check_scalar(rule, path, event.tag, event.value, None,
+                    event.start_mark)
+        self._complete(event)
+
+    def _end(self, event):
+        frame = self._frames.pop()
+        rule = frame.rule
+        if rule is not None:
+            if not frame.is_mapping and not frame.count:
+                packed_values = getattr(event, 'packed_values', None)
+                if packed_values is not None:
+                    self._check_packed(rule, frame, packed_values)
+            self._check_size(rule, frame)
+            if frame.missing:
+                for key in rule.required:
+                    if key in frame.missing:
+                        self._report(frame.path,
+                                "missing required key %r" % (key,),
+                                frame.start_mark)
+        self._complete(event)
+
+    def _complete(self, event):
+        # A value has ended with event; advance its parent.
+        if not self._frames:
+            return
+        frame = self._frames[-1]
+        if not frame.is_mapping:
+            frame.count += 1
+        elif frame.expecting_key:
+            if isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+                frame.key = getattr(event, 'content_hash', None)
+            if frame.missing:
+                frame.missing.discard(frame.key)
+            frame.expecting_key = False
+        else:
+            frame.count += 1
+            frame.expecting_key = True
+
+    def _check_size(self, rule, frame):
+        noun = "pairs" if frame.is_mapping else "items"
+        if rule.min_items is not None and frame.count < rule.min_items:
+            self._report(frame.path, "%d %s is fewer than the minimum %d"
+                    % (frame.count, noun, rule.min_items), frame.start_mark)
+        if rule.max_items is not None and frame.count > rule.max_items:
+            self._report(frame.path, "%d %s is more than the maximum %d"
+                    % (frame.count, noun, rule.max_items), frame.start_mark)
+
+    def _check_packed(self, rule, frame, packed_values):
+        # Elements withheld while packing numbers.
+        items = rule.items
+        for index, value in enumerate(packed_values):
+            if items is not None:
+                if isinstance(value, float) or getattr(
+                        packed_values, 'typecode', None) == 'd' or getattr(
+                        getattr(packed_values, 'dtype', None), 'kind',
+                        None) == 'f':
+                    tag, value = _float_tag, float(value)
+                else:
+                    tag, value = _int_tag, int(value)
+                path = frame.path + (index,)
+                if items.tags is not None and tag not in items.tags:
+                    self._report(path, "expected %s, found %s" % (
+                            _type_description(items.tags), tag),
+                            frame.start_mark)
+                self._check_scalar(items, path, tag, None, value,
+                        frame.start_mark)
+        frame.count = len(packed_values)
+
+    def _check_scalar(self, rule, path, tag, text, value, mark):
+        # text is the scalar's text, or None if only its constructed value
+        # is known.
+        if text is None:
+            text = repr(value)
+        elif (rule.enum is not None or rule.minimum is not None
+                or rule.maximum is not None):
+            value = _constructed_value(tag, str(text))
+
+        if rule.enum is not None and (type(value), value) not in rule.enum:
+            self._report(path, "%r is not one of the allowed values"
+                    % (value,), mark)
+
+        if tag in (_int_tag, _float_tag) and not isinstance(value, str):
+            if rule.minimum is not None and value < rule.minimum:
+                self._report(path, "%r is less than the minimum %r"
+                        % (value, rule.minimum), mark)
+            if rule.maximum is not None and value > rule.maximum:
+                self._report(path, "%r is more than the maximum %r"
+                        % (value, rule.maximum), mark)
+
+        if rule.min_length is not None and len(text) < rule.min_length:
+            self._report(path, "length %d is less than the minimum %d"
+                    % (len(text), rule.min_length), mark)
+        if rule.max_length is not None and len(text) > rule.max_length:
+            self._report(path, "length %d is more than the maximum %d"
+                    % (len(text), rule.max_length), mark)
+
+        if rule.pattern is not None and not rule.pattern.search(str(text)):
+            self._report(path, "%r does not match %r"
+                    % (str(text), rule.pattern.pattern), mark)
+
+
+def validate_stream(stream, schema, Loader=yaml.Loader, fail_fast=False,
+        **kwargs):
+    """
+    Elaborates ``stream`` and yields each ``Violation`` of ``schema`` (a
+    schema dict, or one compiled by ``compile_schema()``) in each of its
+    documents. Further keyword arguments are elaborator settings; ``flat``,
+    ``including_ends``, and ``with_extra_events`` are always overridden.
+
+    If ``fail_fast`` is true, reading stops after the event at which the
+    first violations are found.
+    """
+    validator = SchemaValidator(schema, fail_fast)
+    loader = Loader(stream)
+    settings = ElaboratorSettings.default._replace(**kwargs)._replace(
+            parser=loader, flat=True, including_ends=False,
+            with_extra_events=True)
+    try:
+        for ee in Elaborator(settings).process():
+            for violation in validator.feed(ee): yield violation
+            if validator.failed and fail_fast:
+                return
+    finally:
+        loader.dispose()